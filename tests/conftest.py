@@ -0,0 +1,170 @@
+"""
+Shared fixtures for the workflow tests.
+
+The workflow scripts are standalone modules, put on the import path by the
+pytest settings in pyproject.toml. Tests that need PostgreSQL run against a
+scratch database created from init_db_schema.sql and similarity_search.sql
+on the server named by the DB_* environment variables (or .env), and are
+skipped when no server is reachable. Scraper tests fetch from a local
+http.server copy of the examples site.
+"""
+
+import os
+import time
+import uuid
+import threading
+from pathlib import Path
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from typing import List, Dict, Any, Optional
+
+import pytest
+import psycopg
+from psycopg import sql
+from dotenv import load_dotenv
+from pgvector.psycopg import register_vector
+
+from upload_to_postgres import bulk_import_examples
+from embed_examples import update_db_schema_for_google_ai
+
+load_dotenv()
+
+WORKFLOW_DIR = Path(__file__).resolve().parent.parent / "workflow"
+SCHEMA_FILES = ["init_db_schema.sql", "similarity_search.sql"]
+TABLES = ["htmx_neighbors", "htmx_neighbor_state", "htmx_embeddings", "htmx_examples"]
+
+def conn_string(dbname: str) -> str:
+    return (
+        f"host={os.getenv('DB_HOST')} port={os.getenv('DB_PORT')} dbname={dbname} "
+        f"user={os.getenv('DB_USER')} password={os.getenv('DB_PASS')}"
+    )
+
+@pytest.fixture(scope="session")
+def test_database():
+    """Create a scratch database with the full schema, and drop it after the session."""
+    missing = [var for var in ["DB_HOST", "DB_PORT", "DB_USER", "DB_PASS"] if not os.getenv(var)]
+    if missing:
+        pytest.skip(f"Database tests need {', '.join(missing)}")
+
+    name = f"htmx_test_{uuid.uuid4().hex[:8]}"
+    try:
+        admin = psycopg.connect(conn_string(os.getenv("DB_NAME") or "postgres"), autocommit=True)
+    except psycopg.OperationalError as e:
+        pytest.skip(f"No database server: {e}")
+    try:
+        admin.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(name)))
+    except psycopg.Error as e:
+        admin.close()
+        pytest.skip(f"Cannot create a test database: {e}")
+
+    try:
+        with psycopg.connect(conn_string(name)) as conn:
+            for schema_file in SCHEMA_FILES:
+                conn.execute((WORKFLOW_DIR / schema_file).read_text())
+            conn.commit()
+            # Store embeddings at the providers' dimension, like embed_examples.py --update-schema
+            assert update_db_schema_for_google_ai(conn)
+        yield name
+    finally:
+        admin.execute(sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE)").format(sql.Identifier(name)))
+        admin.close()
+
+@pytest.fixture
+def db_conn(test_database):
+    """A connection to the empty scratch database, with pgvector types registered."""
+    conn = psycopg.connect(conn_string(test_database))
+    register_vector(conn)
+    conn.execute(sql.SQL("TRUNCATE {}").format(sql.SQL(", ").join(map(sql.Identifier, TABLES))))
+    conn.commit()
+    yield conn
+    conn.close()
+
+def example_record(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """A complete example with placeholder content, overridden by the given fields (which include the id)."""
+    example_id = fields["id"]
+    return {
+        "id": example_id,
+        "title": example_id.replace("-", " ").title(),
+        "category": "UI Patterns",
+        "url": f"https://htmx.org/examples/{example_id}/",
+        "description": f"The {example_id} example.",
+        "html_snippets": [],
+        "javascript_snippets": [],
+        "key_concepts": [],
+        "htmx_attributes": [],
+        "demo_explanation": "",
+        "complexity_level": "beginner",
+        "use_cases": [],
+        **fields,
+    }
+
+@pytest.fixture
+def seed_examples(db_conn):
+    """Insert examples, and optionally their embeddings by id and type, into the scratch database."""
+    def seed(
+        examples: List[Dict[str, Any]],
+        embeddings: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> None:
+        records = [example_record(example) for example in examples]
+        assert bulk_import_examples(db_conn, records, False) == len(records)
+        for example_id, vectors in (embeddings or {}).items():
+            columns = [sql.Identifier(f"{embedding_type}_embedding") for embedding_type in vectors]
+            db_conn.execute(
+                sql.SQL(
+                    "INSERT INTO htmx_embeddings (id, {columns}) VALUES (%s, {values}) "
+                    "ON CONFLICT (id) DO UPDATE SET ({columns}) = ROW({excluded})"
+                ).format(
+                    columns=sql.SQL(", ").join(columns),
+                    values=sql.SQL(", ").join(sql.Placeholder() * len(columns)),
+                    excluded=sql.SQL(", ").join(sql.SQL("EXCLUDED.{}").format(column) for column in columns),
+                ),
+                [example_id, *vectors.values()]
+            )
+        db_conn.commit()
+    return seed
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class Site:
+    """A static /examples/ tree served by http.server, which answers If-Modified-Since with 304."""
+
+    def __init__(self, root):
+        self.root = root
+        # Last-Modified only has one-second resolution, so every write moves the
+        # file time ten seconds on from a starting point in the past
+        self.clock = time.time() - 1000
+
+    def _write(self, path, text: Optional[str]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if text is not None:
+            path.write_text(text)
+        self.clock += 10
+        os.utime(path, (self.clock, self.clock))
+
+    def page(self, name: str, body: Optional[str] = None) -> None:
+        """Write an example page, or only re-date it when no body is given."""
+        html = f"<html><body><h1>{name}</h1><p>{body}</p></body></html>" if body is not None else None
+        self._write(self.root / "examples" / name / "index.html", html)
+
+    def link(self, *names: str) -> None:
+        """Write the examples index linking the given pages."""
+        links = "".join(f'<li><a href="/examples/{name}/">{name}</a></li>' for name in names)
+        self._write(self.root / "examples" / "index.html", f"<html><body><ul>{links}</ul></body></html>")
+
+@pytest.fixture
+def site(tmp_path):
+    site = Site(tmp_path / "site")
+    for name in ["click-to-edit", "delete-row", "lazy-load"]:
+        site.page(name, f"The {name} example.")
+    site.link("click-to-edit", "delete-row", "lazy-load")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=str(site.root)))
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    site.base_url = f"http://127.0.0.1:{server.server_port}"
+    site.output_dir = str(tmp_path / "examples")
+    yield site
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,132 @@
+"""Tests for the SQLite embedding cache and the in-memory tier in front of it."""
+
+import numpy as np
+import pytest
+
+import embedding_cache
+from embedding_cache import EmbeddingCache, TieredEmbeddingCache, KEYS_PER_STATEMENT, cache_key
+
+# Four float32 values, so every entry takes 16 bytes
+VECTOR_BYTES = 16
+
+class FakeClock:
+    """Stands in for the time module, so last_used and created are deterministic."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        self.now += 1
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(embedding_cache, "time", clock)
+    return clock
+
+def vector(value: float) -> list:
+    return [value] * 4
+
+def open_cache(tmp_path, **kwargs) -> EmbeddingCache:
+    return EmbeddingCache(str(tmp_path / "cache.sqlite3"), **kwargs)
+
+def test_cache_key_depends_on_model_settings_and_text():
+    key = cache_key("model", "RETRIEVAL_DOCUMENT", 768, "text")
+    assert key == cache_key("model", "RETRIEVAL_DOCUMENT", 768, "text")
+    assert key != cache_key("model", "RETRIEVAL_QUERY", 768, "text")
+    assert key != cache_key("model", "RETRIEVAL_DOCUMENT", 1536, "text")
+    assert key != cache_key("model", "RETRIEVAL_DOCUMENT", 768, "text ")
+
+def test_round_trip_and_partial_hits(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put_many({"a": vector(1.5), "b": vector(2.5)})
+
+    found = cache.get_many(["a", "missing", "b", "a"])
+    assert set(found) == {"a", "b"}
+    assert found["a"].dtype == np.float32
+    np.testing.assert_array_equal(found["b"], vector(2.5))
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+def test_entries_survive_reopening(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put_many({"a": vector(1)})
+    cache.close()
+
+    reopened = open_cache(tmp_path)
+    assert reopened.total_bytes == VECTOR_BYTES
+    np.testing.assert_array_equal(reopened.get_many(["a"])["a"], vector(1))
+
+def test_evicts_least_recently_used_first(tmp_path, clock):
+    cache = open_cache(tmp_path, max_bytes=3 * VECTOR_BYTES)
+    for key in ["a", "b", "c"]:
+        cache.put_many({key: vector(1)})
+    # Reading a makes b the least recently used entry
+    cache.get_many(["a"])
+
+    cache.put_many({"d": vector(1)})
+    # Over budget, the cache shrinks to 90% of it, which takes two victims
+    assert set(cache.get_many(["a", "b", "c", "d"])) == {"a", "d"}
+    assert cache.evictions == 2
+    assert cache.total_bytes == 2 * VECTOR_BYTES
+
+def test_expired_entries_are_misses_and_removed(tmp_path, clock):
+    cache = open_cache(tmp_path, ttl=10)
+    cache.put_many({"a": vector(1)})
+    assert "a" in cache.get_many(["a"])
+
+    clock.now += 10
+    assert cache.get_many(["a"]) == {}
+    assert cache.evictions == 1
+    assert cache.total_bytes == 0
+    assert cache.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 0
+
+def test_touching_an_entry_does_not_extend_its_ttl(tmp_path, clock):
+    cache = open_cache(tmp_path, ttl=10)
+    cache.put_many({"a": vector(1)})
+    clock.now += 5
+    assert "a" in cache.get_many(["a"])
+    clock.now += 5
+    assert cache.get_many(["a"]) == {}
+
+def test_put_many_beyond_statement_limit_keeps_size_accurate(tmp_path):
+    cache = open_cache(tmp_path)
+    keys = [f"key-{i}" for i in range(KEYS_PER_STATEMENT * 2 + 7)]
+    cache.put_many({key: vector(1) for key in keys[:KEYS_PER_STATEMENT]})
+    # Replacing entries must not count their old size twice
+    cache.put_many({key: vector(2) for key in keys})
+
+    stored = cache.conn.execute("SELECT SUM(size), COUNT(*) FROM embeddings").fetchone()
+    assert stored == (len(keys) * VECTOR_BYTES, len(keys))
+    assert cache.total_bytes == stored[0]
+    assert len(cache.get_many(keys)) == len(keys)
+
+def test_tiered_cache_serves_memory_then_disk(tmp_path):
+    persistent = open_cache(tmp_path)
+    persistent.put_many({"a": vector(1)})
+    cache = TieredEmbeddingCache(persistent, max_entries=2)
+
+    assert set(cache.get_many(["a", "b"])) == {"a"}
+    assert cache.get_many(["a"])["a"].tolist() == vector(1)
+    stats = cache.stats()
+    assert (stats["persistent_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+
+def test_tiered_cache_drops_least_recently_used_from_memory(tmp_path):
+    persistent = open_cache(tmp_path)
+    cache = TieredEmbeddingCache(persistent, max_entries=2)
+    cache.put_many({"a": vector(1), "b": vector(2)})
+    cache.get_many(["a"])
+    cache.put_many({"c": vector(3)})
+
+    assert list(cache.memory) == ["a", "c"]
+    # b is still on disk and comes back from there
+    assert "b" in cache.get_many(["b"])
+    assert cache.stats()["persistent_hits"] == 1
+
+def test_tiered_cache_works_without_persistent_tier():
+    cache = TieredEmbeddingCache(max_entries=1)
+    cache.put_many({"a": vector(1), "b": vector(2)})
+    assert set(cache.get_many(["a", "b"])) == {"b"}
+    assert cache.stats()["misses"] == 1
+    cache.close()
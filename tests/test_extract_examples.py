@@ -0,0 +1,145 @@
+"""Tests for page parsing, schema validation and the resumable extraction runner."""
+
+import json
+import os
+
+import pytest
+
+from extract_examples import (
+    parse_page, strip_tags, validate_example, process_examples, verify_extraction,
+    StubExtractor, MANIFEST_NAME, SCHEMA_FILE
+)
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+  <title>htmx ~ Examples ~ Click To Edit</title>
+  <style>body { color: red; }</style>
+  <script>var tracking = "do not index";</script>
+</head>
+<body>
+  <nav>Docs &amp; Reference</nav>
+  <h1>Click   to Edit</h1>
+  <p>The click to edit pattern provides a way to offer inline editing of a record without a refresh.</p>
+  <pre><code>&lt;div hx-target="this" hx-swap="outerHTML"&gt;
+  &lt;button hx-get="/contact/1/edit"&gt;Click To Edit&lt;/button&gt;
+&lt;/div&gt;</code></pre>
+  <p>This returns a form that can be used to edit the contact, which is swapped in place.</p>
+  <pre><code>htmx.on("htmx:afterSwap", function(evt) { console.log(evt.detail); });</code></pre>
+  <svg><text>icon label</text></svg>
+</body>
+</html>
+"""
+
+@pytest.fixture(scope="module")
+def schema():
+    with open(SCHEMA_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+@pytest.fixture
+def pages(tmp_path):
+    """Three scraped pages and an empty output directory."""
+    source_dir = tmp_path / "examples"
+    source_dir.mkdir()
+    paths = []
+    for name in ["click-to-edit", "delete-row", "lazy-load"]:
+        path = source_dir / f"{name}.html"
+        path.write_text(PAGE.replace("Click   to Edit", name.replace("-", " ").title()))
+        paths.append(str(path))
+    return paths, str(tmp_path / "processed")
+
+def test_parse_page_keeps_visible_text_headings_and_code():
+    page = parse_page(PAGE)
+    assert page["title"] == "htmx ~ Examples ~ Click To Edit"
+    assert page["headings"] == ["Click to Edit"]
+    assert page["text"].splitlines()[:2] == ["Docs & Reference", "Click to Edit"]
+    for hidden in ["color: red", "do not index", "icon label"]:
+        assert hidden not in page["text"]
+
+    html_block, javascript_block = page["code_blocks"]
+    assert html_block.startswith('<div hx-target="this" hx-swap="outerHTML">\n  <button')
+    assert javascript_block.startswith('htmx.on("htmx:afterSwap"')
+
+def test_strip_tags_returns_the_text_only():
+    assert strip_tags("<p>One <b>bold</b>\n word</p><p>Two</p><script>three()</script>") == "One bold word\nTwo"
+
+def test_stub_extractor_builds_a_valid_record(schema):
+    example = StubExtractor().extract("click-to-edit", parse_page(PAGE))
+    assert validate_example(example, schema) == []
+    assert example["title"] == "Click to Edit"
+    assert example["description"].startswith("The click to edit pattern")
+    assert example["htmx_attributes"] == ["hx-get", "hx-swap", "hx-target"]
+    assert len(example["html_snippets"]) == len(example["javascript_snippets"]) == 1
+
+def test_validate_example_reports_each_problem_with_its_path(schema):
+    example = StubExtractor().extract("click-to-edit", parse_page(PAGE))
+    del example["title"]
+    example["complexity_level"] = "expert"
+    example["html_snippets"][0]["code"] = 42
+    example["key_concepts"] = "inline editing"
+
+    assert sorted(validate_example(example, schema)) == sorted([
+        "$: missing required field 'title'",
+        "$.html_snippets[0].code: expected string, got int",
+        "$.key_concepts: expected array, got str",
+        "$.complexity_level: 'expert' is not one of ['beginner', 'intermediate', 'advanced']",
+    ])
+
+def test_validate_example_does_not_accept_booleans_as_numbers():
+    assert validate_example(True, {"type": "number"}) == ["$: expected number, got bool"]
+    assert validate_example(True, {"type": "boolean"}) == []
+    assert validate_example(1.5, {"type": "number"}) == []
+
+def test_rerun_skips_unchanged_pages(pages):
+    paths, output_dir = pages
+    first = process_examples(paths, output_dir, StubExtractor(), workers=2)
+    assert (first["extracted"], first["skipped"], first["failed"]) == (3, 0, [])
+    assert verify_extraction(output_dir) == 0
+
+    second = process_examples(paths, output_dir, StubExtractor(), workers=2)
+    assert (second["extracted"], second["skipped"]) == (0, 3)
+
+def test_rerun_extracts_changed_and_missing_outputs(pages):
+    paths, output_dir = pages
+    process_examples(paths, output_dir, StubExtractor())
+
+    with open(paths[0], "a", encoding="utf-8") as f:
+        f.write("<p>An added paragraph.</p>")
+    os.unlink(os.path.join(output_dir, "lazy-load.json"))
+
+    report = process_examples(paths, output_dir, StubExtractor())
+    assert (report["extracted"], report["skipped"]) == (2, 1)
+
+    assert process_examples(paths, output_dir, StubExtractor(), force=True)["extracted"] == 3
+
+def test_changed_settings_or_corrupt_manifest_extract_everything(pages):
+    paths, output_dir = pages
+    process_examples(paths, output_dir, StubExtractor())
+
+    class RenamedExtractor(StubExtractor):
+        name = "stub-v2"
+
+    assert process_examples(paths, output_dir, RenamedExtractor())["extracted"] == 3
+
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w") as f:
+        f.write("{not json")
+    assert process_examples(paths, output_dir, RenamedExtractor())["extracted"] == 3
+
+def test_invalid_results_are_not_recorded_and_retried(pages):
+    paths, output_dir = pages
+
+    class FlakyExtractor(StubExtractor):
+        def extract(self, example_id, page):
+            example = super().extract(example_id, page)
+            if example_id == "delete-row":
+                del example["url"]
+            return example
+
+    report = process_examples(paths, output_dir, FlakyExtractor())
+    assert (report["extracted"], report["failed"]) == (2, ["delete-row"])
+    assert not os.path.exists(os.path.join(output_dir, "delete-row.json"))
+    with open(os.path.join(output_dir, MANIFEST_NAME)) as f:
+        assert sorted(json.load(f)) == ["click-to-edit", "lazy-load"]
+
+    report = process_examples(paths, output_dir, StubExtractor())
+    assert (report["extracted"], report["skipped"], report["failed"]) == (1, 2, [])
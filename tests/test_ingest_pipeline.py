@@ -0,0 +1,177 @@
+"""Tests for the streaming scrape, extract, upload and embed pipeline."""
+
+import asyncio
+import argparse
+from typing import List, Optional
+
+import numpy as np
+import psycopg
+import pytest
+
+import embed_examples
+from ingest_pipeline import StageStats, stage_worker, run_stage, embed_examples_by_id, run_pipeline
+from embedding_providers import EmbeddingProvider, RateLimiter, create_embedding_provider
+
+PAGES = ["click-to-edit", "delete-row", "lazy-load"]
+
+class FailingProvider(EmbeddingProvider):
+    name = "failing"
+    max_batch_size = 10
+
+    def embed(
+        self, texts: List[str], task_type: str = "RETRIEVAL_DOCUMENT", rate_limiter: Optional[RateLimiter] = None
+    ) -> List[np.ndarray]:
+        raise RuntimeError("provider unavailable")
+
+def items(*ids):
+    return [{"id": example_id} for example_id in ids]
+
+def run_worker(inbox_items, handle, batch_size, outbox=None):
+    async def run():
+        inbox = asyncio.Queue()
+        for item in inbox_items:
+            inbox.put_nowait(item)
+        stats = StageStats("test", 1)
+        await stage_worker(stats, inbox, outbox, handle, batch_size)
+        return stats, inbox
+    return asyncio.run(run())
+
+def test_stage_stats_report():
+    stats = StageStats("embed", 2)
+    assert stats.report()["items_per_second"] == 0.0
+
+    stats.started_at = 10.0
+    stats.finished_at = 14.0
+    stats.completed = 8
+    stats.busy_seconds = 3.456
+    report = stats.report()
+    assert (report["stage"], report["workers"]) == ("embed", 2)
+    assert (report["elapsed_seconds"], report["busy_seconds"], report["items_per_second"]) == (4.0, 3.46, 2.0)
+
+def test_stage_worker_batches_what_is_waiting_and_stops_at_none():
+    batches = []
+
+    async def handle(batch):
+        batches.append([item["id"] for item in batch])
+        return batch
+
+    stats, inbox = run_worker([*items("a", "b", "c", "d", "e"), None, *items("f")], handle, 2)
+    assert batches == [["a", "b"], ["c", "d"], ["e"]]
+    assert (stats.completed, stats.batches, stats.failed) == (5, 3, 0)
+    # Items after the stop marker are left for whoever reads the queue next
+    assert inbox.get_nowait() == {"id": "f"}
+
+def test_stage_worker_drops_a_failed_batch_and_carries_on():
+    async def handle(batch):
+        if any(item["id"] == "b" for item in batch):
+            raise ValueError("bad item")
+        return batch
+
+    async def run():
+        outbox = asyncio.Queue()
+        inbox = asyncio.Queue()
+        for item in [*items("a", "b", "c"), None]:
+            inbox.put_nowait(item)
+        stats = StageStats("test", 1)
+        await stage_worker(stats, inbox, outbox, handle, 1)
+        return stats, [outbox.get_nowait()["id"] for _ in range(outbox.qsize())]
+
+    stats, passed_on = asyncio.run(run())
+    assert passed_on == ["a", "c"]
+    assert (stats.completed, stats.failed, stats.batches) == (2, 1, 3)
+
+def test_run_stage_stops_every_worker_of_the_next_stage():
+    async def handle(batch):
+        return batch
+
+    async def run():
+        inbox, outbox = asyncio.Queue(), asyncio.Queue()
+        for item in [*items("a", "b"), None, None]:
+            inbox.put_nowait(item)
+        await run_stage(StageStats("test", 2), inbox, outbox, [handle, handle], 1, 3)
+        return [outbox.get_nowait() for _ in range(outbox.qsize())]
+
+    passed_on = asyncio.run(run())
+    assert sorted(item["id"] for item in passed_on[:2]) == ["a", "b"]
+    assert passed_on[2:] == [None, None, None]
+
+@pytest.fixture
+def embed_db(seed_examples, db_conn):
+    seed_examples([
+        {"id": example_id, "description": f"The {example_id} example.", "key_concepts": [example_id]}
+        for example_id in PAGES
+    ])
+    embed_examples.ensure_source_hash_columns(db_conn)
+    db_conn.commit()
+    return db_conn
+
+def test_embed_examples_by_id_writes_only_missing_or_stale_embeddings(embed_db):
+    provider = create_embedding_provider("hashing")
+    rate_limiter = RateLimiter(100)
+
+    assert embed_examples_by_id(embed_db, provider, PAGES[:2], rate_limiter, []) == 2
+    assert embed_db.execute("SELECT count(*) FROM htmx_embeddings").fetchone()[0] == 2
+    assert embed_examples_by_id(embed_db, provider, PAGES, rate_limiter, []) == 1
+    assert embed_examples_by_id(embed_db, provider, PAGES, rate_limiter, []) == 0
+
+    embed_db.execute("UPDATE htmx_examples SET title = 'Renamed' WHERE id = 'lazy-load'")
+    embed_db.commit()
+    assert embed_examples_by_id(embed_db, provider, PAGES, rate_limiter, []) == 1
+
+def test_embed_examples_by_id_leaves_no_transaction_open_when_the_provider_fails(embed_db):
+    with pytest.raises(Exception):
+        embed_examples_by_id(embed_db, FailingProvider(), PAGES, RateLimiter(100), [])
+    assert embed_db.info.transaction_status == psycopg.pq.TransactionStatus.IDLE
+    assert embed_db.execute("SELECT count(*) FROM htmx_embeddings").fetchone()[0] == 0
+
+def pipeline_args(site, tmp_path):
+    return argparse.Namespace(
+        base_url=site.base_url,
+        examples_dir=site.output_dir,
+        output_dir=str(tmp_path / "processed"),
+        all_pages=False,
+        min_examples=0,
+        extractor="stub",
+        model=None,
+        provider="hashing",
+        requests_per_second=100,
+        scrape_concurrency=4,
+        extract_workers=2,
+        upload_workers=1,
+        embed_workers=2,
+        upload_batch=20,
+        embed_batch=10,
+        queue_size=4,
+        report_interval=60,
+    )
+
+def test_pipeline_ingests_new_pages_and_skips_them_on_rerun(site, tmp_path, test_database, db_conn, monkeypatch):
+    # The pipeline opens its own connections to the scratch database
+    monkeypatch.setattr(embed_examples, "DB_NAME", test_database)
+    # Reads here must not hold locks that the next run's schema check waits for
+    db_conn.autocommit = True
+    args = pipeline_args(site, tmp_path)
+
+    report = asyncio.run(run_pipeline(args))
+    assert report["scrape"]["new"] == PAGES
+    stages = {stage["stage"]: stage for stage in report["stages"]}
+    assert [stages[name]["completed"] for name in ["scrape", "extract", "upload", "embed"]] == [3, 3, 3, 3]
+    assert sum(stage["failed"] for stage in stages.values()) == 0
+    assert report["latency_seconds"]["items"] == 3
+    for table in ["htmx_examples", "htmx_embeddings"]:
+        assert db_conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0] == 3
+
+    report = asyncio.run(run_pipeline(args))
+    assert report["scrape"]["unchanged"] == 3
+    assert report["scrape"]["new"] == report["scrape"]["updated"] == []
+    stages = {stage["stage"]: stage for stage in report["stages"]}
+    assert stages["scrape"]["skipped"] == 3
+    assert [stages[name]["completed"] for name in ["scrape", "extract", "upload", "embed"]] == [0, 0, 0, 0]
+
+    # A changed page goes through every stage on its own, and a new description is embedded again
+    site.page("delete-row", "The delete-row example now explains how a confirmed row is removed.")
+    report = asyncio.run(run_pipeline(args))
+    assert report["scrape"]["updated"] == ["delete-row"]
+    stages = {stage["stage"]: stage for stage in report["stages"]}
+    assert [stages[name]["completed"] for name in ["scrape", "extract", "upload", "embed"]] == [1, 1, 1, 1]
+    assert stages["embed"]["skipped"] == 0
@@ -0,0 +1,151 @@
+"""Tests for the precomputed nearest-neighbour graph and its incremental refresh."""
+
+import numpy as np
+import psycopg
+import pytest
+from pgvector.psycopg import register_vector
+
+from build_neighbor_graph import build_graph, load_graph, load_state, top_k_neighbors
+from embedding_providers import DIMENSION
+
+K = 3
+
+def normalized(matrix: np.ndarray) -> np.ndarray:
+    return (matrix / np.linalg.norm(matrix, axis=1, keepdims=True)).astype(np.float32)
+
+def brute_force_graph(vectors: dict, k: int) -> dict:
+    """Exact top-k neighbour ids of every example, best first."""
+    ids = sorted(vectors)
+    matrix = normalized(np.array([vectors[example_id] for example_id in ids]))
+    scores = matrix @ matrix.T
+    np.fill_diagonal(scores, -np.inf)
+    return {
+        example_id: [ids[j] for j in np.argsort(-scores[i], kind="stable")[:k]]
+        for i, example_id in enumerate(ids)
+    }
+
+def neighbor_ids(graph: dict) -> dict:
+    return {example_id: [neighbor for neighbor, _ in neighbors] for example_id, neighbors in graph.items()}
+
+def set_content_embedding(conn, example_id: str, vector) -> None:
+    conn.execute(
+        "INSERT INTO htmx_embeddings (id, content_embedding) VALUES (%s, %s) "
+        "ON CONFLICT (id) DO UPDATE SET content_embedding = EXCLUDED.content_embedding",
+        (example_id, vector)
+    )
+
+@pytest.fixture
+def embedded_db(seed_examples, db_conn):
+    rng = np.random.default_rng(3)
+    vectors = {f"example-{i:02d}": rng.normal(size=DIMENSION).astype(np.float32) for i in range(12)}
+    # example-12 has no embedding yet
+    seed_examples(
+        [{"id": example_id} for example_id in [*vectors, "example-12"]],
+        {example_id: {"content": vector} for example_id, vector in vectors.items()}
+    )
+    # Like the script's own connection; each build runs its own transactions
+    db_conn.autocommit = True
+    return db_conn, vectors, rng
+
+def test_top_k_neighbors_excludes_self_and_ranks_exactly():
+    rng = np.random.default_rng(0)
+    matrix = normalized(rng.normal(size=(20, 16)))
+    rows = np.arange(20)
+
+    indices, similarities = top_k_neighbors(matrix, rows, 4)
+    scores = matrix @ matrix.T
+    np.fill_diagonal(scores, -np.inf)
+    np.testing.assert_array_equal(indices, np.argsort(-scores, axis=1, kind="stable")[:, :4])
+    np.testing.assert_allclose(similarities, np.take_along_axis(scores, indices, axis=1), rtol=1e-6)
+
+    # One row per block gives the same answer
+    blocked = top_k_neighbors(matrix, rows, 4, block_mb=0)
+    np.testing.assert_array_equal(blocked[0], indices)
+
+def test_top_k_neighbors_clamps_k_to_the_other_rows():
+    matrix = normalized(np.eye(3) + 0.1)
+    indices, _ = top_k_neighbors(matrix, np.arange(3), 10)
+    assert indices.shape == (3, 2)
+    assert all(i not in row for i, row in enumerate(indices))
+
+def test_full_build_stores_exact_neighbors(embedded_db):
+    conn, vectors, _ = embedded_db
+    report = build_graph(conn, "content", K)
+
+    assert (report["mode"], report["rows"], report["recomputed"]) == ("full", 12, 12)
+    assert neighbor_ids(load_graph(conn, "content")) == brute_force_graph(vectors, K)
+    assert load_state(conn, "content")["k"] == K
+
+def test_incremental_refresh_equals_full_rebuild(embedded_db):
+    conn, vectors, rng = embedded_db
+    build_graph(conn, "content", K)
+
+    # Move two embeddings, embed a new example and drop another one's embedding
+    for example_id in ["example-02", "example-07", "example-12"]:
+        vectors[example_id] = rng.normal(size=DIMENSION).astype(np.float32)
+        set_content_embedding(conn, example_id, vectors[example_id])
+    del vectors["example-05"]
+    set_content_embedding(conn, "example-05", None)
+
+    report = build_graph(conn, "content", K)
+    assert report["mode"] == "incremental"
+    assert (report["changed"], report["removed"]) == (3, 1)
+    assert report["recomputed"] < len(vectors)
+    incremental = load_graph(conn, "content")
+
+    build_graph(conn, "content", K, full=True)
+    full = load_graph(conn, "content")
+    assert neighbor_ids(incremental) == neighbor_ids(full) == brute_force_graph(vectors, K)
+    for example_id, neighbors in full.items():
+        np.testing.assert_allclose(
+            [similarity for _, similarity in incremental[example_id]],
+            [similarity for _, similarity in neighbors],
+            rtol=1e-5
+        )
+
+def test_refresh_without_changes_rewrites_nothing(embedded_db):
+    conn, _, _ = embedded_db
+    build_graph(conn, "content", K)
+    report = build_graph(conn, "content", K)
+    assert (report["mode"], report["recomputed"], report["merged"]) == ("unchanged", 0, 0)
+
+def test_changing_k_forces_a_full_build(embedded_db):
+    conn, vectors, _ = embedded_db
+    build_graph(conn, "content", K)
+    report = build_graph(conn, "content", K + 2)
+    assert report["mode"] == "full"
+    assert neighbor_ids(load_graph(conn, "content")) == brute_force_graph(vectors, K + 2)
+
+def test_write_in_flight_during_a_build_is_picked_up_next_time(embedded_db):
+    conn, vectors, rng = embedded_db
+    build_graph(conn, "content", K)
+
+    # A writer whose transaction started before the build commits after it
+    writer = psycopg.connect(conn.info.dsn, password=conn.info.password)
+    register_vector(writer)
+    vectors["example-04"] = rng.normal(size=DIMENSION).astype(np.float32)
+    writer.execute(
+        "UPDATE htmx_embeddings SET content_embedding = %s WHERE id = %s", (vectors["example-04"], "example-04")
+    )
+    build_graph(conn, "content", K)
+    writer.commit()
+    writer.close()
+
+    report = build_graph(conn, "content", K)
+    assert report["changed"] == 1
+    assert neighbor_ids(load_graph(conn, "content")) == brute_force_graph(vectors, K)
+
+def test_find_similar_examples_reads_the_graph_only_while_it_is_fresh(embedded_db):
+    conn, vectors, rng = embedded_db
+    build_graph(conn, "content", K)
+    # Mark one stored similarity so that answers served from the graph are recognisable
+    conn.execute("UPDATE htmx_neighbors SET similarity = 0.123 WHERE id = 'example-00' AND rank = 1")
+
+    def similarities():
+        rows = conn.execute("SELECT similarity FROM api.find_similar_examples('example-00', 'content', %s)", (K,))
+        return [similarity for (similarity,) in rows]
+
+    assert similarities()[0] == pytest.approx(0.123)
+
+    set_content_embedding(conn, "example-09", rng.normal(size=DIMENSION).astype(np.float32))
+    assert 0.123 not in similarities()
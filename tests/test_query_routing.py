@@ -0,0 +1,89 @@
+"""Tests for routing attribute and keyword queries to the embedding-free lexical lookup."""
+
+import pytest
+
+from query_htmx import route_tokens, concept_forms, classify_query, lexical_lookup
+
+EXAMPLES = [
+    {
+        "id": "active-search",
+        "htmx_attributes": ["hx-post", "hx-target", "hx-trigger"],
+        "key_concepts": ["Active Search", "debouncing"],
+    },
+    {
+        "id": "sortable",
+        "category": "Advanced Examples",
+        "htmx_attributes": ["hx-post", "hx-trigger"],
+        "key_concepts": ["sortable", "drag and drop"],
+    },
+    {
+        "id": "click-to-edit",
+        "htmx_attributes": ["hx-get", "hx-swap", "hx-target"],
+        "key_concepts": ["inline editing"],
+    },
+    {
+        "id": "delete-row",
+        "htmx_attributes": ["hx-confirm", "hx-delete", "hx-swap", "hx-target"],
+        "key_concepts": ["row deletion", "confirmation"],
+    },
+    {
+        "id": "keyboard-shortcuts",
+        "category": "Advanced Examples",
+        "htmx_attributes": ["hx-on:click", "hx-trigger"],
+        "key_concepts": ["keyboard events"],
+    },
+]
+
+@pytest.fixture
+def routed_db(seed_examples, db_conn):
+    seed_examples(EXAMPLES)
+    return db_conn
+
+def test_route_tokens_drop_stop_words_and_keep_attribute_names():
+    assert route_tokens("How to use HX-Swap with the hx-on:click example") == ["how", "hx-swap", "hx-on:click"]
+    assert route_tokens("the htmx example") == []
+
+def test_concept_forms_trim_punctuation_and_fold_case():
+    assert concept_forms('  "Drag  and Drop?" ') == ["Drag and Drop", "drag and drop"]
+    assert concept_forms("sortable") == ["sortable"]
+
+@pytest.mark.parametrize("query, route", [
+    ("hx-swap", "attribute"),
+    ("HX-Swap hx-confirm", "attribute"),
+    ("hx-on:click", "attribute"),
+    # No single example uses both attributes
+    ("hx-swap hx-trigger", None),
+    ("hx-nonexistent", None),
+    ("Drag and Drop?", "concept"),
+    ("sortable", "concept"),
+    # Concepts also match as typed
+    ("Active Search", "concept"),
+    ("how to drag and drop rows", None),
+    ("?", None),
+])
+def test_classify_query(routed_db, query, route):
+    assert classify_query(routed_db, query) == route
+
+def test_attribute_lookup_returns_every_exact_match(routed_db):
+    results = lexical_lookup(routed_db, "hx-swap", "attribute", limit=5)
+    assert sorted(result["id"] for result in results) == ["click-to-edit", "delete-row"]
+
+    results = lexical_lookup(routed_db, "hx-post hx-target", "attribute", limit=5)
+    assert [result["id"] for result in results] == ["active-search"]
+
+def test_attribute_lookup_respects_limit_and_filters(routed_db):
+    results = lexical_lookup(routed_db, "hx-trigger", "attribute", limit=1)
+    assert len(results) == 1
+    assert "hx-trigger" in results[0]["htmx_attributes"]
+
+    results = lexical_lookup(routed_db, "hx-trigger", "attribute", limit=5, category_filter="Advanced Examples")
+    assert sorted(result["id"] for result in results) == ["keyboard-shortcuts", "sortable"]
+
+def test_concept_lookup_matches_whole_key_concepts(routed_db):
+    results = lexical_lookup(routed_db, "Drag and drop", "concept", limit=5, fields=["id", "title"])
+    assert results == [{"id": "sortable", "title": "Sortable"}]
+
+def test_lookup_without_exact_matches_falls_back(routed_db):
+    assert lexical_lookup(routed_db, "hx-swap", "attribute", limit=5, category_filter="Advanced Examples") is None
+    # "row" alone matches "row deletion" lexically, but not as a whole key concept
+    assert lexical_lookup(routed_db, "row", "concept", limit=5) is None
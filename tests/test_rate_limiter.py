@@ -0,0 +1,58 @@
+"""Tests for the token bucket that paces embedding API requests."""
+
+import time
+import threading
+
+import pytest
+
+from embedding_providers import RateLimiter
+
+def timed(fn) -> float:
+    start = time.monotonic()
+    fn()
+    return time.monotonic() - start
+
+def test_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        RateLimiter(0)
+
+def test_burst_is_free_then_requests_are_paced():
+    limiter = RateLimiter(rate=20, burst=3)
+    assert timed(lambda: [limiter.acquire() for _ in range(3)]) < 0.02
+    assert timed(limiter.acquire) >= 0.04
+
+def test_concurrent_callers_share_the_rate():
+    limiter = RateLimiter(rate=50, burst=1)
+    limiter.acquire()
+
+    def worker():
+        for _ in range(5):
+            limiter.acquire()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 20 more requests at 50/s cannot finish in much under 0.4s, however they interleave
+    assert time.monotonic() - start >= 0.35
+
+def test_throttle_halves_rate_and_pauses_callers():
+    limiter = RateLimiter(rate=100, min_rate=30)
+    limiter.throttle(0.1)
+    assert limiter.rate == 50
+    assert timed(limiter.acquire) >= 0.09
+
+    limiter.throttle(0)
+    assert limiter.rate == 30
+
+def test_recover_climbs_back_to_the_configured_rate():
+    limiter = RateLimiter(rate=10)
+    limiter.throttle(0)
+    for _ in range(9):
+        limiter.recover()
+    assert 5 < limiter.rate < 10
+    for _ in range(100):
+        limiter.recover()
+    assert limiter.rate == 10
@@ -0,0 +1,107 @@
+"""Tests for the conditional-fetch scraper against a local http.server copy of the examples site."""
+
+import os
+import json
+import asyncio
+
+from scrape_htmx import scrape_examples, find_examples, load_manifest, MANIFEST_NAME, CHANGES_NAME
+
+def scrape(site, **kwargs):
+    return asyncio.run(scrape_examples(site.base_url, site.output_dir, concurrency=4, min_examples=0, **kwargs))
+
+def ids(records):
+    return [record["id"] for record in records]
+
+def test_find_examples_accepts_relative_and_absolute_links():
+    html = (
+        '<a href="/examples/click-to-edit/">Click</a><a href="https://htmx.org/examples/lazy-load/">Lazy</a>'
+        '<a href="/examples/click-to-edit/">Again</a><a href="/docs/">Docs</a>'
+    )
+    assert find_examples(html, "https://htmx.org") == ["click-to-edit", "lazy-load"]
+
+def test_load_manifest_treats_missing_and_corrupt_files_as_empty(tmp_path):
+    path = tmp_path / MANIFEST_NAME
+    assert load_manifest(str(path)) == {"pages": {}}
+    path.write_text("{broken")
+    assert load_manifest(str(path)) == {"pages": {}}
+    path.write_text(json.dumps({"base_url": "http://example.test"}))
+    assert load_manifest(str(path)) == {"base_url": "http://example.test", "pages": {}}
+
+def test_first_run_downloads_every_page(site):
+    report = scrape(site)
+    assert ids(report["new"]) == ["click-to-edit", "delete-row", "lazy-load"]
+    assert report["updated"] == report["unchanged"] == report["failed"] == report["removed"] == []
+
+    with open(os.path.join(site.output_dir, "lazy-load.html")) as f:
+        assert "The lazy-load example." in f.read()
+    manifest = load_manifest(os.path.join(site.output_dir, MANIFEST_NAME))
+    assert sorted(manifest["pages"]) == ["click-to-edit", "delete-row", "lazy-load"]
+    assert all(entry["last_modified"] and entry["sha256"] for entry in manifest["pages"].values())
+
+def test_second_run_reports_every_page_unchanged(site):
+    scrape(site)
+    manifest_path = os.path.join(site.output_dir, MANIFEST_NAME)
+    first_pages = load_manifest(manifest_path)["pages"]
+    seen = []
+
+    async def on_change(record):
+        seen.append(record["id"])
+
+    report = scrape(site, on_change=on_change)
+    assert ids(report["unchanged"]) == ["click-to-edit", "delete-row", "lazy-load"]
+    assert report["new"] == report["updated"] == []
+    assert seen == []
+    # Every page was answered with 304, which keeps its manifest entry as it was
+    assert load_manifest(manifest_path)["pages"] == first_pages
+
+    with open(os.path.join(site.output_dir, CHANGES_NAME)) as f:
+        assert json.load(f)["unchanged"] == report["unchanged"]
+
+    report = scrape(site, on_change=on_change, include_unchanged=True)
+    assert sorted(seen) == ["click-to-edit", "delete-row", "lazy-load"]
+
+def test_only_changed_pages_are_written_and_reported(site):
+    scrape(site)
+    site.page("delete-row", "The delete-row example, rewritten.")
+    # Re-dated but identical content answers 200 and is recognised by its hash
+    site.page("lazy-load")
+    seen = []
+
+    async def on_change(record):
+        seen.append((record["id"], record["status"]))
+
+    report = scrape(site, on_change=on_change)
+    assert ids(report["updated"]) == ["delete-row"]
+    assert ids(report["unchanged"]) == ["click-to-edit", "lazy-load"]
+    assert seen == [("delete-row", "updated")]
+    with open(os.path.join(site.output_dir, "delete-row.html")) as f:
+        assert "rewritten" in f.read()
+
+def test_deleted_local_copy_is_downloaded_again(site):
+    scrape(site)
+    os.unlink(os.path.join(site.output_dir, "click-to-edit.html"))
+    report = scrape(site)
+    assert ids(report["updated"]) == ["click-to-edit"]
+    assert os.path.exists(os.path.join(site.output_dir, "click-to-edit.html"))
+
+def test_unlinked_pages_are_reported_removed_once(site):
+    scrape(site)
+    site.link("click-to-edit", "delete-row")
+
+    report = scrape(site)
+    assert report["removed"] == ["lazy-load"]
+    assert "lazy-load" not in load_manifest(os.path.join(site.output_dir, MANIFEST_NAME))["pages"]
+    # The downloaded file is kept
+    assert os.path.exists(os.path.join(site.output_dir, "lazy-load.html"))
+    assert scrape(site)["removed"] == []
+
+def test_failed_pages_are_not_recorded_and_retried(site):
+    site.link("click-to-edit", "delete-row", "lazy-load", "missing-page")
+    report = scrape(site)
+    assert [(record["id"], record["error"]) for record in report["failed"]] == [("missing-page", "HTTP 404")]
+    assert "missing-page" not in load_manifest(os.path.join(site.output_dir, MANIFEST_NAME))["pages"]
+
+    site.page("missing-page", "Now it exists.")
+    report = scrape(site)
+    assert ids(report["new"]) == ["missing-page"]
+    assert report["failed"] == []
@@ -0,0 +1,178 @@
+"""Tests for the long-running search service: single-flight de-duplication and the HTTP endpoints."""
+
+import json
+import time
+import threading
+import urllib.request
+from urllib.error import HTTPError
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from embedding_providers import EmbeddingProvider
+from query_htmx import SingleFlight, SearchService, SearchRequestHandler
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("Condition not reached")
+        time.sleep(0.005)
+
+def run_concurrently(count: int, fn):
+    """Call fn from count threads, returning each thread's result or exception."""
+    results = [None] * count
+
+    def worker(i):
+        try:
+            results[i] = fn()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+def test_concurrent_callers_share_one_execution():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return {"answer": 42}
+
+    threads, results = run_concurrently(5, lambda: flights.do("key", slow))
+    wait_for(lambda: flights.shared == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert (flights.executed, flights.shared) == (1, 4)
+
+def test_followers_receive_the_leaders_exception():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError("backend down")
+
+    threads, results = run_concurrently(3, lambda: flights.do("key", failing))
+    wait_for(lambda: flights.shared == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+def test_finished_calls_and_other_keys_run_again():
+    flights = SingleFlight()
+    assert flights.do("a", lambda: 1) == 1
+    assert flights.do("a", lambda: 2) == 2
+    assert flights.do("b", lambda: 3) == 3
+    assert flights.executed == 3
+    assert flights.calls == {}
+
+class SlowProvider(EmbeddingProvider):
+    """Counts embed() calls and blocks each one until released."""
+
+    name = "slow"
+    model = "slow-test"
+    dimension = 4
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def embed(self, texts, task_type="RETRIEVAL_DOCUMENT", rate_limiter=None):
+        self.calls += 1
+        self.release.wait(5)
+        return [np.ones(self.dimension, dtype=np.float32) for _ in texts]
+
+def test_service_embeds_identical_queries_once():
+    provider = SlowProvider()
+    service = SearchService(None, provider)
+
+    # Queries that only differ in case and spacing normalize to the same key
+    queries = iter(["Lazy loading", "lazy  loading", "LAZY LOADING"])
+    lock = threading.Lock()
+
+    def embed():
+        with lock:
+            query = next(queries)
+        return service.embed(query)
+
+    threads, results = run_concurrently(3, embed)
+    wait_for(lambda: service.flights.shared == 2)
+    provider.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert provider.calls == 1
+    assert all(np.array_equal(result, results[0]) for result in results)
+
+class RecordingService:
+    """Stands in for SearchService and records what the handler passed on."""
+
+    def __init__(self):
+        self.requests = []
+
+    def search(self, *args):
+        self.requests.append(args)
+        return [{"id": "lazy-load", "similarity": 0.9}]
+
+    def health(self):
+        return {"status": "healthy"}
+
+@pytest.fixture(scope="module")
+def base_url():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), SearchRequestHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture
+def server(base_url, monkeypatch):
+    service = RecordingService()
+    monkeypatch.setattr(SearchRequestHandler, "service", service)
+    return base_url, service
+
+def get(url: str):
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, json.load(response)
+    except HTTPError as e:
+        return e.code, json.load(e)
+
+def test_search_endpoint_passes_parsed_parameters(server):
+    base_url, service = server
+    status, body = get(f"{base_url}/search?q=lazy+loading&limit=3&complexity=beginner&embedding_type=title")
+    assert status == 200
+    assert body == [{"id": "lazy-load", "similarity": 0.9}]
+    assert service.requests[0][:5] == ("lazy loading", "title", 3, None, "beginner")
+
+@pytest.mark.parametrize("query, error", [
+    ("", 'Query parameter "q" is required'),
+    ("q=x&limit=0", 'Query parameter "limit" must be positive'),
+    ("q=x&limit=abc", 'Query parameter "limit" must be an integer'),
+    ("q=x&complexity=expert", "Invalid complexity: expert"),
+    ("q=x&embedding_type=code", "Invalid embedding_type: code"),
+])
+def test_invalid_parameters_are_rejected(server, query, error):
+    base_url, service = server
+    status, body = get(f"{base_url}/search?{query}")
+    assert (status, body["error"]) == (400, error)
+    assert service.requests == []
+
+def test_health_and_unknown_endpoints(server):
+    base_url, _ = server
+    assert get(f"{base_url}/health") == (200, {"status": "healthy"})
+    assert get(f"{base_url}/nope")[0] == 404
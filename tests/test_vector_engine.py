@@ -0,0 +1,186 @@
+"""Tests for the in-process NumPy search backend over embedding snapshots."""
+
+import json
+
+import numpy as np
+import pytest
+
+from vector_engine import VectorSearchEngine
+from embedding_providers import DIMENSION
+from vector_snapshot import export_snapshot, SNAPSHOT_FORMAT, SNAPSHOT_VERSION, EMBEDDING_TYPES, EXAMPLE_FIELDS
+
+ROWS = 30
+SNAPSHOT_DIMENSION = 8
+CATEGORIES = ["UI Patterns", "Dialog Examples", "Advanced Examples"]
+COMPLEXITIES = ["beginner", "intermediate", "advanced"]
+
+def write_snapshot(path, examples, matrices, present) -> None:
+    """Write a snapshot directory the way export_snapshot lays it out, without a database."""
+    for embedding_type, matrix in matrices.items():
+        np.save(path / f"{embedding_type}.npy", matrix.astype(np.float32))
+    np.save(path / "present.npy", present)
+    (path / "examples.json").write_text(json.dumps(examples))
+    (path / "embeddings.json").write_text(json.dumps([None] * len(examples)))
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "count": len(examples),
+        "dimension": SNAPSHOT_DIMENSION,
+        "embedding_types": EMBEDDING_TYPES,
+    }
+    (path / "manifest.json").write_text(json.dumps(manifest))
+
+@pytest.fixture
+def corpus(tmp_path):
+    rng = np.random.default_rng(7)
+    examples = [
+        {
+            **{field: None for field in EXAMPLE_FIELDS},
+            "id": f"example-{i:02d}",
+            "title": f"Example {i}",
+            "category": CATEGORIES[i % 3],
+            "complexity_level": COMPLEXITIES[i % 2],
+        }
+        for i in range(ROWS)
+    ]
+    matrices = {t: rng.normal(size=(ROWS, SNAPSHOT_DIMENSION)) for t in EMBEDDING_TYPES}
+    present = np.ones((ROWS, len(EMBEDDING_TYPES)), dtype=bool)
+    # A few rows were never embedded for some types
+    for row, type_index in [(3, 0), (11, 0), (4, 1), (20, 3)]:
+        present[row, type_index] = False
+        matrices[EMBEDDING_TYPES[type_index]][row] = 0
+    write_snapshot(tmp_path, examples, matrices, present)
+    return tmp_path, examples, matrices, present, rng
+
+def cosine(matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+    # Rows without an embedding are all zeros; their NaN scores are never looked at
+    with np.errstate(invalid="ignore"):
+        return matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+
+def brute_force(examples, matrix, present, query, limit, predicate=lambda example: True):
+    scores = cosine(matrix, query)
+    ranked = sorted(
+        (i for i in range(len(examples)) if present[i] and predicate(examples[i])),
+        key=lambda i: -scores[i]
+    )
+    return [(examples[i]["id"], scores[i]) for i in ranked[:limit]]
+
+def ids_and_scores(results, score="similarity"):
+    return [(result["id"], result[score]) for result in results]
+
+def assert_same_ranking(actual, expected):
+    assert [example_id for example_id, _ in actual] == [example_id for example_id, _ in expected]
+    np.testing.assert_allclose([s for _, s in actual], [s for _, s in expected], rtol=1e-5, atol=1e-6)
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_vector_search_matches_brute_force(corpus, mmap):
+    path, examples, matrices, present, rng = corpus
+    engine = VectorSearchEngine(str(path), mmap=mmap)
+    query = rng.normal(size=SNAPSHOT_DIMENSION)
+
+    for type_index, embedding_type in enumerate(EMBEDDING_TYPES):
+        results = engine.vector_search(query, embedding_type, 7)
+        expected = brute_force(examples, matrices[embedding_type], present[:, type_index], query, 7)
+        assert_same_ranking(ids_and_scores(results), expected)
+
+def test_results_have_the_sql_functions_fields(corpus):
+    path, _, _, _, rng = corpus
+    result = VectorSearchEngine(str(path)).vector_search(rng.normal(size=SNAPSHOT_DIMENSION))[0]
+    assert list(result) == EXAMPLE_FIELDS + ["similarity"]
+    assert isinstance(result["similarity"], float)
+
+def test_rows_without_an_embedding_are_never_ranked(corpus):
+    path, _, _, _, rng = corpus
+    results = VectorSearchEngine(str(path)).vector_search(rng.normal(size=SNAPSHOT_DIMENSION), "content", ROWS)
+    assert len(results) == ROWS - 2
+    assert {"example-03", "example-11"}.isdisjoint(result["id"] for result in results)
+
+def test_filters_restrict_candidates(corpus):
+    path, examples, matrices, present, rng = corpus
+    engine = VectorSearchEngine(str(path))
+    query = rng.normal(size=SNAPSHOT_DIMENSION)
+
+    results = engine.vector_search(query, "title", ROWS, "Dialog Examples", "intermediate")
+    expected = brute_force(
+        examples, matrices["title"], present[:, 1], query, ROWS,
+        lambda example: example["category"] == "Dialog Examples" and example["complexity_level"] == "intermediate"
+    )
+    assert_same_ranking(ids_and_scores(results), expected)
+    assert engine.vector_search(query, "title", 5, "No Such Category") == []
+
+def test_unknown_embedding_type_falls_back_to_content(corpus):
+    path, _, _, _, rng = corpus
+    engine = VectorSearchEngine(str(path))
+    query = rng.normal(size=SNAPSHOT_DIMENSION)
+    assert engine.vector_search(query, "code") == engine.vector_search(query, "content")
+
+def test_batched_search_equals_single_searches(corpus):
+    path, _, _, _, rng = corpus
+    engine = VectorSearchEngine(str(path))
+    queries = rng.normal(size=(4, SNAPSHOT_DIMENSION))
+    batched = engine.vector_search_many(queries, "description", 6, "UI Patterns")
+    for results, query in zip(batched, queries):
+        single = engine.vector_search(query, "description", 6, "UI Patterns")
+        assert_same_ranking(ids_and_scores(results), ids_and_scores(single))
+
+def test_multi_vector_search_ranks_by_weighted_similarity(corpus):
+    path, examples, matrices, present, rng = corpus
+    engine = VectorSearchEngine(str(path))
+    query = rng.normal(size=SNAPSHOT_DIMENSION)
+    weights = {"content": 0.5, "title": 0.3, "description": 0.2, "key_concepts": 0.0}
+
+    # With every row a candidate, the result is the exact weighted ranking
+    results = engine.multi_vector_search(query, 8, weights=weights, candidate_limit=ROWS)
+    combined = sum(
+        np.where(present[:, i], cosine(matrices[t], query), 0) * weights[t]
+        for i, t in enumerate(EMBEDDING_TYPES)
+    )
+    candidates = present[:, :3].any(axis=1)
+    expected = sorted(np.flatnonzero(candidates), key=lambda i: -combined[i])[:8]
+    assert_same_ranking(ids_and_scores(results), [(examples[i]["id"], combined[i]) for i in expected])
+    assert results[0]["title_similarity"] == pytest.approx(cosine(matrices["title"], query)[expected[0]])
+
+@pytest.mark.parametrize("weights", [{"content": -1}, {t: 0 for t in EMBEDDING_TYPES}])
+def test_multi_vector_search_rejects_invalid_weights(corpus, weights):
+    path, _, _, _, rng = corpus
+    with pytest.raises(ValueError):
+        VectorSearchEngine(str(path)).multi_vector_search(rng.normal(size=SNAPSHOT_DIMENSION), weights=weights)
+
+def test_find_similar_examples_excludes_the_reference(corpus):
+    path, examples, matrices, present, _ = corpus
+    engine = VectorSearchEngine(str(path))
+
+    results = engine.find_similar_examples("example-05", "content", 5)
+    expected = brute_force(
+        examples, matrices["content"], present[:, 0], matrices["content"][5], 5,
+        lambda example: example["id"] != "example-05"
+    )
+    assert_same_ranking(ids_and_scores(results), expected)
+    assert engine.find_similar_examples("example-03", "content") == []
+    assert engine.find_similar_examples("missing") == []
+
+def test_engine_matches_the_sql_function(seed_examples, db_conn, tmp_path):
+    rng = np.random.default_rng(11)
+    examples = [
+        {"id": f"example-{i:02d}", "category": CATEGORIES[i % 3], "complexity_level": COMPLEXITIES[i % 3]}
+        for i in range(12)
+    ]
+    embeddings = {
+        example["id"]: {t: rng.normal(size=DIMENSION).astype(np.float32) for t in EMBEDDING_TYPES}
+        for example in examples
+    }
+    # One example only has a content embedding
+    embeddings["example-04"] = {"content": embeddings["example-04"]["content"]}
+    seed_examples(examples, embeddings)
+
+    export_snapshot(db_conn, str(tmp_path))
+    engine = VectorSearchEngine(str(tmp_path))
+    query = rng.normal(size=DIMENSION).astype(np.float32)
+
+    for embedding_type, category in [("content", None), ("title", None), ("title", "UI Patterns")]:
+        rows = db_conn.execute(
+            "SELECT id, similarity FROM api.vector_search(%s, %s, %s, %s)",
+            (query, embedding_type, 6, category)
+        ).fetchall()
+        rows = [(example_id, similarity) for example_id, similarity in rows if similarity is not None]
+        assert_same_ranking(ids_and_scores(engine.vector_search(query, embedding_type, 6, category)), rows)
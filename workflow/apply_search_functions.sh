@@ -34,11 +34,11 @@ PGPASSWORD="$DB_PASS" psql -h "$DB_HOST" -p "$DB_PORT" -U "$DB_USER" -d "$DB_NAM
 
 echo "Verifying functions were created successfully..."
 PGPASSWORD="$DB_PASS" psql -h "$DB_HOST" -p "$DB_PORT" -U "$DB_USER" -d "$DB_NAME" -c \
-"SELECT proname, pronamespace::regnamespace as schema FROM pg_proc WHERE proname IN ('vector_search', 'multi_vector_search', 'find_similar_examples') AND pronamespace = (SELECT oid FROM pg_namespace WHERE nspname = 'api');" -t | cat
+"SELECT proname, pronamespace::regnamespace as schema FROM pg_proc WHERE proname IN ('vector_search', 'multi_vector_search', 'hybrid_search', 'find_similar_examples') AND pronamespace = (SELECT oid FROM pg_namespace WHERE nspname = 'api');" -t | cat
 
 echo "Verifying permissions..."
 PGPASSWORD="$DB_PASS" psql -h "$DB_HOST" -p "$DB_PORT" -U "$DB_USER" -d "$DB_NAME" -c \
-"SELECT proname, proacl FROM pg_proc WHERE pronamespace = (SELECT oid FROM pg_namespace WHERE nspname = 'api') AND proname IN ('vector_search', 'multi_vector_search', 'find_similar_examples');" -t | cat
+"SELECT proname, proacl FROM pg_proc WHERE pronamespace = (SELECT oid FROM pg_namespace WHERE nspname = 'api') AND proname IN ('vector_search', 'multi_vector_search', 'hybrid_search', 'find_similar_examples');" -t | cat
 
 echo "Testing backward compatibility function with an example ID..."
 PGPASSWORD="$DB_PASS" psql -h "$DB_HOST" -p "$DB_PORT" -U "$DB_USER" -d "$DB_NAME" -c \
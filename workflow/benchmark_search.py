@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""
+Benchmark the api.* vector search functions against a synthetic corpus.
+
+The generate command fills a separate schema (htmx_bench by default) with
+synthetic htmx_examples/htmx_embeddings rows whose category and complexity
+distributions follow the real corpus, and whose vectors are clustered by
+category so that nearest neighbour searches behave like they do on real data.
+The run command calls each search function from several concurrent connections
+with that schema first on the search_path, and reports p50/p95/p99 latency and
+QPS as JSON. Everything runs against the local database, with no embedding API calls.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+try:
+    # Import required libraries
+    from dotenv import load_dotenv
+    import numpy as np
+    import psycopg
+    from psycopg import sql
+    from pgvector.psycopg import register_vector
+except ImportError as e:
+    logger.error(f"Missing required packages. Please run: uv add psycopg python-dotenv numpy pgvector")
+    sys.exit(1)
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Database connection parameters
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+DB_USER = os.getenv("DB_USER")
+DB_PASS = os.getenv("DB_PASS")
+DB_NAME = os.getenv("DB_NAME")
+
+DEFAULT_SCHEMA = "htmx_bench"
+DIMENSION = 768
+EMBEDDING_TYPES = ["content", "title", "description", "key_concepts"]
+SEARCH_FUNCTIONS = ["vector_search", "multi_vector_search", "hybrid_search", "find_similar_examples"]
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+
+# Used when the real corpus is empty
+DEFAULT_CATEGORY_WEIGHTS = {"UI Patterns": 0.4, "Advanced Examples": 0.35, "Dialog Examples": 0.25}
+DEFAULT_COMPLEXITY_WEIGHTS = {"beginner": 0.3, "intermediate": 0.4, "advanced": 0.3}
+
+# Vectors are centre + noise; each embedding type adds its own noise around a shared base
+CLUSTERS_PER_CATEGORY = 8
+CLUSTER_SPREAD = 0.6
+TYPE_SPREAD = 0.35
+COPY_CHUNK_SIZE = 10_000
+
+def connect_to_db(schema: Optional[str] = None) -> psycopg.Connection:
+    """
+    Connect to the PostgreSQL database using environment variables.
+
+    With a schema, it is put first on the search_path so the unqualified table
+    names used by the api.* functions resolve to the benchmark tables.
+    """
+    try:
+        # Check if all required environment variables are set
+        required_env_vars = ["DB_HOST", "DB_PORT", "DB_USER", "DB_PASS", "DB_NAME"]
+        missing_vars = [var for var in required_env_vars if not os.getenv(var)]
+
+        if missing_vars:
+            raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
+
+        # Connect to the database
+        conn_string = f"host={DB_HOST} port={DB_PORT} dbname={DB_NAME} user={DB_USER} password={DB_PASS}"
+        options = f"-c search_path={schema},public" if schema else None
+        conn = psycopg.connect(conn_string, options=options, autocommit=True)
+        register_vector(conn)
+        return conn
+    except Exception as e:
+        logger.error(f"Error connecting to database: {e}")
+        raise
+
+def parse_scale(value: str) -> int:
+    """Parse a corpus size such as 10k, 1M or 2500 for argparse."""
+    if value in SCALES:
+        return SCALES[value]
+    try:
+        rows = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid scale '{value}', expected one of {', '.join(SCALES)} or a row count")
+    if rows < 1:
+        raise argparse.ArgumentTypeError("Scale must be positive")
+    return rows
+
+def parse_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+def parse_int_list(value: str) -> List[int]:
+    try:
+        return [int(item) for item in parse_list(value)]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid integer list '{value}'")
+
+def corpus_distribution(conn: psycopg.Connection, column: str, defaults: Dict[str, float]) -> Dict[str, float]:
+    """Return the share of each value of a column in the real corpus, or the defaults if it is empty."""
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL(
+            "SELECT {column}, COUNT(*) FROM public.htmx_examples WHERE {column} IS NOT NULL GROUP BY {column}"
+        ).format(column=sql.Identifier(column)))
+        counts = dict(cur.fetchall())
+    if not counts:
+        return defaults
+    total = sum(counts.values())
+    return {value: count / total for value, count in counts.items()}
+
+def create_bench_tables(conn: psycopg.Connection, schema: str) -> None:
+    """(Re)create the benchmark schema with tables shaped like the real ones."""
+    schema_id = sql.Identifier(schema)
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(schema_id))
+        cur.execute(sql.SQL("CREATE SCHEMA {}").format(schema_id))
+        # LIKE copies column types (including the vector dimension), defaults and the
+        # generated search_tsv column. ANN indexes are left out so loading stays fast;
+        # build them afterwards if needed
+        for table in ["htmx_examples", "htmx_embeddings"]:
+            cur.execute(sql.SQL(
+                "CREATE TABLE {}.{} (LIKE public.{} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED, "
+                "PRIMARY KEY (id))"
+            ).format(schema_id, sql.Identifier(table), sql.Identifier(table)))
+        cur.execute(sql.SQL(
+            "ALTER TABLE {}.htmx_embeddings ADD FOREIGN KEY (id) REFERENCES {}.htmx_examples(id)"
+        ).format(schema_id, schema_id))
+        # Empty neighbour graph tables, so build_neighbor_graph.py can target the schema
+        for table in ["htmx_neighbors", "htmx_neighbor_state"]:
+            cur.execute("SELECT to_regclass(%s)", (f"public.{table}",))
+            if cur.fetchone()[0]:
+                cur.execute(sql.SQL("CREATE TABLE {}.{} (LIKE public.{} INCLUDING ALL)").format(
+                    schema_id, sql.Identifier(table), sql.Identifier(table)
+                ))
+
+def create_filter_indexes(conn: psycopg.Connection, schema: str) -> None:
+    """Create the filter, full-text and updated_at indexes the real tables have."""
+    with conn.cursor() as cur:
+        for column in ["category", "complexity_level"]:
+            cur.execute(sql.SQL("CREATE INDEX ON {}.htmx_examples ({})").format(
+                sql.Identifier(schema), sql.Identifier(column)
+            ))
+        for column in ["search_tsv", "htmx_attributes", "key_concepts"]:
+            cur.execute(sql.SQL("CREATE INDEX ON {}.htmx_examples USING GIN ({})").format(
+                sql.Identifier(schema), sql.Identifier(column)
+            ))
+        cur.execute(sql.SQL("CREATE INDEX ON {}.htmx_embeddings (updated_at)").format(sql.Identifier(schema)))
+
+def generate_corpus(
+    conn: psycopg.Connection,
+    schema: str,
+    rows: int,
+    dimension: int = DIMENSION,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """Generate a synthetic corpus of the given size in the benchmark schema."""
+    try:
+        rng = np.random.default_rng(seed)
+        categories = corpus_distribution(conn, "category", DEFAULT_CATEGORY_WEIGHTS)
+        complexities = corpus_distribution(conn, "complexity_level", DEFAULT_COMPLEXITY_WEIGHTS)
+        category_names = list(categories)
+        complexity_names = list(complexities)
+
+        # Each category owns a few cluster centres, so filtered searches see related vectors
+        centres = rng.standard_normal((len(category_names) * CLUSTERS_PER_CATEGORY, dimension)).astype(np.float32)
+
+        create_bench_tables(conn, schema)
+        start_time = time.time()
+        schema_id = sql.Identifier(schema)
+        embedding_columns = ", ".join(f"{embedding_type}_embedding" for embedding_type in EMBEDDING_TYPES)
+
+        with conn.transaction(), conn.cursor() as cur:
+            for start in range(0, rows, COPY_CHUNK_SIZE):
+                count = min(COPY_CHUNK_SIZE, rows - start)
+                category_index = rng.choice(len(category_names), size=count, p=list(categories.values()))
+                complexity_index = rng.choice(len(complexity_names), size=count, p=list(complexities.values()))
+                cluster = category_index * CLUSTERS_PER_CATEGORY + rng.integers(0, CLUSTERS_PER_CATEGORY, size=count)
+                base = centres[cluster] + CLUSTER_SPREAD * rng.standard_normal((count, dimension), dtype=np.float32)
+                vectors = {
+                    embedding_type: base + TYPE_SPREAD * rng.standard_normal((count, dimension), dtype=np.float32)
+                    for embedding_type in EMBEDDING_TYPES
+                }
+
+                with cur.copy(sql.SQL(
+                    "COPY {}.htmx_examples (id, title, category, url, description, html_snippets, "
+                    "javascript_snippets, key_concepts, htmx_attributes, demo_explanation, complexity_level, "
+                    "use_cases) FROM STDIN"
+                ).format(schema_id)) as copy:
+                    for i in range(count):
+                        example_id = f"bench-{start + i}"
+                        category = category_names[category_index[i]]
+                        copy.write_row((
+                            example_id,
+                            f"Synthetic example {start + i}",
+                            category,
+                            f"https://example.invalid/{example_id}",
+                            f"Synthetic {category} example for benchmarking",
+                            "[]",
+                            "[]",
+                            [f"concept-{cluster[i]}"],
+                            ["hx-get"],
+                            None,
+                            complexity_names[complexity_index[i]],
+                            [],
+                        ))
+
+                with cur.copy(sql.SQL(
+                    "COPY {}.htmx_embeddings (id, " + embedding_columns + ") FROM STDIN (FORMAT BINARY)"
+                ).format(schema_id)) as copy:
+                    copy.set_types(["text"] + ["vector"] * len(EMBEDDING_TYPES))
+                    for i in range(count):
+                        copy.write_row(
+                            [f"bench-{start + i}"] + [vectors[embedding_type][i] for embedding_type in EMBEDDING_TYPES]
+                        )
+
+                logger.info(f"Generated {start + count}/{rows} rows")
+
+        create_filter_indexes(conn, schema)
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("ANALYZE {}.htmx_examples").format(schema_id))
+            cur.execute(sql.SQL("ANALYZE {}.htmx_embeddings").format(schema_id))
+
+        elapsed = time.time() - start_time
+        logger.info(f"Generated {rows} synthetic examples in schema {schema} in {elapsed:.1f}s")
+        return {
+            "schema": schema,
+            "rows": rows,
+            "dimension": dimension,
+            "seed": seed,
+            "categories": categories,
+            "complexities": complexities,
+            "seconds": round(elapsed, 1),
+        }
+    except Exception as e:
+        logger.error(f"Error generating synthetic corpus: {e}")
+        raise
+
+def describe_corpus(conn: psycopg.Connection) -> Dict[str, Any]:
+    """Summarize the corpus and server the benchmark runs against."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT (current_schemas(false))[1], COUNT(*) FROM htmx_embeddings")
+        schema, rows = cur.fetchone()
+        cur.execute("SELECT vector_dims(content_embedding) FROM htmx_embeddings LIMIT 1")
+        dimension = (cur.fetchone() or [None])[0]
+        cur.execute("SELECT current_setting('server_version'), extversion FROM pg_extension WHERE extname = 'vector'")
+        server_version, pgvector_version = cur.fetchone()
+        cur.execute("""
+            SELECT am.amname || ':' || i.relname
+            FROM pg_index ix
+            JOIN pg_class i ON i.oid = ix.indexrelid
+            JOIN pg_am am ON am.oid = i.relam
+            WHERE ix.indrelid = 'htmx_embeddings'::regclass AND am.amname IN ('hnsw', 'ivfflat')
+        """)
+        indexes = [row[0] for row in cur.fetchall()]
+    return {
+        "schema": schema,
+        "rows": rows,
+        "dimension": dimension,
+        "ann_indexes": indexes,
+        "server_version": server_version,
+        "pgvector_version": pgvector_version,
+    }
+
+def build_workload(conn: psycopg.Connection, queries: int, filter_rate: float, seed: int) -> List[Dict[str, Any]]:
+    """
+    Build query parameters from the corpus itself.
+
+    Query vectors are perturbed copies of stored content embeddings, so they land
+    near real clusters without matching a row exactly. A share of the queries
+    (filter_rate) also filter by the category of the row they came from. The
+    row's first key concept is the query text for hybrid search.
+    """
+    rng = np.random.default_rng(seed)
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT e.id, e.category, e.key_concepts[1], emb.content_embedding "
+            "FROM htmx_examples e JOIN htmx_embeddings emb ON e.id = emb.id "
+            "ORDER BY random() LIMIT %s",
+            (queries,)
+        )
+        rows = cur.fetchall()
+    if not rows:
+        raise ValueError("The benchmark corpus is empty; run the generate command first")
+
+    workload = []
+    for i in range(queries):
+        example_id, category, concept, embedding = rows[i % len(rows)]
+        vector = embedding.to_numpy()
+        vector = vector + TYPE_SPREAD * np.linalg.norm(vector) / np.sqrt(len(vector)) * rng.standard_normal(
+            len(vector), dtype=np.float32
+        )
+        workload.append({
+            "id": example_id,
+            "text": concept or "",
+            "embedding": vector.astype(np.float32),
+            "category": category if rng.random() < filter_rate else None,
+        })
+    return workload
+
+def run_search(conn: psycopg.Connection, function: str, item: Dict[str, Any], limit: int) -> None:
+    """Execute one search function call and fetch its results."""
+    with conn.cursor() as cur:
+        if function == "vector_search":
+            cur.execute(
+                "SELECT id, similarity FROM api.vector_search(%b, 'content', %s, %s, NULL)",
+                (item["embedding"], limit, item["category"])
+            )
+        elif function == "multi_vector_search":
+            cur.execute(
+                "SELECT id, similarity FROM api.multi_vector_search(%b, %s, %s, NULL)",
+                (item["embedding"], limit, item["category"])
+            )
+        elif function == "hybrid_search":
+            cur.execute(
+                "SELECT id, hybrid_score FROM api.hybrid_search(%s, %b, 'content', %s, %s, NULL)",
+                (item["text"], item["embedding"], limit, item["category"])
+            )
+        else:
+            cur.execute(
+                "SELECT id, similarity FROM api.find_similar_examples(%s, 'content', %s, %s, NULL)",
+                (item["id"], limit, item["category"])
+            )
+        cur.fetchall()
+
+def summarize_latencies(latencies_ms: List[float]) -> Dict[str, float]:
+    """Compute latency percentiles in milliseconds."""
+    if not latencies_ms:
+        return {}
+    return {
+        "p50": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p95": round(float(np.percentile(latencies_ms, 95)), 3),
+        "p99": round(float(np.percentile(latencies_ms, 99)), 3),
+        "mean": round(float(np.mean(latencies_ms)), 3),
+        "max": round(float(np.max(latencies_ms)), 3),
+    }
+
+def benchmark_function(
+    schema: str,
+    function: str,
+    workload: List[Dict[str, Any]],
+    concurrency: int,
+    limit: int,
+    warmup: int
+) -> Dict[str, Any]:
+    """
+    Run every workload query through one search function from concurrent connections.
+
+    Each worker owns a connection, opened (and warmed up) before timing starts,
+    and takes the next query from a shared counter until the workload is used up.
+    """
+    connections = [connect_to_db(schema) for _ in range(concurrency)]
+    try:
+        for conn in connections:
+            for item in workload[:warmup]:
+                run_search(conn, function, item, limit)
+
+        latencies_ms: List[float] = []
+        errors = []
+        lock = threading.Lock()
+        next_index = iter(range(len(workload)))
+
+        def worker(conn: psycopg.Connection) -> None:
+            while True:
+                with lock:
+                    index = next(next_index, None)
+                if index is None:
+                    return
+                start = time.perf_counter()
+                try:
+                    run_search(conn, function, workload[index], limit)
+                except Exception as e:
+                    with lock:
+                        errors.append(str(e))
+                    continue
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                with lock:
+                    latencies_ms.append(elapsed_ms)
+
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(worker, conn) for conn in connections]:
+                future.result()
+        wall_seconds = time.perf_counter() - start_time
+
+        result = {
+            "function": function,
+            "concurrency": concurrency,
+            "queries": len(latencies_ms),
+            "errors": len(errors),
+            "seconds": round(wall_seconds, 3),
+            "qps": round(len(latencies_ms) / wall_seconds, 1) if wall_seconds else 0.0,
+            "latency_ms": summarize_latencies(latencies_ms),
+        }
+        if errors:
+            result["first_error"] = errors[0]
+        logger.info(
+            f"{function} x{concurrency}: {result['qps']} QPS, "
+            f"p50 {result['latency_ms'].get('p50')} ms, p99 {result['latency_ms'].get('p99')} ms"
+        )
+        return result
+    finally:
+        for conn in connections:
+            conn.close()
+
+def run_benchmark(
+    schema: str,
+    functions: List[str],
+    concurrency_levels: List[int],
+    queries: int,
+    limit: int,
+    filter_rate: float,
+    warmup: int,
+    seed: int
+) -> Dict[str, Any]:
+    """Benchmark each search function at each concurrency level and collect a JSON report."""
+    try:
+        with connect_to_db(schema) as conn:
+            corpus = describe_corpus(conn)
+            if corpus["schema"] != schema:
+                raise ValueError(f"Schema {schema} not found; run the generate command first")
+            workload = build_workload(conn, queries, filter_rate, seed)
+
+        results = [
+            benchmark_function(schema, function, workload, concurrency, limit, warmup)
+            for function in functions
+            for concurrency in concurrency_levels
+        ]
+        return {
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "corpus": corpus,
+            "settings": {
+                "queries": queries,
+                "limit": limit,
+                "filter_rate": filter_rate,
+                "warmup": warmup,
+                "seed": seed,
+            },
+            "results": results,
+        }
+    except Exception as e:
+        logger.error(f"Error running benchmark: {e}")
+        raise
+
+def main():
+    """Main function to generate a synthetic corpus or benchmark the search functions."""
+    parser = argparse.ArgumentParser(description="Benchmark the vector search SQL functions on a synthetic corpus")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = subparsers.add_parser("generate", help="Generate a synthetic corpus in the benchmark schema")
+    generate_parser.add_argument(
+        "--scale",
+        type=parse_scale,
+        default=SCALES["10k"],
+        help=f"Number of examples: {', '.join(SCALES)} or a row count (default: 10k)"
+    )
+
+    generate_parser.add_argument(
+        "--dimension",
+        type=int,
+        default=DIMENSION,
+        help=f"Embedding dimension; must match the embedding columns (default: {DIMENSION})"
+    )
+
+    generate_parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed for reproducible corpora (default: 0)"
+    )
+
+    run_parser = subparsers.add_parser("run", help="Benchmark the search functions")
+    run_parser.add_argument(
+        "--functions",
+        type=parse_list,
+        default=SEARCH_FUNCTIONS,
+        help=f"Comma-separated search functions to benchmark (default: {','.join(SEARCH_FUNCTIONS)})"
+    )
+
+    run_parser.add_argument(
+        "--concurrency",
+        type=parse_int_list,
+        default=[1, 4, 16],
+        help="Comma-separated numbers of concurrent connections (default: 1,4,16)"
+    )
+
+    run_parser.add_argument(
+        "--queries",
+        type=int,
+        default=200,
+        help="Queries per function and concurrency level (default: 200)"
+    )
+
+    run_parser.add_argument(
+        "--limit",
+        type=int,
+        default=5,
+        help="Results requested per query (default: 5)"
+    )
+
+    run_parser.add_argument(
+        "--filter-rate",
+        type=float,
+        default=0.2,
+        help="Fraction of queries that also filter by category (default: 0.2)"
+    )
+
+    run_parser.add_argument(
+        "--warmup",
+        type=int,
+        default=5,
+        help="Untimed queries per connection before measuring (default: 5)"
+    )
+
+    run_parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed for the query workload (default: 0)"
+    )
+
+    run_parser.add_argument(
+        "--output",
+        type=str,
+        help="Write the JSON report to this file instead of stdout"
+    )
+
+    for subparser in [generate_parser, run_parser]:
+        subparser.add_argument(
+            "--schema",
+            type=str,
+            default=DEFAULT_SCHEMA,
+            help=f"Schema holding the synthetic corpus (default: {DEFAULT_SCHEMA})"
+        )
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "generate":
+            if args.schema == "public":
+                parser.error("refusing to generate synthetic data in the public schema")
+            with connect_to_db() as conn:
+                summary = generate_corpus(conn, args.schema, args.scale, args.dimension, args.seed)
+            print(json.dumps(summary, indent=2))
+        else:
+            unknown = set(args.functions) - set(SEARCH_FUNCTIONS)
+            if unknown:
+                parser.error(f"unknown search functions: {', '.join(sorted(unknown))}")
+            report = run_benchmark(
+                args.schema, args.functions, args.concurrency, args.queries,
+                args.limit, args.filter_rate, args.warmup, args.seed
+            )
+            if args.output:
+                with open(args.output, "w") as f:
+                    json.dump(report, f, indent=2)
+                logger.info(f"Wrote benchmark report to {args.output}")
+            else:
+                print(json.dumps(report, indent=2))
+    except Exception as e:
+        logger.error(f"Error in main function: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
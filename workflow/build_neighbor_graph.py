@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Build and incrementally refresh the precomputed k-nearest-neighbour graph that
+api.find_similar_examples reads.
+
+For every example and embedding type, htmx_neighbors holds the top k other
+examples by cosine similarity. A full build computes all pairs in blocks of
+rows with NumPy matrix products, so the full similarity matrix is never held
+in memory: memory use is the float32 embedding matrix (rows x dimensions,
+streamed into a preallocated array) plus one block of similarities.
+A refresh only does the work implied by the embeddings changed since the last
+build (updated_at on htmx_embeddings): changed and new rows, and rows whose
+lists referenced a changed or removed row, get their lists recomputed, while
+every other list is only merged with the changed rows' new similarities.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+try:
+    # Import required libraries
+    from dotenv import load_dotenv
+    import numpy as np
+    import psycopg
+    from psycopg import sql
+    from pgvector.psycopg import register_vector
+except ImportError as e:
+    logger.error(f"Missing required packages. Please run: uv add psycopg python-dotenv numpy pgvector")
+    sys.exit(1)
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Database connection parameters
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+DB_USER = os.getenv("DB_USER")
+DB_PASS = os.getenv("DB_PASS")
+DB_NAME = os.getenv("DB_NAME")
+
+EMBEDDING_TYPES = ["content", "title", "description", "key_concepts"]
+
+# Neighbours kept per example; find_similar_examples falls back to a scan for larger limits
+DEFAULT_K = 20
+# Memory budget for one block of the similarity matrix
+DEFAULT_BLOCK_MB = 256
+# Rows fetched per round trip while loading embeddings
+LOAD_FETCH_SIZE = 1000
+
+def connect_to_db() -> psycopg.Connection:
+    """
+    Connect to the PostgreSQL database using environment variables.
+
+    The connection is in autocommit mode; each graph is written in its own
+    explicit transaction.
+    """
+    try:
+        # Check if all required environment variables are set
+        required_env_vars = ["DB_HOST", "DB_PORT", "DB_USER", "DB_PASS", "DB_NAME"]
+        missing_vars = [var for var in required_env_vars if not os.getenv(var)]
+
+        if missing_vars:
+            raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
+
+        # Connect to the database
+        conn_string = f"host={DB_HOST} port={DB_PORT} dbname={DB_NAME} user={DB_USER} password={DB_PASS}"
+        conn = psycopg.connect(conn_string, autocommit=True)
+        register_vector(conn)
+
+        logger.info(f"Successfully connected to database: {DB_NAME} on {DB_HOST}")
+        return conn
+    except Exception as e:
+        logger.error(f"Error connecting to database: {e}")
+        raise
+
+def check_neighbor_tables(conn: psycopg.Connection) -> None:
+    """Raise if the neighbour graph tables from init_db_schema.sql are missing."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('htmx_neighbors'), to_regclass('htmx_neighbor_state')")
+        if None in cur.fetchone():
+            raise ValueError(
+                "htmx_neighbors or htmx_neighbor_state does not exist; "
+                "apply the neighbour graph statements from init_db_schema.sql"
+            )
+
+def change_horizon(conn: psycopg.Connection) -> Any:
+    """
+    Return the timestamp to record as built_at for a build that loads its rows next.
+
+    updated_at is the writer's transaction start time, so a write that started
+    before the load but commits after it is missing from the load while its
+    updated_at is older than the load. The horizon is therefore the earliest
+    start of any transaction still open in this database (or now, if none is),
+    read before the load's snapshot is taken: every write the load cannot see
+    has an updated_at after it, so refreshes and api.find_similar_examples
+    treat it as changed. xact_start of other roles' sessions is only visible to
+    superusers and members of pg_read_all_stats, so the build should run as
+    the role that writes the embeddings or as one of those.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT LEAST(
+                clock_timestamp(),
+                (
+                    SELECT MIN(xact_start) FROM pg_stat_activity
+                    WHERE datname = current_database()
+                    AND backend_type = 'client backend'
+                    AND pid <> pg_backend_pid()
+                )
+            ) - INTERVAL '1 microsecond'
+        """)
+        return cur.fetchone()[0]
+
+def load_embeddings(conn: psycopg.Connection, embedding_type: str) -> Tuple[List[str], np.ndarray, List[Any]]:
+    """
+    Load the ids, L2-normalized vectors and updated_at timestamps of every row
+    that has an embedding of this type, ordered by id.
+
+    Rows are streamed through a server-side cursor straight into a preallocated
+    float32 matrix, so no per-row Python objects are kept for the vectors.
+    """
+    column = sql.Identifier(f"{embedding_type}_embedding")
+    ids = []
+    updated_at = []
+    # Count and read the rows in one snapshot so that they fill the matrix exactly
+    with conn.transaction():
+        with conn.cursor() as cur:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cur.execute(
+                sql.SQL("SELECT COUNT(*), MAX(vector_dims({})) FROM htmx_embeddings WHERE {} IS NOT NULL").format(
+                    column, column
+                )
+            )
+            row_count, dimension = cur.fetchone()
+
+        matrix = np.zeros((row_count, dimension or 0), dtype=np.float32)
+        with conn.cursor(name=f"load_{embedding_type}_embeddings", binary=True) as cur:
+            cur.itersize = LOAD_FETCH_SIZE
+            cur.execute(
+                sql.SQL("SELECT id, {}, updated_at FROM htmx_embeddings WHERE {} IS NOT NULL ORDER BY id").format(
+                    column, column
+                )
+            )
+            for i, (example_id, embedding, timestamp) in enumerate(cur):
+                ids.append(example_id)
+                matrix[i] = embedding.to_numpy()
+                updated_at.append(timestamp)
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    # Zero vectors have no direction; leave them at 0 similarity to everything
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return ids, matrix, updated_at
+
+def load_graph(conn: psycopg.Connection, embedding_type: str) -> Dict[str, List[Tuple[str, float]]]:
+    """Load the stored neighbour lists for one embedding type, best first."""
+    graph: Dict[str, List[Tuple[str, float]]] = {}
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT id, neighbor_id, similarity FROM htmx_neighbors WHERE embedding_type = %s ORDER BY id, rank",
+            (embedding_type,)
+        )
+        for example_id, neighbor_id, similarity in cur:
+            graph.setdefault(example_id, []).append((neighbor_id, similarity))
+    return graph
+
+def load_state(conn: psycopg.Connection, embedding_type: str) -> Optional[Dict[str, Any]]:
+    """Return k, row_count and built_at of the last build for one embedding type."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT k, row_count, built_at FROM htmx_neighbor_state WHERE embedding_type = %s",
+            (embedding_type,)
+        )
+        row = cur.fetchone()
+    return {"k": row[0], "row_count": row[1], "built_at": row[2]} if row else None
+
+def block_rows(columns: int, block_mb: int) -> int:
+    """Rows per block so that a block of float32 similarities fits in block_mb."""
+    return max(1, (block_mb * 1024 * 1024) // (4 * max(columns, 1)))
+
+def top_k_neighbors(
+    matrix: np.ndarray,
+    rows: np.ndarray,
+    k: int,
+    block_mb: int = DEFAULT_BLOCK_MB
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top k neighbours of the given rows against every row of matrix, excluding
+    each row itself.
+
+    Returns (indices, similarities), both shaped (len(rows), k), best first.
+    """
+    k = min(k, len(matrix) - 1)
+    indices = np.zeros((len(rows), max(k, 0)), dtype=np.int64)
+    similarities = np.zeros((len(rows), max(k, 0)), dtype=np.float32)
+    if k <= 0:
+        return indices, similarities
+
+    step = block_rows(len(matrix), block_mb)
+    for start in range(0, len(rows), step):
+        block = rows[start:start + step]
+        scores = matrix[block] @ matrix.T
+        scores[np.arange(len(block)), block] = -np.inf
+
+        # argpartition finds the top k in linear time; only those k are sorted
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        indices[start:start + len(block)] = np.take_along_axis(top, order, axis=1)
+        similarities[start:start + len(block)] = np.take_along_axis(top_scores, order, axis=1)
+    return indices, similarities
+
+def write_graph(
+    conn: psycopg.Connection,
+    embedding_type: str,
+    lists: Dict[str, List[Tuple[str, float]]],
+    deleted: List[str],
+    replace_all: bool,
+    k: int,
+    row_count: int,
+    built_at: Any
+) -> None:
+    """Replace the given neighbour lists and record the build in one transaction."""
+    with conn.transaction(), conn.cursor() as cur:
+        if replace_all:
+            cur.execute("DELETE FROM htmx_neighbors WHERE embedding_type = %s", (embedding_type,))
+        else:
+            cur.execute(
+                "DELETE FROM htmx_neighbors WHERE embedding_type = %s AND id = ANY(%s)",
+                (embedding_type, list(lists) + deleted)
+            )
+
+        with cur.copy(
+            "COPY htmx_neighbors (id, embedding_type, rank, neighbor_id, similarity) FROM STDIN"
+        ) as copy:
+            for example_id, neighbors in lists.items():
+                for rank, (neighbor_id, similarity) in enumerate(neighbors, start=1):
+                    copy.write_row((example_id, embedding_type, rank, neighbor_id, float(similarity)))
+
+        cur.execute("""
+            INSERT INTO htmx_neighbor_state (embedding_type, k, row_count, built_at)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (embedding_type) DO UPDATE
+            SET k = EXCLUDED.k, row_count = EXCLUDED.row_count, built_at = EXCLUDED.built_at
+        """, (embedding_type, k, row_count, built_at))
+
+def build_graph(
+    conn: psycopg.Connection,
+    embedding_type: str,
+    k: int = DEFAULT_K,
+    full: bool = False,
+    block_mb: int = DEFAULT_BLOCK_MB
+) -> Dict[str, Any]:
+    """
+    Build or refresh the neighbour graph for one embedding type.
+
+    A full build runs when requested, when no graph exists yet or when k
+    changed; otherwise only the rows affected by changed embeddings are
+    rewritten.
+    """
+    try:
+        start_time = time.time()
+        # Rows updated after the horizon are picked up by the next refresh
+        built_at = change_horizon(conn)
+        ids, matrix, updated_at = load_embeddings(conn, embedding_type)
+        index = {example_id: i for i, example_id in enumerate(ids)}
+        k_effective = min(k, len(ids) - 1)
+        state = load_state(conn, embedding_type)
+        full = full or state is None or state["k"] != k
+
+        report = {
+            "embedding_type": embedding_type,
+            "mode": "full" if full else "incremental",
+            "rows": len(ids),
+            "k": k,
+            "changed": len(ids),
+            "recomputed": 0,
+            "merged": 0,
+            "removed": 0,
+        }
+
+        graph: Dict[str, List[Tuple[str, float]]] = {}
+        deleted: List[str] = []
+        if full:
+            dirty = np.arange(len(ids))
+        else:
+            stored = load_graph(conn, embedding_type)
+            changed = {example_id for example_id, ts in zip(ids, updated_at) if ts > state["built_at"]}
+            stored_ids = set(stored) | {neighbor for neighbors in stored.values() for neighbor, _ in neighbors}
+            removed = stored_ids - set(index)
+            deleted = [example_id for example_id in stored if example_id in removed]
+
+            # Lists that mention a changed or removed row, or are short, must be recomputed
+            dirty_ids = set(changed)
+            for example_id in ids:
+                neighbors = stored.get(example_id, [])
+                if len(neighbors) < k_effective or any(
+                    neighbor in changed or neighbor in removed for neighbor, _ in neighbors
+                ):
+                    dirty_ids.add(example_id)
+            dirty = np.array(sorted(index[example_id] for example_id in dirty_ids), dtype=np.int64)
+
+            # The remaining lists stay valid except that changed rows may now beat their weakest entry
+            clean = np.array(
+                [i for i, example_id in enumerate(ids) if example_id not in dirty_ids], dtype=np.int64
+            )
+            changed_rows = np.array(sorted(index[example_id] for example_id in changed), dtype=np.int64)
+            if len(clean) and len(changed_rows) and k_effective > 0:
+                step = block_rows(len(changed_rows), block_mb)
+                for start in range(0, len(clean), step):
+                    block = clean[start:start + step]
+                    scores = matrix[block] @ matrix[changed_rows].T
+                    weakest = np.array([stored[ids[i]][-1][1] for i in block], dtype=np.float32)
+                    for row in np.flatnonzero((scores > weakest[:, None]).any(axis=1)):
+                        example_id = ids[block[row]]
+                        candidates = stored[example_id] + [
+                            (ids[j], float(score)) for j, score in zip(changed_rows, scores[row])
+                        ]
+                        candidates.sort(key=lambda item: -item[1])
+                        graph[example_id] = candidates[:k_effective]
+                        report["merged"] += 1
+
+            report["changed"] = len(changed)
+            report["removed"] = len(removed)
+            if not len(dirty) and not graph and not deleted:
+                report["mode"] = "unchanged"
+
+        if len(dirty):
+            indices, similarities = top_k_neighbors(matrix, dirty, k, block_mb)
+            for row, i in enumerate(dirty):
+                graph[ids[i]] = [
+                    (ids[j], float(similarity)) for j, similarity in zip(indices[row], similarities[row])
+                ]
+            report["recomputed"] = len(dirty)
+
+        write_graph(conn, embedding_type, graph, deleted, full, k, len(ids), built_at)
+        report["seconds"] = round(time.time() - start_time, 2)
+        logger.info(
+            f"{embedding_type}: {report['mode']} build over {report['rows']} rows, "
+            f"{report['recomputed']} lists recomputed, {report['merged']} merged in {report['seconds']}s"
+        )
+        return report
+    except Exception as e:
+        logger.error(f"Error building neighbour graph for {embedding_type}: {e}")
+        raise
+
+def parse_embedding_types(value: str) -> List[str]:
+    """Parse a comma-separated list of embedding types, or 'all'."""
+    if value == "all":
+        return list(EMBEDDING_TYPES)
+
+    embedding_types = [item.strip() for item in value.split(",") if item.strip()]
+    for embedding_type in embedding_types:
+        if embedding_type not in EMBEDDING_TYPES:
+            raise argparse.ArgumentTypeError(f"Unknown embedding type: {embedding_type}")
+    return embedding_types
+
+def main():
+    """Main function to build or refresh the neighbour graph."""
+    parser = argparse.ArgumentParser(
+        description="Build the precomputed nearest-neighbour graph used by api.find_similar_examples"
+    )
+
+    parser.add_argument(
+        "--types",
+        type=parse_embedding_types,
+        default=list(EMBEDDING_TYPES),
+        help="Comma-separated embedding types, or 'all' (default: all)"
+    )
+
+    parser.add_argument(
+        "--k",
+        type=int,
+        default=DEFAULT_K,
+        help=f"Neighbours stored per example; larger find_similar_examples limits scan instead (default: {DEFAULT_K})"
+    )
+
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Recompute every neighbour list instead of refreshing only what changed"
+    )
+
+    parser.add_argument(
+        "--block-mb",
+        type=int,
+        default=DEFAULT_BLOCK_MB,
+        help=f"Memory budget for each block of pairwise similarities (default: {DEFAULT_BLOCK_MB})"
+    )
+
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the build report as JSON"
+    )
+
+    args = parser.parse_args()
+
+    if args.k < 1:
+        parser.error("--k must be at least 1")
+
+    conn = None
+    try:
+        conn = connect_to_db()
+        check_neighbor_tables(conn)
+        reports = [build_graph(conn, embedding_type, args.k, args.full, args.block_mb) for embedding_type in args.types]
+
+        if args.json:
+            print(json.dumps(reports, indent=2))
+        else:
+            for report in reports:
+                print(
+                    f"{report['embedding_type']}: {report['mode']}, {report['rows']} rows, k={report['k']}, "
+                    f"{report['changed']} changed, {report['removed']} removed, "
+                    f"{report['recomputed']} recomputed, {report['merged']} merged ({report['seconds']}s)"
+                )
+    except Exception as e:
+        logger.error(f"Error building neighbour graph: {e}")
+        sys.exit(1)
+    finally:
+        if conn:
+            conn.close()
+
+if __name__ == "__main__":
+    main()
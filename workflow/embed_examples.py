@@ -1,16 +1,17 @@
 #!/usr/bin/env python3
 """
 A simplified script to generate embeddings for HTMX examples using Google's Generative AI
-and store them in PostgreSQL database.
+(or a local embedding provider, see embedding_providers.py) and store them in PostgreSQL database.
 """
 
 import os
 import sys
 import json
-import time
+import hashlib
 import logging
 import argparse
-from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, ALL_COMPLETED, FIRST_COMPLETED, wait
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from pathlib import Path
 
 # Set up logging
@@ -23,25 +24,54 @@ logger = logging.getLogger(__name__)
 try:
     # Import required libraries
     from dotenv import load_dotenv
+    import numpy as np
     import psycopg
+    from psycopg import sql
     from psycopg.rows import dict_row
-    from google import genai
-    from google.genai.types import EmbedContentConfig
+    from pgvector import Bit, HalfVector
+    from pgvector.psycopg import register_vector
 except ImportError as e:
-    logger.error(f"Missing required packages. Please run: uv add google-genai psycopg python-dotenv")
+    logger.error(f"Missing required packages. Please run: uv add google-genai psycopg python-dotenv numpy pgvector")
     sys.exit(1)
 
+from embedding_cache import EmbeddingCache, cache_key, DEFAULT_CACHE_PATH, DEFAULT_MAX_MB
+from embedding_providers import (
+    EmbeddingProvider, RateLimiter, create_embedding_provider, PROVIDERS, DEFAULT_PROVIDER,
+    MAX_TEXTS_PER_REQUEST
+)
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Constants for Google AI
-API_KEY = os.getenv("GOOGLE_API_KEY")
+# Constants for Google AI (the model and dimension live in embedding_providers.py)
 PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT")
 REGION = os.getenv("GOOGLE_CLOUD_REGION", "us-central1")
-# IMPORTANT: Must use the format "models/text-embedding-004" even though 
-# Google's documentation lists models like "text-embedding-004" or "textembedding-gecko@003"
-MODEL = "models/text-embedding-004"
-DIMENSION = 768
+
+# Defaults for the embedding API request budget
+DEFAULT_CONCURRENCY = 4
+DEFAULT_REQUESTS_PER_SECOND = 5.0
+# Number of examples fetched from the database per round trip
+DEFAULT_FETCH_SIZE = 100
+
+# Columns of htmx_examples used by prepare_example_content
+EXAMPLE_CONTENT_COLUMNS = [
+    "id", "title", "description", "key_concepts", "html_snippets", "javascript_snippets",
+    "htmx_attributes", "demo_explanation", "use_cases"
+]
+
+# Embedding columns in htmx_embeddings, and the columns recording the hash of
+# the source text each embedding was built from
+EMBEDDING_COLUMNS = ["title_embedding", "description_embedding", "content_embedding", "key_concepts_embedding"]
+SOURCE_HASH_COLUMNS = [column.replace("_embedding", "_source_hash") for column in EMBEDDING_COLUMNS]
+
+# Quantized copies of the embedding columns written with --quantize: "binary"
+# keeps one sign bit per dimension in a BIT column (32x smaller), "halfvec"
+# stores 16-bit floats (2x smaller, needs pgvector 0.7 or later)
+QUANTIZED_COLUMN_TYPES = {"binary": "BIT", "halfvec": "HALFVEC"}
+QUANTIZATIONS = list(QUANTIZED_COLUMN_TYPES)
+QUANTIZED_COLUMNS = [
+    f"{column}_{quantization}" for quantization in QUANTIZATIONS for column in EMBEDDING_COLUMNS
+]
 
 # Set Google GenAI environment variables
 os.environ["GOOGLE_CLOUD_PROJECT"] = PROJECT_ID if PROJECT_ID else ""
@@ -68,31 +98,33 @@ def connect_to_db() -> psycopg.Connection:
         conn_string = f"host={DB_HOST} port={DB_PORT} dbname={DB_NAME} user={DB_USER} password={DB_PASS}"
         conn = psycopg.connect(conn_string)
         
+        # Exchange vectors with the server as binary float32 instead of text
+        register_vector(conn)
+        
         logger.info(f"Successfully connected to database: {DB_NAME} on {DB_HOST}")
         return conn
     except Exception as e:
         logger.error(f"Error connecting to database: {e}")
         raise
 
-def create_genai_client() -> genai.Client:
-    """Create and configure Google Generative AI client."""
-    if not API_KEY:
-        raise ValueError("GOOGLE_API_KEY environment variable is not set. Please set it in the .env file.")
-    
-    # Create a client directly
-    client = genai.Client(api_key=API_KEY)
-    logger.info("Google Generative AI client created with API key")
-    return client
-
-def fetch_examples(
+def iter_example_chunks(
     conn: psycopg.Connection,
     limit: Optional[int] = None,
-    filter_condition: Optional[str] = None
-) -> List[Dict[str, Any]]:
-    """Fetch HTMX examples from the database."""
+    filter_condition: Optional[str] = None,
+    chunk_size: int = DEFAULT_FETCH_SIZE
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Stream HTMX examples from the database in chunks using a server-side cursor.
+
+    Only the columns needed to prepare embedding content are fetched, so large
+    columns that aren't embedded never leave the database, and memory use stays
+    flat regardless of corpus size. The connection should not be used for
+    anything else while the generator is active, since committing on it would
+    close the cursor.
+    """
     try:
-        with conn.cursor(row_factory=dict_row) as cur:
-            query = "SELECT * FROM htmx_examples"
+        with conn.cursor(name="embed_examples_stream", row_factory=dict_row) as cur:
+            query = f"SELECT {', '.join(EXAMPLE_CONTENT_COLUMNS)} FROM htmx_examples"
             
             if filter_condition:
                 query += f" WHERE {filter_condition}"
@@ -100,52 +132,183 @@ def fetch_examples(
             if limit is not None:
                 query += f" LIMIT {limit}"
             
+            cur.itersize = chunk_size
             cur.execute(query)
-            examples = cur.fetchall()
             
-            logger.info(f"Fetched {len(examples)} examples from database")
-            return examples
+            fetched_count = 0
+            while True:
+                examples = cur.fetchmany(chunk_size)
+                if not examples:
+                    break
+                fetched_count += len(examples)
+                logger.info(f"Fetched {len(examples)} examples from database ({fetched_count} so far)")
+                yield examples
+        conn.commit()
     except Exception as e:
         logger.error(f"Error fetching examples: {e}")
         raise
 
-def check_embeddings_exist(
-    conn: psycopg.Connection,
-    example_id: str
-) -> Dict[str, bool]:
-    """Check if embeddings exist for a specific example."""
+def source_text_hash(text: str) -> str:
+    """Hash of the prepared source text an embedding was built from."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def source_hash_column(embedding_field: str) -> str:
+    """Name of the column recording the source text hash for an embedding column."""
+    return embedding_field.replace("_embedding", "_source_hash")
+
+def ensure_source_hash_columns(conn: psycopg.Connection) -> None:
+    """Add the source text hash columns to htmx_embeddings if they don't exist yet."""
     try:
-        with conn.cursor(row_factory=dict_row) as cur:
+        with conn.cursor() as cur:
+            for column in SOURCE_HASH_COLUMNS:
+                cur.execute(f"ALTER TABLE htmx_embeddings ADD COLUMN IF NOT EXISTS {column} TEXT")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error adding source hash columns: {e}")
+        raise
+
+def quantized_column(column: str, quantization: str) -> str:
+    """Name of the quantized copy of an embedding column."""
+    return f"{column}_{quantization}"
+
+def quantize_embedding(embedding: np.ndarray, quantization: str) -> Any:
+    """Quantize a float32 embedding for its quantized column."""
+    if quantization == "binary":
+        # Same rule as pgvector's binary_quantize: 1 for positive components
+        return Bit(np.asarray(embedding) > 0)
+    if quantization == "halfvec":
+        return HalfVector(embedding)
+    raise ValueError(f"Unknown quantization: {quantization}")
+
+def ensure_quantized_columns(conn: psycopg.Connection, quantization: str) -> None:
+    """Add the quantized embedding columns to htmx_embeddings if they don't exist yet."""
+    try:
+        with conn.cursor() as cur:
+            if quantization == "halfvec":
+                cur.execute("SELECT to_regtype('halfvec') IS NOT NULL")
+                if not cur.fetchone()[0]:
+                    raise ValueError("halfvec quantization requires pgvector 0.7 or later")
+            
+            # Quantized columns have the same number of dimensions as the full columns
             cur.execute("""
-                SELECT 
-                    id,
-                    (title_embedding IS NOT NULL) AS has_title_embedding,
-                    (description_embedding IS NOT NULL) AS has_description_embedding,
-                    (content_embedding IS NOT NULL) AS has_content_embedding,
-                    (key_concepts_embedding IS NOT NULL) AS has_key_concepts_embedding
-                FROM htmx_embeddings
-                WHERE id = %s
-            """, (example_id,))
+                SELECT atttypmod FROM pg_attribute
+                WHERE attrelid = 'htmx_embeddings'::regclass AND attname = 'content_embedding'
+            """)
+            dimension = cur.fetchone()[0]
             
-            result = cur.fetchone()
+            column_type = QUANTIZED_COLUMN_TYPES[quantization]
+            for column in EMBEDDING_COLUMNS:
+                cur.execute(
+                    f"ALTER TABLE htmx_embeddings ADD COLUMN IF NOT EXISTS "
+                    f"{quantized_column(column, quantization)} {column_type}({dimension})"
+                )
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error adding {quantization} quantized columns: {e}")
+        raise
+
+def existing_quantizations(conn: psycopg.Connection) -> List[str]:
+    """Return the quantizations whose columns already exist in htmx_embeddings."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT attname FROM pg_attribute WHERE attrelid = 'htmx_embeddings'::regclass AND NOT attisdropped"
+        )
+        columns = {row[0] for row in cur.fetchall()}
+    return [
+        quantization for quantization in QUANTIZATIONS
+        if quantized_column(EMBEDDING_COLUMNS[0], quantization) in columns
+    ]
+
+def backfill_quantized_columns(conn: psycopg.Connection, quantization: str, chunk_size: int = 500) -> int:
+    """
+    Fill in the quantized columns of embeddings written before quantization was enabled.
+
+    Rows are walked in id order in chunks, so the backfill can be interrupted
+    and resumed. Returns the number of rows updated.
+    """
+    quantized_columns = [quantized_column(column, quantization) for column in EMBEDDING_COLUMNS]
+    missing = " OR ".join(
+        f"({quantized} IS NULL AND {column} IS NOT NULL)"
+        for column, quantized in zip(EMBEDDING_COLUMNS, quantized_columns)
+    )
+    updated = 0
+    last_id = ""
+    try:
+        with conn.cursor() as cur:
+            while True:
+                cur.execute(
+                    f"SELECT id, {', '.join(EMBEDDING_COLUMNS)} FROM htmx_embeddings "
+                    f"WHERE id > %s AND ({missing}) ORDER BY id LIMIT %s",
+                    (last_id, chunk_size)
+                )
+                rows = cur.fetchall()
+                if not rows:
+                    break
+                
+                cur.executemany(
+                    f"UPDATE htmx_embeddings SET {', '.join(f'{quantized} = %b' for quantized in quantized_columns)} "
+                    f"WHERE id = %s",
+                    [
+                        [
+                            None if embedding is None else quantize_embedding(embedding.to_numpy(), quantization)
+                            for embedding in row[1:]
+                        ] + [row[0]]
+                        for row in rows
+                    ]
+                )
+                conn.commit()
+                updated += len(rows)
+                last_id = rows[-1][0]
+        
+        if updated:
+            logger.info(f"Backfilled {quantization} quantized embeddings for {updated} examples")
+        return updated
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error backfilling {quantization} quantized embeddings: {e}")
+        raise
+
+def find_stale_embeddings(
+    conn: psycopg.Connection,
+    requests: List[Tuple[str, str, str]]
+) -> set:
+    """
+    Return the (example id, embedding field) pairs that are missing or were built from different text.
+
+    All requests are checked in a single set-based query that compares the hash of
+    each prepared text with the source hash recorded next to the stored embedding.
+    """
+    if not requests:
+        return set()
+    
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT s.id, s.embedding_field
+                FROM unnest(%s::text[], %s::text[], %s::text[]) AS s(id, embedding_field, source_hash)
+                LEFT JOIN htmx_embeddings emb ON emb.id = s.id
+                WHERE emb.id IS NULL
+                   OR CASE s.embedding_field
+                        WHEN 'title_embedding' THEN
+                            emb.title_embedding IS NULL OR emb.title_source_hash IS DISTINCT FROM s.source_hash
+                        WHEN 'description_embedding' THEN
+                            emb.description_embedding IS NULL OR emb.description_source_hash IS DISTINCT FROM s.source_hash
+                        WHEN 'content_embedding' THEN
+                            emb.content_embedding IS NULL OR emb.content_source_hash IS DISTINCT FROM s.source_hash
+                        WHEN 'key_concepts_embedding' THEN
+                            emb.key_concepts_embedding IS NULL OR emb.key_concepts_source_hash IS DISTINCT FROM s.source_hash
+                      END
+            """, (
+                [example_id for example_id, _, _ in requests],
+                [field_name for _, field_name, _ in requests],
+                [source_text_hash(text) for _, _, text in requests],
+            ))
             
-            if result:
-                return {
-                    "title_embedding": result["has_title_embedding"],
-                    "description_embedding": result["has_description_embedding"],
-                    "content_embedding": result["has_content_embedding"],
-                    "key_concepts_embedding": result["has_key_concepts_embedding"]
-                }
-            else:
-                # No embeddings exist for this example
-                return {
-                    "title_embedding": False,
-                    "description_embedding": False,
-                    "content_embedding": False,
-                    "key_concepts_embedding": False
-                }
+            return {(example_id, field_name) for example_id, field_name in cur.fetchall()}
     except Exception as e:
-        logger.error(f"Error checking embeddings existence: {e}")
+        logger.error(f"Error checking for stale embeddings: {e}")
         raise
 
 def prepare_example_content(example: Dict[str, Any]) -> Dict[str, str]:
@@ -225,62 +388,46 @@ def prepare_example_content(example: Dict[str, Any]) -> Dict[str, str]:
     
     return prepared_content
 
-def generate_embedding(text: str, client: genai.Client, task_type: str = "RETRIEVAL_DOCUMENT") -> List[float]:
-    """Generate embedding for text using Google's Generative AI."""
-    try:
-        # Create configuration
-        config = EmbedContentConfig(
-            task_type=task_type,
-            output_dimensionality=DIMENSION,
-        )
-        
-        # Truncate text if too long (Google AI has token limits)
-        max_chars = 25000  # Approximately 7k tokens
-        if len(text) > max_chars:
-            text = text[:max_chars]
-        
-        # Call the embedding API
-        response = client.models.embed_content(
-            model=MODEL,
-            contents=[text],
-            config=config
-        )
-        
-        # Return embedding values
-        return response.embeddings[0].values
-    except Exception as e:
-        logger.error(f"Error generating embedding: {e}")
-        raise
+def generate_embedding(
+    text: str,
+    provider: EmbeddingProvider,
+    task_type: str = "RETRIEVAL_DOCUMENT",
+    rate_limiter: Optional[RateLimiter] = None
+) -> np.ndarray:
+    """Generate embedding for text with the given embedding provider."""
+    return provider.embed([text], task_type=task_type, rate_limiter=rate_limiter)[0]
+
+def document_cache_key(text: str, provider: EmbeddingProvider) -> str:
+    """Cache key for a text embedded as a retrieval document by the given provider."""
+    return cache_key(provider.model, "RETRIEVAL_DOCUMENT", provider.dimension, text)
 
-def generate_example_embeddings(example: Dict[str, Any], client: genai.Client, force_update: bool = False) -> Dict[str, List[float]]:
-    """Generate embeddings for a single example."""
-    # Prepare content for embedding
-    prepared_content = prepare_example_content(example)
-    result_embeddings = {}
+def prepare_embedding_requests(example: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+    """List the (example id, embedding field, text) triples that need embedding for an example."""
+    requests = []
     
-    # Generate an embedding for each content type
-    for content_type, content in prepared_content.items():
+    for content_type, content in prepare_example_content(example).items():
         if not content:
             logger.warning(f"Empty content for {content_type} in example {example['id']}")
             continue
         
-        # Generate embedding
-        logger.info(f"Generating {content_type} embedding for example {example['id']}")
-        
-        try:
-            embedding = generate_embedding(content, client, task_type="RETRIEVAL_DOCUMENT")
-            
-            # Map content type to corresponding embedding field name
-            embedding_field_name = f"{content_type}_embedding"
-            result_embeddings[embedding_field_name] = embedding
-            
-            # Add a small delay to avoid rate limiting
-            time.sleep(0.5)
-            
-        except Exception as e:
-            logger.error(f"Error generating {content_type} embedding for example {example['id']}: {e}")
+        # Map content type to corresponding embedding field name
+        requests.append((example["id"], f"{content_type}_embedding", content))
     
-    return result_embeddings
+    return requests
+
+def embed_request_batch(
+    batch: List[Tuple[str, str, str]],
+    provider: EmbeddingProvider,
+    rate_limiter: Optional[RateLimiter] = None
+) -> List[Tuple[str, str, np.ndarray]]:
+    """Embed a batch of (example id, embedding field, text) triples with one provider call."""
+    embeddings = provider.embed(
+        [text for _, _, text in batch], task_type="RETRIEVAL_DOCUMENT", rate_limiter=rate_limiter
+    )
+    return [
+        (example_id, field_name, embedding)
+        for (example_id, field_name, _), embedding in zip(batch, embeddings)
+    ]
 
 def update_db_schema_for_google_ai(conn: psycopg.Connection) -> bool:
     """Update the database schema to support Google AI embeddings (768 dimensions)."""
@@ -362,61 +509,50 @@ def update_db_schema_for_google_ai(conn: psycopg.Connection) -> bool:
 
 def batch_update_embeddings(
     conn: psycopg.Connection,
-    embedding_data: List[Tuple[str, Dict[str, List[float]]]]
+    embedding_data: List[Tuple[str, Dict[str, Any]]]
 ) -> bool:
-    """Update embeddings for multiple examples in a single transaction."""
+    """
+    Upsert embeddings for multiple examples in a single transaction.
+    
+    Rows are grouped by the set of columns they supply, and each group is sent
+    as one INSERT ... ON CONFLICT (id) DO UPDATE through executemany, which
+    pipelines the statements instead of waiting for a round trip per row. Only
+    the supplied columns are written, so other embeddings of an existing row
+    are left untouched.
+    """
+    allowed_columns = EMBEDDING_COLUMNS + SOURCE_HASH_COLUMNS + QUANTIZED_COLUMNS
+    groups: Dict[Tuple[str, ...], List[List[Any]]] = {}
+    for example_id, embeddings in embedding_data:
+        for column in embeddings:
+            if column not in allowed_columns:
+                logger.warning(f"Ignoring invalid embedding type: {column}")
+        columns = tuple(column for column in embeddings if column in allowed_columns)
+        if not columns:
+            logger.warning(f"No valid embedding types to update for example: {example_id}")
+            continue
+        groups.setdefault(columns, []).append([example_id] + [embeddings[column] for column in columns])
+    
     try:
         with conn.cursor() as cur:
-            # Begin transaction
-            cur.execute("BEGIN")
-            
-            for example_id, embeddings in embedding_data:
-                # Check if a row exists for this example in htmx_embeddings
-                cur.execute("SELECT 1 FROM htmx_embeddings WHERE id = %s", (example_id,))
-                row_exists = cur.fetchone() is not None
-                
-                # Prepare SQL command and values based on whether the row exists
-                set_clauses = []
-                values = []
-                
-                for embedding_type, embedding_vector in embeddings.items():
-                    if embedding_type not in ["title_embedding", "description_embedding", "content_embedding", "key_concepts_embedding"]:
-                        logger.warning(f"Ignoring invalid embedding type: {embedding_type}")
-                        continue
-                    
-                    set_clauses.append(f"{embedding_type} = %s")
-                    values.append(embedding_vector)
-                
-                if not set_clauses:
-                    logger.warning(f"No valid embedding types to update for example: {example_id}")
-                    continue
-                
-                # Build the SQL query
-                if row_exists:
-                    # Update existing row
-                    sql = f"""
-                        UPDATE htmx_embeddings
-                        SET {', '.join(set_clauses)}
-                        WHERE id = %s
-                    """
-                    values.append(example_id)
-                else:
-                    # Insert new row
-                    sql = f"""
-                        INSERT INTO htmx_embeddings
-                        (id, {', '.join(embedding_type for embedding_type in embeddings.keys() if embedding_type in ["title_embedding", "description_embedding", "content_embedding", "key_concepts_embedding"])})
-                        VALUES (%s, {', '.join(['%s'] * len(set_clauses))})
-                    """
-                    values = [example_id] + values
-                
-                # Execute the query
-                cur.execute(sql, values)
-            
-            # Commit transaction
-            conn.commit()
-            
-            logger.info(f"Successfully updated embeddings for {len(embedding_data)} examples in batch")
-            return True
+            for columns, rows in groups.items():
+                query = sql.SQL("""
+                    INSERT INTO htmx_embeddings (id, {columns})
+                    VALUES (%s, {values})
+                    ON CONFLICT (id) DO UPDATE SET {updates}
+                """).format(
+                    columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+                    # Vectors are sent in pgvector's binary format
+                    values=sql.SQL(", ").join(sql.Placeholder(format="b") for _ in columns),
+                    updates=sql.SQL(", ").join(
+                        sql.SQL("{} = EXCLUDED.{}").format(sql.Identifier(column), sql.Identifier(column))
+                        for column in columns
+                    )
+                )
+                cur.executemany(query, rows)
+        conn.commit()
+        
+        logger.info(f"Successfully updated embeddings for {len(embedding_data)} examples in batch")
+        return True
     except Exception as e:
         conn.rollback()
         logger.error(f"Error updating embeddings in batch: {e}")
@@ -424,77 +560,261 @@ def batch_update_embeddings(
 
 def process_examples(
     conn: psycopg.Connection,
-    client: genai.Client,
+    provider: EmbeddingProvider,
     limit: Optional[int] = None,
     filter_condition: Optional[str] = None,
     force_update: bool = False,
-    batch_size: int = 10
+    batch_size: int = 10,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+    texts_per_request: int = MAX_TEXTS_PER_REQUEST,
+    cache: Optional[EmbeddingCache] = None,
+    fetch_size: int = DEFAULT_FETCH_SIZE,
+    read_conn: Optional[psycopg.Connection] = None,
+    quantize: Optional[List[str]] = None
 ) -> bool:
-    """Process examples and generate embeddings."""
+    """
+    Process examples and generate embeddings.
+
+    Only (example, embedding type) pairs whose embedding is missing or was built
+    from different source text are embedded, unless force_update is set. Texts
+    already present in the embedding cache are served from it. The rest are
+    packed from many examples into multi-text embed_content requests, which run
+    concurrently within the API request budget. Vectors are fanned back out to
+    their examples, and each example is queued for the database once all of its
+    embeddings have arrived. An example whose requests partly failed has the
+    embeddings that did arrive written but counts as an error; the missing ones
+    are picked up again by the next run.
+
+    Examples are streamed from the database in chunks of fetch_size over
+    read_conn (a dedicated connection is opened if none is given), so embedding
+    starts as soon as the first chunk arrives.
+
+    For each quantization in quantize, and for every quantization whose columns
+    already exist, a quantized copy of every new embedding is written next to
+    it, and existing embeddings without one are backfilled.
+    """
+    owns_read_conn = read_conn is None
     try:
-        # Fetch examples from the database
-        examples = fetch_examples(conn, limit=limit, filter_condition=filter_condition)
+        ensure_source_hash_columns(conn)
+        # Keep quantized columns added by an earlier run in step with the full vectors
+        existing = existing_quantizations(conn)
+        quantize = [
+            quantization for quantization in QUANTIZATIONS
+            if quantization in (quantize or []) or quantization in existing
+        ]
+        for quantization in quantize:
+            ensure_quantized_columns(conn, quantization)
+            backfill_quantized_columns(conn, quantization)
+        if owns_read_conn:
+            read_conn = connect_to_db()
         
-        if not examples:
-            logger.warning("No examples found in the database")
-            return True
-        
-        logger.info(f"Processing {len(examples)} examples")
+        texts_per_request = max(1, min(texts_per_request, provider.max_batch_size))
+        logger.info(
+            f"Processing examples with the {provider.name} embedding provider, {concurrency} workers, "
+            f"{texts_per_request} texts per request, at up to {requests_per_second} requests/s"
+        )
         
         # Process examples in batches for efficient database updates
+        rate_limiter = RateLimiter(requests_per_second)
+        text_queue = []
+        pending = {}
+        partial_embeddings = {}
+        remaining_texts = {}
+        failed_examples = set()
         batch_data = []
         success_count = 0
         error_count = 0
+        request_count = 0
+        
+        def flush_batch() -> None:
+            nonlocal batch_data, success_count, error_count
+            if not batch_data:
+                return
+            partial_count = sum(1 for example_id, _ in batch_data if example_id in failed_examples)
+            if batch_update_embeddings(conn, batch_data):
+                success_count += len(batch_data) - partial_count
+                error_count += partial_count
+            else:
+                error_count += len(batch_data)
+            failed_examples.difference_update(example_id for example_id, _ in batch_data)
+            batch_data = []
         
-        for index, example in enumerate(examples):
-            example_id = example['id']
-            logger.info(f"Processing example {index + 1}/{len(examples)}: {example_id}")
+        def submit_texts(executor: ThreadPoolExecutor, count: int) -> None:
+            nonlocal text_queue, request_count
+            batch, text_queue = text_queue[:count], text_queue[count:]
+            future = executor.submit(embed_request_batch, batch, provider, rate_limiter)
+            pending[future] = batch
+            request_count += 1
+        
+        def add_embedding(example_id: str, field_name: str, text: str, embedding: np.ndarray) -> None:
+            partial_embeddings[example_id][field_name] = embedding
+            partial_embeddings[example_id][source_hash_column(field_name)] = source_text_hash(text)
+            for quantization in quantize:
+                partial_embeddings[example_id][quantized_column(field_name, quantization)] = quantize_embedding(
+                    embedding, quantization
+                )
+        
+        def finish_example(example_id: str) -> None:
+            nonlocal error_count
+            embeddings = partial_embeddings.pop(example_id)
+            if not embeddings:
+                logger.warning(f"No embeddings generated for example {example_id}")
+                failed_examples.discard(example_id)
+                error_count += 1
+                return
+            if example_id in failed_examples:
+                logger.warning(
+                    f"Some embeddings failed for example {example_id}; "
+                    f"writing the rest, the missing ones will be retried on the next run"
+                )
             
-            try:
-                # Check if embeddings already exist for this example
-                existing_embeddings = check_embeddings_exist(conn, example_id)
-                
-                # Skip if all embeddings exist and force_update is False
-                if all(existing_embeddings.values()) and not force_update:
-                    logger.info(f"Skipping example {example_id} - embeddings already exist")
-                    success_count += 1
+            # Update database when batch is full
+            batch_data.append((example_id, embeddings))
+            if len(batch_data) >= batch_size:
+                flush_batch()
+        
+        def finish_text(example_id: str) -> None:
+            remaining_texts[example_id] -= 1
+            if remaining_texts[example_id] == 0:
+                del remaining_texts[example_id]
+                finish_example(example_id)
+        
+        def collect_results(return_when: str) -> None:
+            done, _ = wait(list(pending), return_when=return_when)
+            for future in done:
+                batch = pending.pop(future)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.error(f"Error embedding batch of {len(batch)} texts: {e}")
+                    for example_id, _, _ in batch:
+                        failed_examples.add(example_id)
+                        finish_text(example_id)
                     continue
                 
-                # Generate embeddings
-                embeddings = generate_example_embeddings(example, client, force_update=force_update)
+                if cache:
+                    cache.put_many({
+                        document_cache_key(text, provider): embedding
+                        for (_, _, text), (_, _, embedding) in zip(batch, results)
+                    })
                 
-                if not embeddings:
-                    logger.warning(f"No embeddings generated for example {example_id}")
-                    error_count += 1
-                    continue
-                
-                # Add to batch data
-                batch_data.append((example_id, embeddings))
+                # Fan the vectors back out to their examples
+                for (_, _, text), (example_id, field_name, embedding) in zip(batch, results):
+                    add_embedding(example_id, field_name, text, embedding)
+                    finish_text(example_id)
+        
+        example_count = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for examples in iter_example_chunks(read_conn, limit, filter_condition, chunk_size=fetch_size):
+                # Find the embeddings in this chunk that are missing or stale in a single query
+                example_requests = {example['id']: prepare_embedding_requests(example) for example in examples}
+                if not force_update:
+                    stale_embeddings = find_stale_embeddings(
+                        conn, [request for requests in example_requests.values() for request in requests]
+                    )
+                    # End the read-only transaction so that it does not stay open across the
+                    # embedding calls: updated_at is taken from the writing transaction's start
+                    conn.commit()
+                    logger.info(f"Found {len(stale_embeddings)} missing or stale embeddings in chunk")
                 
-                # Update database when batch is full or this is the last example
-                if len(batch_data) >= batch_size or index == len(examples) - 1:
-                    if batch_update_embeddings(conn, batch_data):
-                        success_count += len(batch_data)
-                    else:
-                        error_count += len(batch_data)
+                for example in examples:
+                    example_id = example['id']
+                    example_count += 1
+                    logger.info(f"Processing example {example_count}: {example_id}")
                     
-                    # Clear batch data
-                    batch_data = []
-                
-            except Exception as e:
-                logger.error(f"Error processing example {example_id}: {e}")
-                error_count += 1
+                    requests = example_requests[example_id]
+                    if not requests:
+                        logger.warning(f"No embeddings generated for example {example_id}")
+                        error_count += 1
+                        continue
+                    
+                    # Skip embeddings that are up to date unless force_update is set
+                    if not force_update:
+                        requests = [
+                            request for request in requests
+                            if (example_id, request[1]) in stale_embeddings
+                        ]
+                        if not requests:
+                            logger.info(f"Skipping example {example_id} - embeddings are up to date")
+                            success_count += 1
+                            continue
+                    
+                    partial_embeddings[example_id] = {}
+                    
+                    # Serve texts we have embedded before from the cache
+                    if cache:
+                        cached = cache.get_many(document_cache_key(text, provider) for _, _, text in requests)
+                        uncached_requests = []
+                        for request in requests:
+                            embedding = cached.get(document_cache_key(request[2], provider))
+                            if embedding is None:
+                                uncached_requests.append(request)
+                            else:
+                                add_embedding(example_id, request[1], request[2], embedding)
+                        requests = uncached_requests
+                    
+                    if not requests:
+                        finish_example(example_id)
+                        continue
+                    
+                    remaining_texts[example_id] = len(requests)
+                    text_queue.extend(requests)
+                    
+                    # Send full requests as soon as enough texts are queued
+                    while len(text_queue) >= texts_per_request:
+                        submit_texts(executor, texts_per_request)
+                    
+                    # Keep a bounded number of requests in flight
+                    if len(pending) >= concurrency * 2:
+                        collect_results(FIRST_COMPLETED)
+            
+            # Send the final partial request
+            if text_queue:
+                submit_texts(executor, len(text_queue))
+            
+            while pending:
+                collect_results(ALL_COMPLETED)
+        
+        # Write whatever is left in the final partial batch
+        flush_batch()
         
-        logger.info(f"Processing completed. Success: {success_count}, Errors: {error_count}")
+        if example_count == 0:
+            logger.warning("No examples found in the database")
+            return True
+        
+        logger.info(
+            f"Processing completed. Success: {success_count}, Errors: {error_count}, "
+            f"Embedding requests: {request_count}"
+        )
+        if cache:
+            stats = cache.stats()
+            logger.info(
+                f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%} hit rate), {stats['writes']} writes, "
+                f"{stats['evictions']} evictions, {stats['size_mb']} MB"
+            )
         return error_count == 0
     except Exception as e:
         logger.error(f"Error processing examples: {e}")
         return False
+    finally:
+        if owns_read_conn and read_conn is not None:
+            read_conn.close()
 
 def main():
     """Main function to run the embedding generation process."""
     parser = argparse.ArgumentParser(description="Generate embeddings for HTMX examples using Google AI API")
     
+    parser.add_argument(
+        "--provider",
+        type=str,
+        choices=PROVIDERS,
+        default=DEFAULT_PROVIDER,
+        help="Embedding provider: the Google AI API, or local deterministic hashing embeddings for "
+             f"offline and load-test runs (default: {DEFAULT_PROVIDER})"
+    )
+    
     parser.add_argument(
         "--limit",
         type=int,
@@ -528,15 +848,80 @@ def main():
         help="Update database schema for Google AI embeddings (changes vector dimensions to 768)"
     )
     
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Number of concurrent embedding workers (default: {DEFAULT_CONCURRENCY})"
+    )
+    
+    parser.add_argument(
+        "--requests-per-second",
+        type=float,
+        default=DEFAULT_REQUESTS_PER_SECOND,
+        help=f"Maximum embedding API requests per second (default: {DEFAULT_REQUESTS_PER_SECOND})"
+    )
+    
+    parser.add_argument(
+        "--texts-per-request",
+        type=int,
+        default=MAX_TEXTS_PER_REQUEST,
+        help=f"Number of texts packed into each embedding API request (default: {MAX_TEXTS_PER_REQUEST})"
+    )
+    
+    parser.add_argument(
+        "--fetch-size",
+        type=int,
+        default=DEFAULT_FETCH_SIZE,
+        help=f"Number of examples streamed from the database per round trip (default: {DEFAULT_FETCH_SIZE})"
+    )
+    
+    parser.add_argument(
+        "--quantize",
+        type=str,
+        action="append",
+        choices=QUANTIZATIONS,
+        default=None,
+        help="Also write quantized copies of the embeddings (binary, or halfvec with pgvector >= 0.7); "
+             "may be given more than once"
+    )
+    
+    parser.add_argument(
+        "--cache-path",
+        type=str,
+        default=DEFAULT_CACHE_PATH,
+        help=f"Path of the on-disk embedding cache (default: {DEFAULT_CACHE_PATH})"
+    )
+    
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=DEFAULT_MAX_MB,
+        help=f"Maximum size of the embedding cache in megabytes (default: {DEFAULT_MAX_MB})"
+    )
+    
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the embedding cache and always call the embedding API"
+    )
+    
     args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
     
     try:
-        # Configure Google AI client
-        client = create_genai_client()
+        # Configure the embedding provider
+        provider = create_embedding_provider(args.provider)
         
         # Connect to the database
         conn = connect_to_db()
         
+        # Open the embedding cache unless it is disabled
+        cache = None
+        if not args.no_cache:
+            cache = EmbeddingCache(args.cache_path, max_bytes=args.cache_max_mb * 1024 * 1024)
+        
         # Update database schema if requested
         if args.update_schema:
             if update_db_schema_for_google_ai(conn):
@@ -548,11 +933,17 @@ def main():
         # Process examples
         if process_examples(
             conn=conn,
-            client=client,
+            provider=provider,
             limit=args.limit,
             filter_condition=args.filter,
             force_update=args.force_update,
-            batch_size=args.batch_size
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            requests_per_second=args.requests_per_second,
+            texts_per_request=args.texts_per_request,
+            cache=cache,
+            fetch_size=args.fetch_size,
+            quantize=args.quantize
         ):
             logger.info("Embedding generation completed successfully")
         else:
@@ -563,6 +954,8 @@ def main():
     finally:
         if 'conn' in locals():
             conn.close()
+        if locals().get('cache'):
+            cache.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Persistent, content-addressed cache for embedding vectors.
+
+Vectors are stored in a local SQLite database keyed by a hash of the embedding
+model, task type, output dimension and the exact text that was embedded, so a
+text is only ever sent to the embedding API once per model configuration.
+Entries can optionally expire after a time-to-live, and TieredEmbeddingCache
+puts an in-process LRU in front of the SQLite store for repeated lookups.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Sequence, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+DEFAULT_MAX_MB = 512
+
+# Fraction of the size budget to shrink to when eviction kicks in, so we don't
+# evict on every single write once the cache is full
+EVICTION_TARGET = 0.9
+
+# Keys bound per IN (...) lookup, well below SQLite's bound parameter limit
+KEYS_PER_STATEMENT = 500
+
+def cache_key(model: str, task_type: str, dimension: int, text: str) -> str:
+    """Build the cache key for a text embedded with a given model configuration."""
+    digest = hashlib.sha256()
+    for part in (model, task_type, str(dimension), text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+class EmbeddingCache:
+    """SQLite-backed embedding cache with least-recently-used, size-based eviction."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024,
+        ttl: Optional[float] = None
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                created REAL NOT NULL DEFAULT 0
+            )
+        """)
+        # Caches created before entries had a creation time get the column added
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(embeddings)")]
+        if "created" not in columns:
+            self.conn.execute("ALTER TABLE embeddings ADD COLUMN created REAL NOT NULL DEFAULT 0")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used_idx ON embeddings(last_used)")
+        self.conn.commit()
+
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        logger.info(f"Opened embedding cache at {path} ({self.total_bytes / 1024 / 1024:.1f} MB)")
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Look up several keys at once, returning only the ones that are cached."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        found = {}
+        expired = []
+        now = time.time()
+        with self.lock:
+            for start in range(0, len(keys), KEYS_PER_STATEMENT):
+                chunk = keys[start:start + KEYS_PER_STATEMENT]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT key, vector, size, created FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob, size, created in rows:
+                    if self.ttl is not None and created < now - self.ttl:
+                        expired.append((key, size))
+                    else:
+                        found[key] = np.frombuffer(blob, dtype=np.float32)
+
+            # Expired entries count as misses and are removed straight away
+            if expired:
+                self.conn.executemany("DELETE FROM embeddings WHERE key = ?", [(key,) for key, _ in expired])
+                self.conn.commit()
+                self.total_bytes -= sum(size for _, size in expired)
+                self.evictions += len(expired)
+
+            if found:
+                self.conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self.conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, Sequence[float]]) -> None:
+        """Store several vectors as float32 and evict old entries if the cache is over budget."""
+        if not items:
+            return
+
+        now = time.time()
+        rows = []
+        for key, vector in items.items():
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((key, blob, len(blob), now, now))
+
+        with self.lock:
+            keys = [row[0] for row in rows]
+            replaced = 0
+            for start in range(0, len(keys), KEYS_PER_STATEMENT):
+                chunk = keys[start:start + KEYS_PER_STATEMENT]
+                placeholders = ", ".join("?" * len(chunk))
+                replaced += self.conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchone()[0]
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, size, last_used, created) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self.conn.commit()
+            self.total_bytes += sum(row[2] for row in rows) - replaced
+            self.writes += len(rows)
+
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits its size budget."""
+        target = int(self.max_bytes * EVICTION_TARGET)
+        to_free = self.total_bytes - target
+        freed = 0
+        victims = []
+
+        for key, size in self.conn.execute("SELECT key, size FROM embeddings ORDER BY last_used"):
+            if freed >= to_free:
+                break
+            victims.append((key,))
+            freed += size
+
+        self.conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+        self.conn.commit()
+        self.total_bytes -= freed
+        self.evictions += len(victims)
+        logger.info(f"Evicted {len(victims)} entries ({freed / 1024 / 1024:.1f} MB) from embedding cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and size information for this cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "size_mb": round(self.total_bytes / 1024 / 1024, 2),
+        }
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+        with self.lock:
+            self.conn.close()
+
+class TieredEmbeddingCache:
+    """In-process LRU in front of a persistent EmbeddingCache.
+
+    Lookups are answered from memory when possible and fall through to SQLite
+    otherwise; vectors found on disk are promoted into memory. The persistent
+    tier is optional, so this also works as a pure in-memory cache.
+    """
+
+    def __init__(self, persistent: Optional[EmbeddingCache] = None, max_entries: int = 1024):
+        self.persistent = persistent
+        self.max_entries = max_entries
+        self.memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        """Insert a vector into the in-memory tier, dropping the least recently used entry if full."""
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Look up several keys, checking memory first and then the persistent cache."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self.lock:
+            for key in keys:
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    found[key] = self.memory[key]
+            self.memory_hits += len(found)
+
+        remaining = [key for key in keys if key not in found]
+        if remaining and self.persistent:
+            from_disk = self.persistent.get_many(remaining)
+            with self.lock:
+                for key, vector in from_disk.items():
+                    self._remember(key, vector)
+                self.persistent_hits += len(from_disk)
+            found.update(from_disk)
+
+        with self.lock:
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, Sequence[float]]) -> None:
+        """Store several vectors in both tiers."""
+        if not items:
+            return
+        with self.lock:
+            for key, vector in items.items():
+                self._remember(key, np.asarray(vector, dtype=np.float32))
+        if self.persistent:
+            self.persistent.put_many(items)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for each tier."""
+        hits = self.memory_hits + self.persistent_hits
+        lookups = hits + self.misses
+        stats = {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+        }
+        if self.persistent:
+            persistent_stats = self.persistent.stats()
+            stats["writes"] = persistent_stats["writes"]
+            stats["evictions"] = persistent_stats["evictions"]
+            stats["size_mb"] = persistent_stats["size_mb"]
+        return stats
+
+    def close(self) -> None:
+        """Close the persistent tier, if any."""
+        if self.persistent:
+            self.persistent.close()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Embedding providers shared by embed_examples.py and query_htmx.py.
+
+An EmbeddingProvider turns a batch of texts into DIMENSION-sized float32
+vectors. GoogleEmbeddingProvider calls the Google Generative AI embedding API
+with rate limiting and retries. HashingEmbeddingProvider is a deterministic,
+CPU-only feature-hashing embedder that needs no network or API key, for
+offline runs, load tests and CI-style performance runs. Its vectors capture
+shared vocabulary only, so it is not a substitute for the semantic model.
+"""
+
+import os
+import re
+import time
+import zlib
+import random
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+import numpy as np
+
+try:
+    from google import genai
+    from google.genai import errors as genai_errors
+    from google.genai.types import EmbedContentConfig
+except ImportError:
+    # Only the Google provider needs google-genai
+    genai = None
+
+logger = logging.getLogger(__name__)
+
+# IMPORTANT: Must use the format "models/text-embedding-004" even though
+# Google's documentation lists models like "text-embedding-004" or "textembedding-gecko@003"
+GOOGLE_MODEL = "models/text-embedding-004"
+DIMENSION = 768
+
+# The embedding API accepts at most 100 texts per embed_content request
+MAX_TEXTS_PER_REQUEST = 100
+# Texts are truncated to roughly the model's 7k token limit
+MAX_TEXT_CHARS = 25000
+MAX_RETRIES = 5
+# HTTP status codes that indicate we should back off and retry
+RETRYABLE_STATUS_CODES = {429, 500, 503}
+
+# Versioned so that changing the hashing scheme never reuses stale cache entries
+HASHING_MODEL = "local/feature-hashing-v1"
+HASHING_BATCH_SIZE = 1000
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_][a-z0-9]+)*")
+
+PROVIDERS = ["google", "hashing"]
+DEFAULT_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "google")
+
+class RateLimiter:
+    """
+    Thread-safe token bucket that paces embedding API requests.
+
+    The bucket refills at `rate` tokens per second up to `burst` tokens. When the
+    API answers with HTTP 429 the effective rate is halved (down to `min_rate`),
+    and every successful request nudges it back up towards the configured rate.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None, min_rate: float = 0.1):
+        if rate <= 0:
+            raise ValueError("Rate limit must be greater than zero")
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait_time)
+
+    def throttle(self, delay: float) -> None:
+        """Halve the request rate and pause all callers for `delay` seconds."""
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            self.tokens = 0.0
+            logger.warning(f"Rate limited by embedding API, slowing down to {self.rate:.2f} requests/s")
+
+    def recover(self) -> None:
+        """Additively raise the request rate back towards the configured maximum."""
+        with self.lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+class EmbeddingProvider(ABC):
+    """
+    Base class for embedding backends.
+
+    `model` identifies the vector space and is part of every cache key, so
+    vectors from different providers are never mixed up. `max_batch_size` is
+    the largest number of texts one embed() call accepts.
+    """
+
+    name = "base"
+    model = ""
+    dimension = DIMENSION
+    max_batch_size = MAX_TEXTS_PER_REQUEST
+
+    @abstractmethod
+    def embed(
+        self,
+        texts: List[str],
+        task_type: str = "RETRIEVAL_DOCUMENT",
+        rate_limiter: Optional[RateLimiter] = None
+    ) -> List[np.ndarray]:
+        """Embed texts, returning one float32 vector per text in request order."""
+
+class GoogleEmbeddingProvider(EmbeddingProvider):
+    """Embeddings from Google's text-embedding-004 model."""
+
+    name = "google"
+
+    def __init__(
+        self,
+        client: "genai.Client",
+        model: str = GOOGLE_MODEL,
+        dimension: int = DIMENSION,
+        max_retries: int = MAX_RETRIES
+    ):
+        self.client = client
+        self.model = model
+        self.dimension = dimension
+        self.max_retries = max_retries
+
+    def embed(
+        self,
+        texts: List[str],
+        task_type: str = "RETRIEVAL_DOCUMENT",
+        rate_limiter: Optional[RateLimiter] = None
+    ) -> List[np.ndarray]:
+        """Embed texts with a single embed_content request, retrying with backoff."""
+        try:
+            if len(texts) > self.max_batch_size:
+                raise ValueError(f"At most {self.max_batch_size} texts can be embedded per request, got {len(texts)}")
+
+            config = EmbedContentConfig(
+                task_type=task_type,
+                output_dimensionality=self.dimension,
+            )
+            contents = [text[:MAX_TEXT_CHARS] for text in texts]
+
+            for attempt in range(self.max_retries + 1):
+                if rate_limiter:
+                    rate_limiter.acquire()
+
+                try:
+                    response = self.client.models.embed_content(
+                        model=self.model,
+                        contents=contents,
+                        config=config
+                    )
+                except genai_errors.APIError as e:
+                    if e.code not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                        raise
+
+                    # Exponential backoff with jitter before retrying
+                    delay = min(60.0, 2 ** attempt) + random.uniform(0, 1)
+                    if rate_limiter and e.code == 429:
+                        rate_limiter.throttle(delay)
+                    else:
+                        logger.warning(f"Embedding API returned {e.code}, retrying in {delay:.1f}s")
+                        time.sleep(delay)
+                    continue
+
+                if rate_limiter:
+                    rate_limiter.recover()
+
+                if len(response.embeddings) != len(contents):
+                    raise ValueError(
+                        f"Embedding API returned {len(response.embeddings)} embeddings for {len(contents)} texts"
+                    )
+
+                # Return embedding values in request order as compact float32 arrays
+                return [np.asarray(embedding.values, dtype=np.float32) for embedding in response.embeddings]
+        except Exception as e:
+            logger.error(f"Error generating embeddings: {e}")
+            raise
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Deterministic local embeddings built by feature hashing.
+
+    Lowercased word tokens and adjacent word pairs are hashed with CRC-32 into
+    one of `dimension` buckets with a hash-derived sign, counted with sublinear
+    (log) term frequency and L2-normalized. The same text always yields the
+    same vector in any process, and queries and documents share one space, so
+    task_type is ignored. Text without any tokens maps to a fixed unit vector
+    rather than the zero vector, whose cosine similarity is undefined (NaN).
+    """
+
+    name = "hashing"
+    model = HASHING_MODEL
+    max_batch_size = HASHING_BATCH_SIZE
+
+    def __init__(self, dimension: int = DIMENSION):
+        self.dimension = dimension
+
+    def _features(self, text: str) -> List[str]:
+        tokens = TOKEN_PATTERN.findall(text[:MAX_TEXT_CHARS].lower())
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed_one(self, text: str) -> np.ndarray:
+        """Embed a single text."""
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode("utf-8")) for feature in self._features(text)),
+            dtype=np.uint32
+        )
+        # The low bits choose the bucket and the top bit the sign
+        signs = np.where(hashes >> 31, -1.0, 1.0)
+        counts = np.bincount(hashes % self.dimension, weights=signs, minlength=self.dimension)
+        vector = (np.sign(counts) * np.log1p(np.abs(counts))).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            # No tokens (or features that cancel out): use the first basis vector
+            vector[0] = 1.0
+            return vector
+        return vector / norm
+
+    def embed(
+        self,
+        texts: List[str],
+        task_type: str = "RETRIEVAL_DOCUMENT",
+        rate_limiter: Optional[RateLimiter] = None
+    ) -> List[np.ndarray]:
+        """Embed texts locally; rate_limiter is accepted for interface compatibility and ignored."""
+        if len(texts) > self.max_batch_size:
+            raise ValueError(f"At most {self.max_batch_size} texts can be embedded per call, got {len(texts)}")
+        return [self.embed_one(text) for text in texts]
+
+def create_genai_client() -> "genai.Client":
+    """Create and configure Google Generative AI client."""
+    if genai is None:
+        raise ImportError("google-genai is not installed. Please run: uv add google-genai")
+
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY environment variable is not set. Please set it in the .env file.")
+
+    # Create a client directly
+    client = genai.Client(api_key=api_key)
+    logger.info("Google Generative AI client created with API key")
+    return client
+
+def create_embedding_provider(name: str = DEFAULT_PROVIDER, dimension: int = DIMENSION) -> EmbeddingProvider:
+    """Create the embedding provider registered under `name`."""
+    if name == "google":
+        return GoogleEmbeddingProvider(create_genai_client(), dimension=dimension)
+    if name == "hashing":
+        logger.info(f"Using local hashing embeddings ({dimension} dimensions)")
+        return HashingEmbeddingProvider(dimension=dimension)
+    raise ValueError(f"Unknown embedding provider: {name} (expected one of {', '.join(PROVIDERS)})")
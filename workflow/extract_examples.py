@@ -0,0 +1,595 @@
+#!/usr/bin/env python3
+"""
+Extract structured JSON from the scraped HTMX example pages.
+
+This replaces the serial `uvx strip-tags | llm` loop of extract_to_json.sh.
+Tags are stripped in-process with html.parser. Pages go through a bounded
+thread pool, so several LLM requests are in flight at once. A manifest next
+to the output records the SHA-256 of each source page and of the extraction
+settings, so a rerun only extracts pages whose HTML, prompt, schema or model
+changed. Every result is validated against htmx_examples_schema.json. Each
+JSON file and the manifest are written atomically, so an interrupted run
+resumes where it stopped.
+
+The LLM call goes through the Extractor interface. LLMExtractor runs the
+`llm` CLI. StubExtractor builds a record from the page itself, with no
+model or network, for offline runs and tests.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import logging
+import tempfile
+import threading
+import subprocess
+from abc import ABC, abstractmethod
+from html import unescape
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROMPT_FILE = os.path.join(SCRIPT_DIR, "htmx_extraction_prompt.txt")
+SCHEMA_FILE = os.path.join(SCRIPT_DIR, "htmx_examples_schema.json")
+
+DEFAULT_EXAMPLES_DIR = "../examples"
+DEFAULT_OUTPUT_DIR = "../processed_examples"
+# No .json suffix, so upload_to_postgres.py never mistakes it for an example
+MANIFEST_NAME = ".extract_manifest"
+
+# Concurrent extractions; LLM requests are I/O bound
+DEFAULT_WORKERS = 4
+# Seconds to wait for one `llm` invocation
+LLM_TIMEOUT = 300
+MAX_RETRIES = 2
+
+EXTRACTORS = ["llm", "stub"]
+
+# Concise schema passed to `llm --schema`, kept in sync with extract_to_json.sh
+LLM_SCHEMA = (
+    "id: unique identifier for the example, title: title of the example as shown on the page, "
+    "category: category of the example, url: original URL of the example, "
+    "description: short description of what the example demonstrates, "
+    "html_snippets: array of objects with code and description, "
+    "javascript_snippets: array of objects with code and description, "
+    "key_concepts: array of key HTMX concepts demonstrated, htmx_attributes: array of HTMX attributes used, "
+    "demo_explanation: explanation of how the demo works, complexity_level: subjective assessment of complexity, "
+    "use_cases: array of common scenarios where this pattern would be useful"
+)
+
+# Elements whose text is never part of the page content
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg"}
+# Elements that end a line of text
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "header", "footer", "nav", "main", "aside", "br", "hr",
+    "h1", "h2", "h3", "h4", "h5", "h6", "li", "ul", "ol", "pre", "table", "tr", "td", "th",
+    "blockquote", "dt", "dd", "form", "label", "button",
+}
+ATTRIBUTE_PATTERN = re.compile(r"\bhx-[a-z]+(?:-[a-z]+)*")
+JAVASCRIPT_HINTS = ("function", "=>", "document.", "htmx.", "addEventListener", "const ", "let ", "var ")
+
+JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+}
+
+class PageParser(HTMLParser):
+    """
+    Collect the visible text, title and code blocks of an HTML page.
+
+    Text inside script, style and similar elements is dropped, block elements
+    become line breaks and runs of whitespace are collapsed, which matches
+    what `strip-tags` fed to the LLM before.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines: List[str] = []
+        self.current: List[str] = []
+        self.skip_depth = 0
+        self.code_depth = 0
+        self.code_blocks: List[str] = []
+        self.code: List[str] = []
+        self.heading: Optional[List[str]] = None
+        self.headings: List[str] = []
+        self.title = ""
+        self.in_title = False
+
+    def _break_line(self) -> None:
+        line = " ".join("".join(self.current).split())
+        if line:
+            self.lines.append(line)
+        self.current = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag == "title":
+            self.in_title = True
+        elif tag == "pre":
+            self.code_depth += 1
+            self.code = []
+        elif tag in ("h1", "h2") and self.heading is None:
+            self.heading = []
+        if tag in BLOCK_TAGS:
+            self._break_line()
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag == "title":
+            self.in_title = False
+        elif tag == "pre" and self.code_depth:
+            self.code_depth -= 1
+            block = "".join(self.code).strip("\n")
+            if block.strip():
+                self.code_blocks.append(block)
+        elif tag in ("h1", "h2") and self.heading is not None:
+            self.headings.append(" ".join("".join(self.heading).split()))
+            self.heading = None
+        if tag in BLOCK_TAGS:
+            self._break_line()
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title += data
+            return
+        if self.skip_depth:
+            return
+        if self.code_depth:
+            self.code.append(data)
+        if self.heading is not None:
+            self.heading.append(data)
+        self.current.append(data)
+
+    def close(self):
+        super().close()
+        self._break_line()
+
+def parse_page(html: str) -> Dict[str, Any]:
+    """Parse an HTML page into its text, title, headings and code blocks."""
+    parser = PageParser()
+    parser.feed(html)
+    parser.close()
+    return {
+        "html": html,
+        "text": "\n".join(parser.lines),
+        "title": " ".join(parser.title.split()),
+        "headings": [heading for heading in parser.headings if heading],
+        "code_blocks": parser.code_blocks,
+    }
+
+def strip_tags(html: str) -> str:
+    """Return the visible text of an HTML page."""
+    return parse_page(html)["text"]
+
+class Extractor(ABC):
+    """
+    Base class for extraction backends.
+
+    extract() receives the example id (the page's file name without .html)
+    and the parsed page from parse_page(), and returns one example record.
+    `fingerprint` identifies everything besides the page that affects the
+    result; changing it re-extracts every page.
+    """
+
+    name = "base"
+
+    @property
+    def fingerprint(self) -> str:
+        return self.name
+
+    @abstractmethod
+    def extract(self, example_id: str, page: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract one example record from a parsed page."""
+
+class LLMExtractor(Extractor):
+    """Extraction with the `llm` CLI, using the extraction prompt as the system prompt."""
+
+    name = "llm"
+
+    def __init__(
+        self,
+        system_prompt: str,
+        model: Optional[str] = None,
+        timeout: int = LLM_TIMEOUT,
+        max_retries: int = MAX_RETRIES
+    ):
+        self.system_prompt = system_prompt
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+    @property
+    def fingerprint(self) -> str:
+        return f"{self.name}:{self.model or 'default'}"
+
+    def extract(self, example_id: str, page: Dict[str, Any]) -> Dict[str, Any]:
+        """Run `llm --schema` on the page text, retrying failed invocations with backoff."""
+        command = ["llm", "--schema", LLM_SCHEMA, "--system", self.system_prompt]
+        if self.model:
+            command += ["--model", self.model]
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = subprocess.run(
+                    command,
+                    input=page["text"],
+                    capture_output=True,
+                    text=True,
+                    timeout=self.timeout,
+                    check=True
+                )
+                return json.loads(result.stdout)
+            except FileNotFoundError:
+                raise RuntimeError("The llm CLI is not installed. Please run: uv tool install llm")
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired, json.JSONDecodeError) as e:
+                if attempt == self.max_retries:
+                    stderr = getattr(e, "stderr", None)
+                    raise RuntimeError(f"llm failed for {example_id}: {(stderr or str(e)).strip()}")
+                delay = 2 ** attempt
+                logger.warning(f"llm failed for {example_id}, retrying in {delay}s")
+                time.sleep(delay)
+
+class StubExtractor(Extractor):
+    """
+    Deterministic local extraction that needs no model or network.
+
+    The record is built from the page itself: the first heading as the title,
+    the first paragraph as the description, <pre> blocks as snippets and the
+    hx-* attributes they mention. It is good enough to exercise the pipeline,
+    not a substitute for the LLM.
+    """
+
+    name = "stub"
+
+    def extract(self, example_id: str, page: Dict[str, Any]) -> Dict[str, Any]:
+        """Build an example record from the parsed page."""
+        title = page["headings"][0] if page["headings"] else page["title"] or example_id.replace("-", " ").title()
+        paragraphs = [line for line in page["text"].splitlines() if len(line.split()) >= 8]
+        description = paragraphs[0] if paragraphs else title
+
+        html_snippets = []
+        javascript_snippets = []
+        for code in page["code_blocks"]:
+            is_javascript = "<" not in code and any(hint in code for hint in JAVASCRIPT_HINTS)
+            (javascript_snippets if is_javascript else html_snippets).append({"code": code})
+
+        attributes = sorted(set(ATTRIBUTE_PATTERN.findall(unescape(page["html"]))))
+        return {
+            "id": example_id,
+            "title": title,
+            "category": "Examples",
+            "url": f"https://htmx.org/examples/{example_id}/",
+            "description": description,
+            "html_snippets": html_snippets,
+            "javascript_snippets": javascript_snippets,
+            "key_concepts": [title.lower()],
+            "htmx_attributes": attributes,
+            "demo_explanation": " ".join(paragraphs[1:4]),
+            "complexity_level": "intermediate",
+            "use_cases": [],
+        }
+
+def create_extractor(name: str, model: Optional[str] = None) -> Extractor:
+    """Create the extractor registered under `name`."""
+    if name == "llm":
+        with open(PROMPT_FILE, "r", encoding="utf-8") as f:
+            return LLMExtractor(f.read().strip(), model=model)
+    if name == "stub":
+        return StubExtractor()
+    raise ValueError(f"Unknown extractor: {name} (expected one of {', '.join(EXTRACTORS)})")
+
+def validate_example(value: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """
+    Validate a value against the JSON schema, returning a list of errors.
+
+    Only the keywords htmx_examples_schema.json uses are supported: type,
+    properties, required, items and enum.
+    """
+    errors = []
+    expected = schema.get("type")
+    if expected:
+        python_type = JSON_TYPES[expected]
+        # bool is an int subclass but never a JSON number
+        if not isinstance(value, python_type) or (isinstance(value, bool) and expected != "boolean"):
+            return [f"{path}: expected {expected}, got {type(value).__name__}"]
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {value!r} is not one of {schema['enum']}")
+    if isinstance(value, dict):
+        for field in schema.get("required", []):
+            if field not in value:
+                errors.append(f"{path}: missing required field '{field}'")
+        for field, field_schema in schema.get("properties", {}).items():
+            if field in value:
+                errors.extend(validate_example(value[field], field_schema, f"{path}.{field}"))
+    if isinstance(value, list) and "items" in schema:
+        for index, item in enumerate(value):
+            errors.extend(validate_example(item, schema["items"], f"{path}[{index}]"))
+    return errors
+
+def write_json_atomic(path: str, data: Any) -> None:
+    """Write JSON to a temporary file in the same directory and rename it into place."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def load_manifest(path: str) -> Dict[str, Dict[str, Any]]:
+    """Load the extraction manifest, treating a missing or corrupt one as empty."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        return manifest if isinstance(manifest, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError:
+        logger.warning(f"Ignoring corrupt manifest {path}; every page will be extracted")
+        return {}
+
+def extraction_fingerprint(extractor: Extractor, schema: Dict[str, Any]) -> str:
+    """Hash the extractor, prompt and schema, which together decide every page's result."""
+    with open(PROMPT_FILE, "rb") as f:
+        prompt = f.read()
+    settings = extractor.fingerprint.encode("utf-8") + b"\0" + prompt + b"\0" + LLM_SCHEMA.encode("utf-8")
+    return sha256_bytes(settings + b"\0" + json.dumps(schema, sort_keys=True).encode("utf-8"))
+
+def is_up_to_date(
+    entry: Optional[Dict[str, Any]],
+    fingerprint: str,
+    source_path: str,
+    output_path: str
+) -> bool:
+    """Whether a page's output was extracted from its current content with the current settings."""
+    if not entry or entry.get("fingerprint") != fingerprint or not os.path.exists(output_path):
+        return False
+    with open(source_path, "rb") as f:
+        return sha256_bytes(f.read()) == entry.get("source_hash")
+
+def extract_file(
+    source_path: str,
+    output_path: str,
+    extractor: Extractor,
+    schema: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Extract, validate and atomically write one example, returning its manifest entry."""
+    with open(source_path, "rb") as f:
+        raw = f.read()
+    example_id = os.path.splitext(os.path.basename(source_path))[0]
+
+    page = parse_page(raw.decode("utf-8", errors="replace"))
+    example = extractor.extract(example_id, page)
+
+    errors = validate_example(example, schema)
+    if errors:
+        raise ValueError(f"Extracted JSON does not match the schema: {'; '.join(errors[:5])}")
+
+    write_json_atomic(output_path, example)
+    return {"source_hash": sha256_bytes(raw), "output": os.path.basename(output_path)}
+
+def process_examples(
+    source_paths: List[str],
+    output_dir: str,
+    extractor: Extractor,
+    workers: int = DEFAULT_WORKERS,
+    force: bool = False
+) -> Dict[str, Any]:
+    """
+    Extract every source page whose content or extraction settings changed.
+
+    The manifest is rewritten after every completed page, so a rerun after a
+    crash skips the pages that were already written.
+    """
+    start = time.time()
+    os.makedirs(output_dir, exist_ok=True)
+    with open(SCHEMA_FILE, "r", encoding="utf-8") as f:
+        schema = json.load(f)
+
+    fingerprint = extraction_fingerprint(extractor, schema)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    manifest_lock = threading.Lock()
+
+    pending = []
+    skipped = 0
+    for source_path in source_paths:
+        example_id = os.path.splitext(os.path.basename(source_path))[0]
+        output_path = os.path.join(output_dir, f"{example_id}.json")
+        if not force and is_up_to_date(manifest.get(example_id), fingerprint, source_path, output_path):
+            skipped += 1
+            continue
+        pending.append((example_id, source_path, output_path))
+
+    logger.info(f"Extracting {len(pending)} of {len(source_paths)} examples with {workers} workers ({skipped} unchanged)")
+
+    extracted = 0
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(extract_file, source_path, output_path, extractor, schema): example_id
+            for example_id, source_path, output_path in pending
+        }
+        for future in as_completed(futures):
+            example_id = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                logger.error(f"Error extracting {example_id}: {e}")
+                failed.append(example_id)
+                continue
+
+            entry["fingerprint"] = fingerprint
+            with manifest_lock:
+                manifest[example_id] = entry
+                write_json_atomic(manifest_path, manifest)
+            extracted += 1
+            logger.info(f"[{extracted + len(failed)}/{len(pending)}] Saved {example_id}")
+
+    return {
+        "total": len(source_paths),
+        "extracted": extracted,
+        "skipped": skipped,
+        "failed": sorted(failed),
+        "seconds": round(time.time() - start, 2),
+    }
+
+def verify_extraction(output_dir: str) -> int:
+    """Validate every JSON file in the output directory, returning the number of invalid files."""
+    with open(SCHEMA_FILE, "r", encoding="utf-8") as f:
+        schema = json.load(f)
+
+    paths = sorted(
+        os.path.join(output_dir, name) for name in os.listdir(output_dir)
+        if name.endswith(".json") and not name.startswith(".")
+    )
+    if not paths:
+        raise ValueError(f"No JSON files found in {output_dir}")
+
+    invalid = 0
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                errors = validate_example(json.load(f), schema)
+        except json.JSONDecodeError as e:
+            errors = [f"invalid JSON: {e}"]
+        name = os.path.splitext(os.path.basename(path))[0]
+        if errors:
+            invalid += 1
+            print(f"  {name}: INVALID ({'; '.join(errors[:3])})")
+        else:
+            print(f"  {name}: ok")
+
+    print(f"{len(paths) - invalid} of {len(paths)} files match the schema")
+    return invalid
+
+def main():
+    """Main function to extract HTMX examples to JSON."""
+    parser = argparse.ArgumentParser(description="Extract structured JSON from scraped HTMX example pages")
+
+    parser.add_argument(
+        "--examples-dir",
+        default=DEFAULT_EXAMPLES_DIR,
+        help=f"Directory containing the scraped HTML pages (default: {DEFAULT_EXAMPLES_DIR})"
+    )
+
+    parser.add_argument(
+        "--output-dir",
+        default=DEFAULT_OUTPUT_DIR,
+        help=f"Directory for the extracted JSON files (default: {DEFAULT_OUTPUT_DIR})"
+    )
+
+    parser.add_argument(
+        "--single",
+        metavar="FILE",
+        help="Extract a single HTML file"
+    )
+
+    parser.add_argument(
+        "--extractor",
+        choices=EXTRACTORS,
+        default="llm",
+        help="Extraction backend; 'stub' builds records locally without a model (default: llm)"
+    )
+
+    parser.add_argument(
+        "--model",
+        help="Model passed to the llm CLI (default: llm's default model)"
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Number of pages extracted concurrently (default: {DEFAULT_WORKERS})"
+    )
+
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Extract every page even if it is unchanged since the last run"
+    )
+
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Validate the extracted JSON files against the schema instead of extracting"
+    )
+
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the run report as JSON"
+    )
+
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    try:
+        if args.verify:
+            sys.exit(1 if verify_extraction(args.output_dir) else 0)
+
+        if args.single:
+            if not os.path.isfile(args.single):
+                raise FileNotFoundError(f"File {args.single} does not exist")
+            source_paths = [args.single]
+        else:
+            source_paths = sorted(
+                os.path.join(args.examples_dir, name) for name in os.listdir(args.examples_dir)
+                if name.endswith(".html")
+            ) if os.path.isdir(args.examples_dir) else []
+            if not source_paths:
+                raise FileNotFoundError(
+                    f"No HTML examples found in {args.examples_dir}. Please run scrape_htmx.sh first."
+                )
+
+        extractor = create_extractor(args.extractor, args.model)
+        report = process_examples(source_paths, args.output_dir, extractor, args.workers, args.force)
+
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print(
+                f"Extracted {report['extracted']} of {report['total']} examples, "
+                f"{report['skipped']} unchanged, {len(report['failed'])} failed ({report['seconds']}s)"
+            )
+            for example_id in report["failed"]:
+                print(f"  failed: {example_id}")
+
+        if report["failed"]:
+            sys.exit(1)
+    except Exception as e:
+        logger.error(f"Error extracting examples: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
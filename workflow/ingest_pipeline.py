@@ -0,0 +1,559 @@
+#!/usr/bin/env python3
+"""
+Stream HTMX examples from htmx.org into the search database in one process.
+
+The scrape, extract, upload and embed stages normally run as separate
+scripts, and each one waits for the previous one to finish with every page.
+Here they run concurrently and are connected by bounded asyncio queues. A
+page is extracted as soon as it has been downloaded, upserted as soon as it
+has been extracted, and embedded as soon as it is in the database, while
+other pages are still in flight. A full queue blocks the stage that feeds
+it, so a slow stage (usually the LLM) throttles the ones before it instead of
+letting work pile up in memory.
+
+Each stage has its own worker count. The upload and embed stages also batch
+whatever is already waiting in their queue, so a lone page goes straight
+through while a burst shares COPY loads, embedding requests and upserts.
+Per-stage throughput is logged while the pipeline runs and reported at the
+end, together with the end-to-end latency from download to searchable.
+
+All state is kept in the same manifests and files as the standalone scripts
+(../examples, ../processed_examples, htmx_examples, htmx_embeddings), so they
+can still be run on their own and an interrupted run can simply be restarted.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+try:
+    # Import required libraries
+    import numpy as np
+    import psycopg
+    from psycopg.rows import dict_row
+except ImportError as e:
+    logger.error(f"Missing required packages. Please run: uv add psycopg python-dotenv numpy pgvector httpx")
+    sys.exit(1)
+
+from scrape_htmx import scrape_examples, DEFAULT_BASE_URL, MIN_EXPECTED_EXAMPLES
+from extract_examples import (
+    create_extractor, extract_file, extraction_fingerprint, is_up_to_date, load_manifest,
+    write_json_atomic, EXTRACTORS, MANIFEST_NAME, SCHEMA_FILE
+)
+from upload_to_postgres import bulk_import_examples, load_example
+from embed_examples import (
+    connect_to_db, ensure_source_hash_columns, existing_quantizations, find_stale_embeddings,
+    prepare_embedding_requests, embed_request_batch, batch_update_embeddings, source_hash_column,
+    source_text_hash, quantized_column, quantize_embedding, EXAMPLE_CONTENT_COLUMNS,
+    DEFAULT_REQUESTS_PER_SECOND
+)
+from embedding_providers import (
+    EmbeddingProvider, RateLimiter, create_embedding_provider, PROVIDERS, DEFAULT_PROVIDER
+)
+
+DEFAULT_EXAMPLES_DIR = "../examples"
+DEFAULT_OUTPUT_DIR = "../processed_examples"
+
+# Items each queue holds before the stage feeding it has to wait
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_SCRAPE_CONCURRENCY = 8
+DEFAULT_EXTRACT_WORKERS = 4
+DEFAULT_UPLOAD_WORKERS = 1
+DEFAULT_EMBED_WORKERS = 2
+# Most examples one upload or embed call takes from its queue at once
+DEFAULT_UPLOAD_BATCH = 20
+DEFAULT_EMBED_BATCH = 10
+# Seconds between progress reports
+DEFAULT_REPORT_INTERVAL = 10.0
+
+class StageStats:
+    """Counters and timings for one pipeline stage."""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.completed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def start(self) -> None:
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+
+    def report(self) -> Dict[str, Any]:
+        """Summarize the stage; throughput is measured from its first to its last item."""
+        elapsed = ((self.finished_at or time.perf_counter()) - self.started_at) if self.started_at else 0.0
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "completed": self.completed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "busy_seconds": round(self.busy_seconds, 2),
+            "elapsed_seconds": round(elapsed, 2),
+            "items_per_second": round(self.completed / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+async def stage_worker(
+    stats: StageStats,
+    inbox: asyncio.Queue,
+    outbox: Optional[asyncio.Queue],
+    handle: Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]],
+    batch_size: int = 1
+) -> None:
+    """
+    Take items from inbox, process them with handle and pass the results on.
+
+    After the first item arrives, up to batch_size - 1 more are taken if they
+    are already waiting, so batches form under load without delaying a lone
+    item. A None item tells the worker to stop. A failed batch is logged and
+    dropped; the pipeline carries on with the next one.
+    """
+    while True:
+        item = await inbox.get()
+        if item is None:
+            return
+
+        batch = [item]
+        stop = False
+        while len(batch) < batch_size:
+            try:
+                item = inbox.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+
+        stats.start()
+        start = time.perf_counter()
+        try:
+            results = await handle(batch)
+        except Exception as e:
+            logger.error(f"Error in {stats.name} stage for {', '.join(item['id'] for item in batch)}: {e}")
+            stats.failed += len(batch)
+            results = []
+        stats.busy_seconds += time.perf_counter() - start
+        stats.batches += 1
+        stats.completed += len(results)
+        stats.finished_at = time.perf_counter()
+
+        if outbox is not None:
+            for result in results:
+                await outbox.put(result)
+        if stop:
+            return
+
+async def run_stage(
+    stats: StageStats,
+    inbox: asyncio.Queue,
+    outbox: Optional[asyncio.Queue],
+    handlers: List[Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]]],
+    batch_size: int,
+    next_workers: int
+) -> None:
+    """Run one worker per handler, then tell each worker of the next stage to stop."""
+    try:
+        await asyncio.gather(*(stage_worker(stats, inbox, outbox, handle, batch_size) for handle in handlers))
+    finally:
+        if outbox is not None:
+            for _ in range(next_workers):
+                await outbox.put(None)
+
+def embed_examples_by_id(
+    conn: psycopg.Connection,
+    provider: EmbeddingProvider,
+    example_ids: List[str],
+    rate_limiter: RateLimiter,
+    quantize: List[str]
+) -> int:
+    """
+    Embed the given examples as stored in htmx_examples and upsert their embeddings.
+
+    Texts are prepared from the database rows exactly as embed_examples.py
+    prepares them, and only missing or stale embeddings are generated, so
+    the two never disagree about what is up to date. Returns the number of
+    examples whose embeddings were written.
+    """
+    try:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                f"SELECT {', '.join(EXAMPLE_CONTENT_COLUMNS)} FROM htmx_examples WHERE id = ANY(%s)",
+                (example_ids,)
+            )
+            examples = cur.fetchall()
+
+        requests = [request for example in examples for request in prepare_embedding_requests(example)]
+        stale_embeddings = find_stale_embeddings(conn, requests)
+        requests = [request for request in requests if (request[0], request[1]) in stale_embeddings]
+        # End the read-only transaction before calling the provider, so that it isn't
+        # held open across the embedding calls
+        conn.commit()
+
+        embedding_data: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(requests), provider.max_batch_size):
+            batch = requests[start:start + provider.max_batch_size]
+            for (_, _, text), (example_id, field_name, embedding) in zip(
+                batch, embed_request_batch(batch, provider, rate_limiter)
+            ):
+                embeddings = embedding_data.setdefault(example_id, {})
+                embeddings[field_name] = embedding
+                embeddings[source_hash_column(field_name)] = source_text_hash(text)
+                for quantization in quantize:
+                    embeddings[quantized_column(field_name, quantization)] = quantize_embedding(
+                        embedding, quantization
+                    )
+    except Exception:
+        conn.rollback()
+        raise
+
+    if not embedding_data:
+        return 0
+    if not batch_update_embeddings(conn, list(embedding_data.items())):
+        raise RuntimeError("Embedding upsert failed")
+    return len(embedding_data)
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    return float(np.percentile(values, fraction * 100))
+
+async def run_pipeline(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the four stages concurrently and return the throughput report."""
+    start = time.perf_counter()
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    stats = {
+        "scrape": StageStats("scrape", args.scrape_concurrency),
+        "extract": StageStats("extract", args.extract_workers),
+        "upload": StageStats("upload", args.upload_workers),
+        "embed": StageStats("embed", args.embed_workers),
+    }
+    extract_queue = asyncio.Queue(maxsize=args.queue_size)
+    upload_queue = asyncio.Queue(maxsize=args.queue_size)
+    embed_queue = asyncio.Queue(maxsize=args.queue_size)
+    latencies: List[float] = []
+
+    extractor = create_extractor(args.extractor, args.model)
+    with open(SCHEMA_FILE, "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    fingerprint = extraction_fingerprint(extractor, schema)
+    manifest_path = os.path.join(args.output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    provider = create_embedding_provider(args.provider)
+    rate_limiter = RateLimiter(args.requests_per_second)
+
+    connections = []
+    try:
+        upload_connections = [connect_to_db() for _ in range(args.upload_workers)]
+        connections.extend(upload_connections)
+        embed_connections = [connect_to_db() for _ in range(args.embed_workers)]
+        connections.extend(embed_connections)
+
+        ensure_source_hash_columns(embed_connections[0])
+        # Keep quantized columns added by an earlier embed_examples.py run in step
+        quantize = existing_quantizations(embed_connections[0])
+        embed_connections[0].commit()
+
+        async def on_change(record: Dict[str, Any]) -> None:
+            stats["scrape"].start()
+            # An unchanged page is still sent on if its extraction is missing or failed last time
+            if record["status"] == "unchanged" and not args.all_pages:
+                output_path = os.path.join(args.output_dir, f"{record['id']}.json")
+                if is_up_to_date(manifest.get(record["id"]), fingerprint, record["path"], output_path):
+                    stats["scrape"].skipped += 1
+                    return
+            await extract_queue.put({**record, "scraped_at": time.perf_counter()})
+            stats["scrape"].completed += 1
+            stats["scrape"].finished_at = time.perf_counter()
+
+        async def scrape() -> Dict[str, Any]:
+            try:
+                report = await scrape_examples(
+                    base_url=args.base_url,
+                    output_dir=args.examples_dir,
+                    concurrency=args.scrape_concurrency,
+                    min_examples=args.min_examples,
+                    on_change=on_change,
+                    include_unchanged=True
+                )
+                stats["scrape"].failed = len(report["failed"])
+                return report
+            finally:
+                for _ in range(args.extract_workers):
+                    await extract_queue.put(None)
+
+        def extract_page(item: Dict[str, Any], entry: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            output_path = os.path.join(args.output_dir, f"{item['id']}.json")
+            new_entry = None
+            if not is_up_to_date(entry, fingerprint, item["path"], output_path):
+                new_entry = extract_file(item["path"], output_path, extractor, schema)
+                new_entry["fingerprint"] = fingerprint
+            example = load_example(Path(output_path))
+            if not example:
+                raise ValueError(f"Could not load {output_path}")
+            return {**item, "example": example, "manifest_entry": new_entry}
+
+        async def extract(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            results = []
+            for item in batch:
+                result = await asyncio.to_thread(extract_page, item, manifest.get(item["id"]))
+                entry = result.pop("manifest_entry")
+                if entry:
+                    # Written from the event loop, so concurrent workers never save an older snapshot last
+                    manifest[item["id"]] = entry
+                    write_json_atomic(manifest_path, manifest)
+                else:
+                    stats["extract"].skipped += 1
+                results.append(result)
+            return results
+
+        def make_upload(conn: psycopg.Connection):
+            async def upload(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+                merged = await asyncio.to_thread(bulk_import_examples, conn, [item["example"] for item in batch], False)
+                if not merged:
+                    raise RuntimeError("Upsert into htmx_examples failed")
+                return batch
+            return upload
+
+        def make_embed(conn: psycopg.Connection):
+            async def embed(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+                written = await asyncio.to_thread(
+                    embed_examples_by_id, conn, provider, [item["example"]["id"] for item in batch], rate_limiter, quantize
+                )
+                stats["embed"].skipped += len(batch) - written
+                now = time.perf_counter()
+                latencies.extend(now - item["scraped_at"] for item in batch)
+                return batch
+            return embed
+
+        async def report_progress() -> None:
+            while True:
+                await asyncio.sleep(args.report_interval)
+                logger.info("Progress: " + " | ".join(
+                    f"{name} {stage.completed} done, {stage.failed} failed" for name, stage in stats.items()
+                ) + f" | queued {extract_queue.qsize()}/{upload_queue.qsize()}/{embed_queue.qsize()}")
+
+        reporter = asyncio.create_task(report_progress())
+        try:
+            # Every stage runs to completion before the connections close, even if one fails
+            results = await asyncio.gather(
+                scrape(),
+                run_stage(stats["extract"], extract_queue, upload_queue,
+                          [extract] * args.extract_workers, 1, args.upload_workers),
+                run_stage(stats["upload"], upload_queue, embed_queue,
+                          [make_upload(conn) for conn in upload_connections], args.upload_batch, args.embed_workers),
+                run_stage(stats["embed"], embed_queue, None,
+                          [make_embed(conn) for conn in embed_connections], args.embed_batch, 0),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            scrape_report = results[0]
+        finally:
+            reporter.cancel()
+    finally:
+        for conn in connections:
+            conn.close()
+
+    return {
+        "seconds": round(time.perf_counter() - start, 2),
+        "scrape": {
+            key: [record["id"] for record in scrape_report[key]]
+            for key in ("new", "updated", "failed")
+        } | {"unchanged": len(scrape_report["unchanged"]), "removed": scrape_report["removed"]},
+        "stages": [stage.report() for stage in stats.values()],
+        "latency_seconds": {
+            "items": len(latencies),
+            "p50": round(percentile(latencies, 0.5), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "max": round(max(latencies), 3) if latencies else 0.0,
+        },
+    }
+
+def main():
+    """Main function to run the streaming ingest pipeline."""
+    parser = argparse.ArgumentParser(
+        description="Scrape, extract, upload and embed HTMX examples as one streaming pipeline"
+    )
+
+    parser.add_argument(
+        "--base-url",
+        default=DEFAULT_BASE_URL,
+        help=f"Site to scrape (default: {DEFAULT_BASE_URL})"
+    )
+
+    parser.add_argument(
+        "--examples-dir",
+        default=DEFAULT_EXAMPLES_DIR,
+        help=f"Directory for the downloaded pages (default: {DEFAULT_EXAMPLES_DIR})"
+    )
+
+    parser.add_argument(
+        "--output-dir",
+        default=DEFAULT_OUTPUT_DIR,
+        help=f"Directory for the extracted JSON files (default: {DEFAULT_OUTPUT_DIR})"
+    )
+
+    parser.add_argument(
+        "--all-pages",
+        action="store_true",
+        help="Also send unchanged pages down the pipeline; up-to-date extractions and embeddings are still reused"
+    )
+
+    parser.add_argument(
+        "--min-examples",
+        type=int,
+        default=MIN_EXPECTED_EXAMPLES,
+        help=f"Also fetch the known example list when the index links fewer pages; 0 disables it (default: {MIN_EXPECTED_EXAMPLES})"
+    )
+
+    parser.add_argument(
+        "--extractor",
+        choices=EXTRACTORS,
+        default="llm",
+        help="Extraction backend; 'stub' builds records locally without a model (default: llm)"
+    )
+
+    parser.add_argument(
+        "--model",
+        help="Model passed to the llm CLI (default: llm's default model)"
+    )
+
+    parser.add_argument(
+        "--provider",
+        choices=PROVIDERS,
+        default=DEFAULT_PROVIDER,
+        help=f"Embedding provider (default: {DEFAULT_PROVIDER})"
+    )
+
+    parser.add_argument(
+        "--requests-per-second",
+        type=float,
+        default=DEFAULT_REQUESTS_PER_SECOND,
+        help=f"Maximum embedding API requests per second (default: {DEFAULT_REQUESTS_PER_SECOND})"
+    )
+
+    parser.add_argument(
+        "--scrape-concurrency",
+        type=int,
+        default=DEFAULT_SCRAPE_CONCURRENCY,
+        help=f"HTTP requests in flight (default: {DEFAULT_SCRAPE_CONCURRENCY})"
+    )
+
+    parser.add_argument(
+        "--extract-workers",
+        type=int,
+        default=DEFAULT_EXTRACT_WORKERS,
+        help=f"Pages extracted concurrently (default: {DEFAULT_EXTRACT_WORKERS})"
+    )
+
+    parser.add_argument(
+        "--upload-workers",
+        type=int,
+        default=DEFAULT_UPLOAD_WORKERS,
+        help=f"Concurrent upserts, each with its own connection (default: {DEFAULT_UPLOAD_WORKERS})"
+    )
+
+    parser.add_argument(
+        "--embed-workers",
+        type=int,
+        default=DEFAULT_EMBED_WORKERS,
+        help=f"Concurrent embedding batches, each with its own connection (default: {DEFAULT_EMBED_WORKERS})"
+    )
+
+    parser.add_argument(
+        "--upload-batch",
+        type=int,
+        default=DEFAULT_UPLOAD_BATCH,
+        help=f"Most queued examples upserted in one COPY (default: {DEFAULT_UPLOAD_BATCH})"
+    )
+
+    parser.add_argument(
+        "--embed-batch",
+        type=int,
+        default=DEFAULT_EMBED_BATCH,
+        help=f"Most queued examples embedded together (default: {DEFAULT_EMBED_BATCH})"
+    )
+
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help=f"Capacity of each queue between stages (default: {DEFAULT_QUEUE_SIZE})"
+    )
+
+    parser.add_argument(
+        "--report-interval",
+        type=float,
+        default=DEFAULT_REPORT_INTERVAL,
+        help=f"Seconds between progress reports (default: {DEFAULT_REPORT_INTERVAL})"
+    )
+
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the throughput report as JSON"
+    )
+
+    args = parser.parse_args()
+
+    for option in ("scrape_concurrency", "extract_workers", "upload_workers", "embed_workers",
+                   "upload_batch", "embed_batch", "queue_size"):
+        if getattr(args, option) < 1:
+            parser.error(f"--{option.replace('_', '-')} must be at least 1")
+    if args.report_interval <= 0:
+        parser.error("--report-interval must be greater than zero")
+
+    try:
+        report = asyncio.run(run_pipeline(args))
+    except Exception as e:
+        logger.error(f"Error running ingest pipeline: {e}")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        scrape = report["scrape"]
+        print(
+            f"Scraped {len(scrape['new'])} new, {len(scrape['updated'])} updated, "
+            f"{scrape['unchanged']} unchanged pages in {report['seconds']}s"
+        )
+        for stage in report["stages"]:
+            print(
+                f"  {stage['stage']:<8} {stage['completed']:>5} done {stage['skipped']:>5} skipped "
+                f"{stage['failed']:>4} failed  {stage['items_per_second']:>8.2f} items/s "
+                f"({stage['workers']} workers, {stage['busy_seconds']}s busy)"
+            )
+        latency = report["latency_seconds"]
+        print(
+            f"  download to searchable: p50 {latency['p50']}s, p95 {latency['p95']}s, "
+            f"max {latency['max']}s over {latency['items']} examples"
+        )
+
+    if any(stage["failed"] for stage in report["stages"]):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
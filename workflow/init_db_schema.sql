@@ -26,6 +26,26 @@ CREATE TABLE IF NOT EXISTS htmx_examples (
 CREATE INDEX IF NOT EXISTS htmx_examples_category_idx ON htmx_examples(category);
 CREATE INDEX IF NOT EXISTS htmx_examples_complexity_idx ON htmx_examples(complexity_level);
 
+-- array_to_string is only STABLE, so generated columns need an IMMUTABLE wrapper
+CREATE OR REPLACE FUNCTION immutable_array_to_string(TEXT[], TEXT)
+RETURNS TEXT AS $$
+    SELECT array_to_string($1, $2)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+-- Weighted full-text document for the lexical half of api.hybrid_search.
+-- Added with ALTER TABLE so re-running this script also upgrades existing tables
+ALTER TABLE htmx_examples ADD COLUMN IF NOT EXISTS search_tsv TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', COALESCE(title, '')), 'A') ||
+    setweight(to_tsvector('english', COALESCE(immutable_array_to_string(key_concepts, ' '), '')), 'B') ||
+    setweight(to_tsvector('english', COALESCE(description, '')), 'C') ||
+    setweight(to_tsvector('english', COALESCE(demo_explanation, '')), 'D')
+) STORED;
+
+-- GIN indexes for full-text matches and htmx attribute / key concept lookups (&&, @>)
+CREATE INDEX IF NOT EXISTS htmx_examples_search_tsv_idx ON htmx_examples USING GIN (search_tsv);
+CREATE INDEX IF NOT EXISTS htmx_examples_htmx_attributes_idx ON htmx_examples USING GIN (htmx_attributes);
+CREATE INDEX IF NOT EXISTS htmx_examples_key_concepts_idx ON htmx_examples USING GIN (key_concepts);
+
 -- Create table for embeddings
 CREATE TABLE IF NOT EXISTS htmx_embeddings (
     id TEXT PRIMARY KEY REFERENCES htmx_examples(id),
@@ -33,10 +53,38 @@ CREATE TABLE IF NOT EXISTS htmx_embeddings (
     description_embedding VECTOR(1536),
     content_embedding VECTOR(1536),
     key_concepts_embedding VECTOR(1536),
+    -- SHA-256 of the prepared source text each embedding was built from
+    title_source_hash TEXT,
+    description_source_hash TEXT,
+    content_source_hash TEXT,
+    key_concepts_source_hash TEXT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Precomputed k-nearest-neighbour graph read by api.find_similar_examples:
+-- the top k other examples per example and embedding type, written and
+-- incrementally refreshed by build_neighbor_graph.py
+CREATE TABLE IF NOT EXISTS htmx_neighbors (
+    id TEXT NOT NULL REFERENCES htmx_examples(id) ON DELETE CASCADE,
+    embedding_type TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    neighbor_id TEXT NOT NULL REFERENCES htmx_examples(id) ON DELETE CASCADE,
+    similarity FLOAT NOT NULL,
+    PRIMARY KEY (id, embedding_type, rank)
+);
+
+-- When each embedding type's graph was last built, with its k and row count
+CREATE TABLE IF NOT EXISTS htmx_neighbor_state (
+    embedding_type TEXT PRIMARY KEY,
+    k INTEGER NOT NULL,
+    row_count INTEGER NOT NULL,
+    built_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- Finds embeddings changed since the graph was built
+CREATE INDEX IF NOT EXISTS htmx_embeddings_updated_at_idx ON htmx_embeddings(updated_at);
+
 -- Create function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -46,12 +94,14 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
--- Create triggers to update updated_at timestamp
+-- Create triggers to update updated_at timestamp (dropped first so the script can be re-run)
+DROP TRIGGER IF EXISTS update_htmx_examples_updated_at ON htmx_examples;
 CREATE TRIGGER update_htmx_examples_updated_at
 BEFORE UPDATE ON htmx_examples
 FOR EACH ROW
 EXECUTE FUNCTION update_updated_at_column();
 
+DROP TRIGGER IF EXISTS update_htmx_embeddings_updated_at ON htmx_embeddings;
 CREATE TRIGGER update_htmx_embeddings_updated_at
 BEFORE UPDATE ON htmx_embeddings
 FOR EACH ROW
@@ -126,4 +176,6 @@ GRANT SELECT ON htmx_examples_with_embeddings TO web_anon;
 
 -- Grant select on tables
 GRANT SELECT ON htmx_examples TO web_anon;
-GRANT SELECT ON htmx_embeddings TO web_anon; 
\ No newline at end of file
+GRANT SELECT ON htmx_embeddings TO web_anon;
+GRANT SELECT ON htmx_neighbors TO web_anon;
+GRANT SELECT ON htmx_neighbor_state TO web_anon; 
\ No newline at end of file
@@ -0,0 +1,791 @@
+#!/usr/bin/env python3
+"""
+Manage approximate nearest neighbour (ANN) indexes on the HTMX embedding columns
+and tune their query-time settings.
+
+Indexes are built with pgvector's HNSW or IVFFlat access methods using the cosine
+distance operator class, which is what the api.* search functions order by.
+The tune command measures recall@k against exact search and p50/p99 latency for
+a range of hnsw.ef_search or ivfflat.probes values on the actual corpus. The
+quantized command does the same for api.quantized_vector_search over a range
+of rerank limits, and reports how much smaller the quantized columns are.
+Where quantized columns exist, building HNSW indexes also indexes them so that
+the first pass of quantized search is an index scan (pgvector 0.7+).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from typing import List, Dict, Any, Optional
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+try:
+    # Import required libraries
+    from dotenv import load_dotenv
+    import numpy as np
+    import psycopg
+    from psycopg import sql
+    from psycopg.rows import dict_row
+    from pgvector.psycopg import register_vector
+except ImportError as e:
+    logger.error(f"Missing required packages. Please run: uv add psycopg python-dotenv numpy pgvector")
+    sys.exit(1)
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Database connection parameters
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+DB_USER = os.getenv("DB_USER")
+DB_PASS = os.getenv("DB_PASS")
+DB_NAME = os.getenv("DB_NAME")
+
+EMBEDDING_TYPES = ["content", "title", "description", "key_concepts"]
+INDEX_METHODS = ["hnsw", "ivfflat"]
+
+# Query-time setting controlling the recall/latency trade-off for each method
+SEARCH_SETTINGS = {
+    "hnsw": "hnsw.ef_search",
+    "ivfflat": "ivfflat.probes",
+}
+DEFAULT_SEARCH_VALUES = {
+    "hnsw": [10, 20, 40, 80, 160, 320],
+    "ivfflat": [1, 2, 4, 8, 16, 32],
+}
+
+# Quantized columns written by embed_examples.py --quantize, and the operator
+# class that indexes the distance api.quantized_vector_search orders them by
+QUANTIZATIONS = ["binary", "halfvec"]
+QUANTIZED_OPERATOR_CLASSES = {
+    "binary": "bit_hamming_ops",
+    "halfvec": "halfvec_cosine_ops",
+}
+DEFAULT_RERANK_LIMITS = [5, 10, 20, 50, 100, 200]
+
+# Noise added to sampled query vectors, relative to the per-dimension magnitude
+# of the vector (the same spread as benchmark_search.py's workload)
+QUERY_NOISE = 0.35
+
+def connect_to_db() -> psycopg.Connection:
+    """
+    Connect to the PostgreSQL database using environment variables.
+
+    The connection is in autocommit mode: CREATE/DROP INDEX CONCURRENTLY can't
+    run inside a transaction block, and benchmark queries scope their settings
+    with explicit transactions.
+    """
+    try:
+        # Check if all required environment variables are set
+        required_env_vars = ["DB_HOST", "DB_PORT", "DB_USER", "DB_PASS", "DB_NAME"]
+        missing_vars = [var for var in required_env_vars if not os.getenv(var)]
+
+        if missing_vars:
+            raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
+
+        # Connect to the database
+        conn_string = f"host={DB_HOST} port={DB_PORT} dbname={DB_NAME} user={DB_USER} password={DB_PASS}"
+        conn = psycopg.connect(conn_string, autocommit=True)
+        register_vector(conn)
+
+        logger.info(f"Successfully connected to database: {DB_NAME} on {DB_HOST}")
+        return conn
+    except Exception as e:
+        logger.error(f"Error connecting to database: {e}")
+        raise
+
+def embedding_column(embedding_type: str) -> str:
+    """Map an embedding type to its column in htmx_embeddings."""
+    if embedding_type not in EMBEDDING_TYPES:
+        raise ValueError(f"Unknown embedding type: {embedding_type}")
+    return f"{embedding_type}_embedding"
+
+def index_column(embedding_type: str, quantization: Optional[str] = None) -> str:
+    """Column indexed for an embedding type: the full vectors, or their quantized copy."""
+    column = embedding_column(embedding_type)
+    return f"{column}_{quantization}" if quantization else column
+
+def index_name(embedding_type: str, method: str, quantization: Optional[str] = None) -> str:
+    """Name of the ANN index for an embedding type and access method."""
+    if quantization:
+        return f"htmx_embeddings_{embedding_type}_{quantization}_{method}_idx"
+    return f"htmx_embeddings_{embedding_type}_{method}_idx"
+
+def indexable_quantizations(conn: psycopg.Connection, embedding_type: str) -> List[str]:
+    """
+    Return the quantizations of an embedding type whose columns exist and can be indexed.
+
+    Indexing bit and halfvec columns needs pgvector 0.7+; on older versions the
+    first pass of quantized search stays a sequential scan and a warning is logged.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT attname FROM pg_attribute "
+            "WHERE attrelid = 'htmx_embeddings'::regclass AND attnum > 0 AND NOT attisdropped"
+        )
+        columns = {row[0] for row in cur.fetchall()}
+        cur.execute(
+            "SELECT opcname FROM pg_opclass WHERE opcname = ANY(%s)",
+            (list(QUANTIZED_OPERATOR_CLASSES.values()),)
+        )
+        operator_classes = {row[0] for row in cur.fetchall()}
+
+    quantizations = []
+    for quantization in QUANTIZATIONS:
+        if index_column(embedding_type, quantization) not in columns:
+            continue
+        if QUANTIZED_OPERATOR_CLASSES[quantization] in operator_classes:
+            quantizations.append(quantization)
+        else:
+            logger.warning(
+                f"Skipping the {quantization} index on {embedding_type} embeddings: pgvector 0.7+ is "
+                f"required, so quantized search scans the whole column in its first pass"
+            )
+    return quantizations
+
+def list_vector_indexes(conn: psycopg.Connection) -> List[Dict[str, Any]]:
+    """List the HNSW and IVFFlat indexes on htmx_embeddings with their sizes."""
+    with conn.cursor(row_factory=dict_row) as cur:
+        cur.execute("""
+            SELECT
+                i.relname AS index_name,
+                am.amname AS method,
+                pg_get_indexdef(i.oid) AS definition,
+                pg_size_pretty(pg_relation_size(i.oid)) AS size,
+                ix.indisvalid AS valid
+            FROM pg_index ix
+            JOIN pg_class i ON i.oid = ix.indexrelid
+            JOIN pg_class t ON t.oid = ix.indrelid
+            JOIN pg_am am ON am.oid = i.relam
+            WHERE t.oid = 'htmx_embeddings'::regclass
+            AND am.amname IN ('hnsw', 'ivfflat')
+            ORDER BY i.relname
+        """)
+        return cur.fetchall()
+
+def count_embeddings(conn: psycopg.Connection, embedding_type: str) -> int:
+    """Count the non-null embeddings of a type."""
+    column = embedding_column(embedding_type)
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("SELECT COUNT(*) FROM htmx_embeddings WHERE {} IS NOT NULL").format(
+            sql.Identifier(column)
+        ))
+        return cur.fetchone()[0]
+
+def build_index(
+    conn: psycopg.Connection,
+    embedding_type: str,
+    method: str,
+    m: int = 16,
+    ef_construction: int = 64,
+    lists: Optional[int] = None,
+    name: Optional[str] = None,
+    maintenance_work_mem: Optional[str] = None,
+    quantization: Optional[str] = None
+) -> str:
+    """Build an ANN index on one embedding column, or its quantized copy, without blocking writes."""
+    column = index_column(embedding_type, quantization)
+    operator_class = QUANTIZED_OPERATOR_CLASSES[quantization] if quantization else "vector_cosine_ops"
+    name = name or index_name(embedding_type, method, quantization)
+
+    if method == "hnsw":
+        options = sql.SQL("WITH (m = {}, ef_construction = {})").format(
+            sql.Literal(m), sql.Literal(ef_construction)
+        )
+    elif method == "ivfflat":
+        if lists is None:
+            # pgvector's recommended starting point: rows / 1000 up to 1M rows
+            lists = max(1, count_embeddings(conn, embedding_type) // 1000)
+        options = sql.SQL("WITH (lists = {})").format(sql.Literal(lists))
+    else:
+        raise ValueError(f"Unknown index method: {method}")
+
+    with conn.cursor() as cur:
+        if maintenance_work_mem:
+            cur.execute(sql.SQL("SET maintenance_work_mem = {}").format(sql.Literal(maintenance_work_mem)))
+
+        logger.info(f"Building {method} index {name} on {column}")
+        start_time = time.perf_counter()
+        cur.execute(sql.SQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON htmx_embeddings "
+            "USING {} ({} {}) {}"
+        ).format(
+            sql.Identifier(name), sql.SQL(method), sql.Identifier(column), sql.SQL(operator_class), options
+        ))
+        logger.info(f"Built index {name} in {time.perf_counter() - start_time:.1f}s")
+
+    return name
+
+def drop_index(conn: psycopg.Connection, name: str) -> None:
+    """Drop an index without blocking reads or writes on htmx_embeddings."""
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(sql.Identifier(name)))
+    logger.info(f"Dropped index {name}")
+
+def drop_indexes_for_type(
+    conn: psycopg.Connection,
+    embedding_type: str,
+    keep: Optional[str] = None,
+    quantization: Optional[str] = None
+) -> None:
+    """Drop every ANN index that covers an embedding column, except the one named `keep`."""
+    column = index_column(embedding_type, quantization)
+    for index in list_vector_indexes(conn):
+        if f"({column} " in index["definition"] and index["index_name"] != keep:
+            drop_index(conn, index["index_name"])
+
+def rebuild_index(
+    conn: psycopg.Connection,
+    embedding_type: str,
+    method: str,
+    quantization: Optional[str] = None,
+    **build_options: Any
+) -> str:
+    """
+    Rebuild the ANN index on an embedding column with new build parameters.
+
+    The new index is built next to the old one and swapped in by renaming, so
+    searches keep using an index for the whole rebuild.
+    """
+    name = index_name(embedding_type, method, quantization)
+    temp_name = f"{name}_rebuild"
+
+    drop_index(conn, temp_name)
+    build_index(conn, embedding_type, method, name=temp_name, quantization=quantization, **build_options)
+    drop_indexes_for_type(conn, embedding_type, keep=temp_name, quantization=quantization)
+
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+            sql.Identifier(temp_name), sql.Identifier(name)
+        ))
+    logger.info(f"Rebuilt index {name}")
+    return name
+
+def sample_query_vectors(conn: psycopg.Connection, embedding_type: str, count: int, seed: int) -> List[Any]:
+    """
+    Sample stored embeddings and perturb them to use as benchmark queries.
+
+    The noise keeps each query near a real cluster without matching its source
+    row exactly; otherwise every query would find itself at distance 0, which any
+    index returns first and which inflates recall@k.
+    """
+    column = embedding_column(embedding_type)
+    with conn.cursor() as cur:
+        cur.execute("SELECT setseed(%s)", (seed / 2 ** 31 if seed else 0,))
+        cur.execute(sql.SQL(
+            "SELECT {} FROM htmx_embeddings WHERE {} IS NOT NULL ORDER BY random() LIMIT %s"
+        ).format(sql.Identifier(column), sql.Identifier(column)), (count,))
+        rows = cur.fetchall()
+
+    rng = np.random.default_rng(seed)
+    query_vectors = []
+    for (embedding,) in rows:
+        vector = embedding.to_numpy()
+        noise = rng.standard_normal(len(vector), dtype=np.float32)
+        query_vectors.append(
+            (vector + QUERY_NOISE * np.linalg.norm(vector) / np.sqrt(len(vector)) * noise).astype(np.float32)
+        )
+    return query_vectors
+
+def run_knn_queries(
+    conn: psycopg.Connection,
+    embedding_type: str,
+    query_vectors: List[Any],
+    k: int,
+    exact: bool = False,
+    setting: Optional[str] = None,
+    value: Optional[int] = None
+) -> Dict[str, Any]:
+    """Run one top-k query per vector, returning the result ids and per-query latencies."""
+    column = embedding_column(embedding_type)
+    query = sql.SQL(
+        "SELECT id FROM htmx_embeddings WHERE {} IS NOT NULL ORDER BY {} <=> %b LIMIT %s"
+    ).format(sql.Identifier(column), sql.Identifier(column))
+
+    results = []
+    latencies = []
+    with conn.transaction():
+        with conn.cursor() as cur:
+            if exact:
+                # Force a sequential scan with an exact distance sort
+                cur.execute("SET LOCAL enable_indexscan = off")
+            if setting:
+                cur.execute(sql.SQL("SET LOCAL {} = {}").format(sql.SQL(setting), sql.Literal(value)))
+
+            for vector in query_vectors:
+                start_time = time.perf_counter()
+                cur.execute(query, (vector, k))
+                ids = [row[0] for row in cur.fetchall()]
+                latencies.append((time.perf_counter() - start_time) * 1000)
+                results.append(ids)
+
+    return {"results": results, "latencies_ms": latencies}
+
+def summarize_latencies(latencies_ms: List[float]) -> Dict[str, float]:
+    """Compute p50/p99 latency in milliseconds."""
+    return {
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+    }
+
+def recall_at_k(approximate: List[List[str]], exact: List[List[str]]) -> float:
+    """Average fraction of the exact top-k ids found by the approximate search."""
+    recalls = []
+    for approximate_ids, exact_ids in zip(approximate, exact):
+        if exact_ids:
+            recalls.append(len(set(approximate_ids) & set(exact_ids)) / len(exact_ids))
+    return float(np.mean(recalls)) if recalls else 0.0
+
+def detect_index_method(conn: psycopg.Connection, embedding_type: str) -> Optional[str]:
+    """Return the access method of the ANN index on an embedding column, if any."""
+    column = embedding_column(embedding_type)
+    for index in list_vector_indexes(conn):
+        if f"({column} " in index["definition"] and index["valid"]:
+            return index["method"]
+    return None
+
+def tune_search_setting(
+    conn: psycopg.Connection,
+    embedding_type: str,
+    k: int = 5,
+    query_count: int = 50,
+    values: Optional[List[int]] = None,
+    target_recall: float = 0.95,
+    seed: int = 42
+) -> Dict[str, Any]:
+    """
+    Measure recall@k and latency of the ANN index on a column for a range of settings.
+
+    Returns the measurements for exact search and each setting, plus the smallest
+    setting whose recall reaches target_recall.
+    """
+    method = detect_index_method(conn, embedding_type)
+    if method is None:
+        raise ValueError(f"No valid ANN index found for {embedding_type} embeddings; build one first")
+
+    setting = SEARCH_SETTINGS[method]
+    values = values or DEFAULT_SEARCH_VALUES[method]
+    query_vectors = sample_query_vectors(conn, embedding_type, query_count, seed)
+    if not query_vectors:
+        raise ValueError(f"No {embedding_type} embeddings found to tune against")
+
+    logger.info(f"Measuring exact search for {len(query_vectors)} {embedding_type} queries")
+    exact = run_knn_queries(conn, embedding_type, query_vectors, k, exact=True)
+
+    measurements = []
+    recommended = None
+    for value in values:
+        approximate = run_knn_queries(conn, embedding_type, query_vectors, k, setting=setting, value=value)
+        measurement = {
+            "value": value,
+            f"recall_at_{k}": round(recall_at_k(approximate["results"], exact["results"]), 4),
+            **summarize_latencies(approximate["latencies_ms"]),
+        }
+        measurements.append(measurement)
+        logger.info(f"{setting} = {value}: {measurement}")
+
+        if recommended is None and measurement[f"recall_at_{k}"] >= target_recall:
+            recommended = value
+
+    return {
+        "embedding_type": embedding_type,
+        "method": method,
+        "setting": setting,
+        "k": k,
+        "queries": len(query_vectors),
+        "target_recall": target_recall,
+        "exact": summarize_latencies(exact["latencies_ms"]),
+        "measurements": measurements,
+        "recommended": recommended,
+    }
+
+def quantized_column_sizes(conn: psycopg.Connection, embedding_type: str, quantization: str) -> Dict[str, Any]:
+    """Average stored size in bytes of the full and quantized embeddings of a type."""
+    column = embedding_column(embedding_type)
+    quantized = f"{column}_{quantization}"
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL(
+            "SELECT AVG(pg_column_size({})), AVG(pg_column_size({})), COUNT({}) "
+            "FROM htmx_embeddings WHERE {} IS NOT NULL"
+        ).format(
+            sql.Identifier(column), sql.Identifier(quantized), sql.Identifier(quantized), sql.Identifier(column)
+        ))
+        full_bytes, quantized_bytes, quantized_rows = cur.fetchone()
+    return {
+        "full_bytes": round(float(full_bytes or 0), 1),
+        "quantized_bytes": round(float(quantized_bytes or 0), 1),
+        "quantized_rows": quantized_rows,
+    }
+
+def run_quantized_queries(
+    conn: psycopg.Connection,
+    embedding_type: str,
+    query_vectors: List[Any],
+    k: int,
+    quantization: str,
+    rerank_limit: int
+) -> Dict[str, Any]:
+    """Run api.quantized_vector_search once per vector, returning result ids and per-query latencies."""
+    results = []
+    latencies = []
+    with conn.cursor() as cur:
+        for vector in query_vectors:
+            start_time = time.perf_counter()
+            cur.execute(
+                "SELECT id FROM api.quantized_vector_search(%b, %s, %s, NULL, NULL, %s, %s)",
+                (vector, embedding_type, k, quantization, rerank_limit)
+            )
+            ids = [row[0] for row in cur.fetchall()]
+            latencies.append((time.perf_counter() - start_time) * 1000)
+            results.append(ids)
+
+    return {"results": results, "latencies_ms": latencies}
+
+def evaluate_quantization(
+    conn: psycopg.Connection,
+    embedding_type: str,
+    quantization: str = "binary",
+    k: int = 5,
+    query_count: int = 50,
+    rerank_limits: Optional[List[int]] = None,
+    target_recall: float = 0.95,
+    seed: int = 42
+) -> Dict[str, Any]:
+    """
+    Measure recall@k and latency of quantized search with exact rerank for a range of rerank limits.
+
+    Recall is measured against an exact sequential scan over the full-precision
+    column. Returns the measurements plus the smallest rerank limit whose recall
+    reaches target_recall.
+    """
+    rerank_limits = rerank_limits or DEFAULT_RERANK_LIMITS
+    query_vectors = sample_query_vectors(conn, embedding_type, query_count, seed)
+    if not query_vectors:
+        raise ValueError(f"No {embedding_type} embeddings found to evaluate against")
+
+    logger.info(f"Measuring exact search for {len(query_vectors)} {embedding_type} queries")
+    exact = run_knn_queries(conn, embedding_type, query_vectors, k, exact=True)
+
+    measurements = []
+    recommended = None
+    for rerank_limit in rerank_limits:
+        quantized = run_quantized_queries(conn, embedding_type, query_vectors, k, quantization, rerank_limit)
+        measurement = {
+            "value": rerank_limit,
+            f"recall_at_{k}": round(recall_at_k(quantized["results"], exact["results"]), 4),
+            **summarize_latencies(quantized["latencies_ms"]),
+        }
+        measurements.append(measurement)
+        logger.info(f"rerank_limit = {rerank_limit}: {measurement}")
+
+        if recommended is None and measurement[f"recall_at_{k}"] >= target_recall:
+            recommended = rerank_limit
+
+    return {
+        "embedding_type": embedding_type,
+        "method": quantization,
+        "setting": "rerank_limit",
+        "k": k,
+        "queries": len(query_vectors),
+        "target_recall": target_recall,
+        "sizes": quantized_column_sizes(conn, embedding_type, quantization),
+        "exact": summarize_latencies(exact["latencies_ms"]),
+        "measurements": measurements,
+        "recommended": recommended,
+    }
+
+def apply_search_setting(conn: psycopg.Connection, role: str, setting: str, value: int) -> None:
+    """Persist a query-time search setting for a role, e.g. the PostgREST web_anon role."""
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("ALTER ROLE {} SET {} = {}").format(
+            sql.Identifier(role), sql.SQL(setting), sql.Literal(str(value))
+        ))
+    logger.info(f"Set {setting} = {value} for role {role}")
+
+def parse_embedding_types(value: str) -> List[str]:
+    """Parse a comma-separated list of embedding types, or 'all'."""
+    if value == "all":
+        return list(EMBEDDING_TYPES)
+
+    embedding_types = [item.strip() for item in value.split(",") if item.strip()]
+    for embedding_type in embedding_types:
+        if embedding_type not in EMBEDDING_TYPES:
+            raise argparse.ArgumentTypeError(f"Unknown embedding type: {embedding_type}")
+    return embedding_types
+
+def parse_int_list(value: str) -> List[int]:
+    """Parse a comma-separated list of integers."""
+    return [int(item) for item in value.split(",") if item.strip()]
+
+def main():
+    """Main function to manage ANN indexes."""
+    parser = argparse.ArgumentParser(description="Manage and tune ANN indexes on HTMX embedding columns")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("status", help="List ANN indexes on htmx_embeddings")
+
+    for command in ["build", "rebuild"]:
+        build_parser = subparsers.add_parser(command, help=f"{command.capitalize()} ANN indexes")
+        build_parser.add_argument(
+            "--types",
+            type=parse_embedding_types,
+            default=list(EMBEDDING_TYPES),
+            help="Comma-separated embedding types to index, or 'all' (default: all)"
+        )
+        build_parser.add_argument(
+            "--method",
+            choices=INDEX_METHODS,
+            default="hnsw",
+            help="Index access method (default: hnsw)"
+        )
+        build_parser.add_argument(
+            "--m",
+            type=int,
+            default=16,
+            help="HNSW: maximum connections per layer (default: 16)"
+        )
+        build_parser.add_argument(
+            "--ef-construction",
+            type=int,
+            default=64,
+            help="HNSW: size of the candidate list while building (default: 64)"
+        )
+        build_parser.add_argument(
+            "--lists",
+            type=int,
+            default=None,
+            help="IVFFlat: number of inverted lists (default: rows / 1000)"
+        )
+        build_parser.add_argument(
+            "--maintenance-work-mem",
+            type=str,
+            default=None,
+            help="maintenance_work_mem for the build, e.g. '1GB'"
+        )
+
+    drop_parser = subparsers.add_parser("drop", help="Drop ANN indexes")
+    drop_parser.add_argument(
+        "--types",
+        type=parse_embedding_types,
+        default=list(EMBEDDING_TYPES),
+        help="Comma-separated embedding types whose indexes to drop, or 'all' (default: all)"
+    )
+
+    tune_parser = subparsers.add_parser("tune", help="Measure recall and latency for query-time settings")
+    tune_parser.add_argument(
+        "--types",
+        type=parse_embedding_types,
+        default=["content"],
+        help="Comma-separated embedding types to tune, or 'all' (default: content)"
+    )
+    tune_parser.add_argument(
+        "--k",
+        type=int,
+        default=5,
+        help="Number of neighbours used for recall@k (default: 5)"
+    )
+    tune_parser.add_argument(
+        "--queries",
+        type=int,
+        default=50,
+        help="Number of sampled query vectors (default: 50)"
+    )
+    tune_parser.add_argument(
+        "--values",
+        type=parse_int_list,
+        default=None,
+        help="Comma-separated ef_search or probes values to try"
+    )
+    tune_parser.add_argument(
+        "--target-recall",
+        type=float,
+        default=0.95,
+        help="Recall@k the recommended setting must reach (default: 0.95)"
+    )
+    tune_parser.add_argument(
+        "--apply-role",
+        type=str,
+        default=None,
+        help="Persist the recommended setting for this role (e.g. web_anon)"
+    )
+    tune_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output results in JSON format"
+    )
+
+    quantized_parser = subparsers.add_parser(
+        "quantized", help="Measure recall and latency of quantized search with exact rerank"
+    )
+    quantized_parser.add_argument(
+        "--types",
+        type=parse_embedding_types,
+        default=["content"],
+        help="Comma-separated embedding types to evaluate, or 'all' (default: content)"
+    )
+    quantized_parser.add_argument(
+        "--quantization",
+        choices=QUANTIZATIONS,
+        default="binary",
+        help="Quantized column to evaluate (default: binary)"
+    )
+    quantized_parser.add_argument(
+        "--k",
+        type=int,
+        default=5,
+        help="Number of neighbours used for recall@k (default: 5)"
+    )
+    quantized_parser.add_argument(
+        "--queries",
+        type=int,
+        default=50,
+        help="Number of sampled query vectors (default: 50)"
+    )
+    quantized_parser.add_argument(
+        "--rerank-limits",
+        type=parse_int_list,
+        default=None,
+        help=f"Comma-separated rerank limits to try (default: {','.join(map(str, DEFAULT_RERANK_LIMITS))})"
+    )
+    quantized_parser.add_argument(
+        "--target-recall",
+        type=float,
+        default=0.95,
+        help="Recall@k the recommended rerank limit must reach (default: 0.95)"
+    )
+    quantized_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output results in JSON format"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        conn = connect_to_db()
+
+        if args.command == "status":
+            indexes = list_vector_indexes(conn)
+            if not indexes:
+                print("No ANN indexes found on htmx_embeddings.")
+            for index in indexes:
+                validity = "" if index["valid"] else " (INVALID)"
+                print(f"{index['index_name']}: {index['method']}, {index['size']}{validity}")
+                print(f"  {index['definition']}")
+
+        elif args.command in ("build", "rebuild"):
+            build_options = {
+                "m": args.m,
+                "ef_construction": args.ef_construction,
+                "lists": args.lists,
+                "maintenance_work_mem": args.maintenance_work_mem,
+            }
+            for embedding_type in args.types:
+                # Quantized copies get an HNSW index of their own for the first pass of quantized
+                # search; an IVFFlat scan at the default ivfflat.probes would return fewer than
+                # rerank_limit candidates and silently lose recall
+                quantizations = indexable_quantizations(conn, embedding_type) if args.method == "hnsw" else []
+                for quantization in [None] + quantizations:
+                    if args.command == "build":
+                        build_index(conn, embedding_type, args.method, quantization=quantization, **build_options)
+                    else:
+                        rebuild_index(conn, embedding_type, args.method, quantization=quantization, **build_options)
+
+        elif args.command == "drop":
+            for embedding_type in args.types:
+                for quantization in [None] + QUANTIZATIONS:
+                    drop_indexes_for_type(conn, embedding_type, quantization=quantization)
+
+        elif args.command == "quantized":
+            reports = [
+                evaluate_quantization(
+                    conn,
+                    embedding_type,
+                    quantization=args.quantization,
+                    k=args.k,
+                    query_count=args.queries,
+                    rerank_limits=args.rerank_limits,
+                    target_recall=args.target_recall
+                )
+                for embedding_type in args.types
+            ]
+
+            if args.json:
+                print(json.dumps(reports, indent=2))
+            else:
+                for report in reports:
+                    sizes = report["sizes"]
+                    print(
+                        f"{report['embedding_type']} ({report['method']}, {report['queries']} queries, "
+                        f"k={report['k']}): {sizes['quantized_bytes']} bytes per quantized vector vs "
+                        f"{sizes['full_bytes']} full, {sizes['quantized_rows']} rows quantized"
+                    )
+                    print(f"  exact: p50 {report['exact']['p50_ms']} ms, p99 {report['exact']['p99_ms']} ms")
+                    for measurement in report["measurements"]:
+                        print(
+                            f"  rerank_limit = {measurement['value']}: "
+                            f"recall@{report['k']} {measurement[f'recall_at_{report['k']}']:.3f}, "
+                            f"p50 {measurement['p50_ms']} ms, p99 {measurement['p99_ms']} ms"
+                        )
+                    print(f"  recommended rerank_limit: {report['recommended']}")
+
+        elif args.command == "tune":
+            reports = []
+            for embedding_type in args.types:
+                report = tune_search_setting(
+                    conn,
+                    embedding_type,
+                    k=args.k,
+                    query_count=args.queries,
+                    values=args.values,
+                    target_recall=args.target_recall
+                )
+                reports.append(report)
+
+            if args.apply_role:
+                # A role-level setting applies to every column, so use the largest recommendation
+                for setting in {report["setting"] for report in reports}:
+                    recommended = [
+                        report["recommended"] for report in reports
+                        if report["setting"] == setting and report["recommended"] is not None
+                    ]
+                    if recommended:
+                        apply_search_setting(conn, args.apply_role, setting, max(recommended))
+                    else:
+                        logger.warning(f"No {setting} value reached the target recall; nothing applied")
+
+            if args.json:
+                print(json.dumps(reports, indent=2))
+            else:
+                for report in reports:
+                    print(
+                        f"{report['embedding_type']} ({report['method']}, {report['queries']} queries, "
+                        f"k={report['k']})"
+                    )
+                    print(f"  exact: p50 {report['exact']['p50_ms']} ms, p99 {report['exact']['p99_ms']} ms")
+                    for measurement in report["measurements"]:
+                        print(
+                            f"  {report['setting']} = {measurement['value']}: "
+                            f"recall@{report['k']} {measurement[f'recall_at_{report['k']}']:.3f}, "
+                            f"p50 {measurement['p50_ms']} ms, p99 {measurement['p99_ms']} ms"
+                        )
+                    print(f"  recommended {report['setting']}: {report['recommended']}")
+
+    except Exception as e:
+        logger.error(f"Error in main function: {e}")
+        sys.exit(1)
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,30 @@
 """
 Utility script to embed a search query and find the most similar HTMX examples
 using the same embedding model as used for the examples.
+
+Attribute and keyword queries (e.g. "hx-swap-oob" or "sortable") are routed
+to an indexed lexical lookup that needs no query embedding; other queries, and
+lookups that miss, fall back to vector search.
+
+With --serve, it instead runs a long-lived HTTP service (on a TCP port or a
+Unix socket) that keeps a database connection pool and the embedding client
+warm between queries. With --batch, it reads many queries from a JSONL file,
+embeds them in batched API calls and runs each chunk of searches in one SQL
+round trip, streaming JSONL results.
 """
 
 import os
+import re
 import sys
 import json
 import argparse
+import time
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from urllib.parse import urlparse, parse_qs
+from socketserver import ThreadingMixIn, UnixStreamServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional, Callable, Tuple, Iterator, TextIO
 
 # Set up logging
 logging.basicConfig(
@@ -21,23 +37,27 @@ logger = logging.getLogger(__name__)
 try:
     # Import required libraries
     from dotenv import load_dotenv
+    import numpy as np
     import psycopg
+    from psycopg import sql
     from psycopg.rows import dict_row
-    from google import genai
-    from google.genai.types import EmbedContentConfig
+    from psycopg_pool import ConnectionPool
+    from pgvector.psycopg import register_vector
 except ImportError as e:
-    logger.error(f"Missing required packages. Please run: uv add google-genai psycopg python-dotenv")
+    logger.error(f"Missing required packages. Please run: uv add google-genai psycopg psycopg-pool python-dotenv numpy pgvector")
     sys.exit(1)
 
+from embedding_cache import EmbeddingCache, TieredEmbeddingCache, cache_key
+from embedding_providers import EmbeddingProvider, create_embedding_provider, PROVIDERS, DEFAULT_PROVIDER
+from vector_engine import VectorSearchEngine
+from vector_snapshot import DEFAULT_SNAPSHOT_PATH, EXAMPLE_FIELDS
+
 # Load environment variables from .env file
 load_dotenv()
 
 # Constants for Google AI - same as in embed_examples.py
-API_KEY = os.getenv("GOOGLE_API_KEY")
 PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT")
 REGION = os.getenv("GOOGLE_CLOUD_REGION", "us-central1")
-MODEL = "models/text-embedding-004"  # Must use this format
-DIMENSION = 768
 
 # Set Google GenAI environment variables
 os.environ["GOOGLE_CLOUD_PROJECT"] = PROJECT_ID if PROJECT_ID else ""
@@ -50,19 +70,66 @@ DB_USER = os.getenv("DB_USER")
 DB_PASS = os.getenv("DB_PASS")
 DB_NAME = os.getenv("DB_NAME")
 
+# Default weights used to combine similarities in multi-vector search
+EMBEDDING_TYPES = ["content", "title", "description", "key_concepts"]
+DEFAULT_WEIGHTS = {"content": 0.4, "title": 0.2, "description": 0.2, "key_concepts": 0.2}
+DEFAULT_CANDIDATE_LIMIT = 50
+
+# Quantized first-pass columns for api.quantized_vector_search (see embed_examples.py --quantize)
+QUANTIZATIONS = ["binary", "halfvec"]
+DEFAULT_RERANK_LIMIT = 100
+
+# Reciprocal rank fusion constant for api.hybrid_search
+DEFAULT_RRF_K = 60
+
+# Query router: queries made only of htmx attributes and key concept words are
+# answered by a lexical lookup without embedding the query
+ROUTE_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-:][a-z0-9]+)*")
+ATTRIBUTE_PATTERN = re.compile(r"^hx-[a-z0-9:-]*[a-z0-9]$")
+ROUTE_STOP_WORDS = {"a", "an", "and", "the", "of", "with", "for", "in", "on", "to", "using", "use", "htmx", "example"}
+
+# Fields returned by the search functions; multi-vector search adds per-type similarities
+RESULT_FIELDS = EXAMPLE_FIELDS + ["similarity"]
+MULTI_VECTOR_FIELDS = RESULT_FIELDS + [f"{embedding_type}_similarity" for embedding_type in EMBEDDING_TYPES]
+# Hybrid search adds the position in each ranking and the fused score
+HYBRID_FIELDS = RESULT_FIELDS + ["lexical_rank", "vector_rank", "hybrid_score"]
+ALL_FIELDS = list(dict.fromkeys(MULTI_VECTOR_FIELDS + HYBRID_FIELDS))
+# Fields shown by format_results unless --detailed is given
+SUMMARY_FIELDS = ["id", "title", "category", "url", "description", "similarity"]
+
+# Query embedding cache settings - kept separate from the document embedding cache
+QUERY_CACHE_PATH = os.getenv("QUERY_EMBEDDING_CACHE_PATH", ".cache/query_embeddings.sqlite3")
+QUERY_CACHE_MAX_MB = 64
+QUERY_CACHE_TTL_DAYS = 30
+QUERY_CACHE_MEMORY_ENTRIES = 1024
+
+# Batch mode settings - the embedding API accepts at most 100 texts per request
+DEFAULT_BATCH_SIZE = 100
+
+# Search service defaults
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+DEFAULT_POOL_SIZE = 10
+
+def get_conn_string() -> str:
+    """Build the database connection string from environment variables."""
+    # Check if all required environment variables are set
+    required_env_vars = ["DB_HOST", "DB_PORT", "DB_USER", "DB_PASS", "DB_NAME"]
+    missing_vars = [var for var in required_env_vars if not os.getenv(var)]
+    
+    if missing_vars:
+        raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
+    
+    return f"host={DB_HOST} port={DB_PORT} dbname={DB_NAME} user={DB_USER} password={DB_PASS}"
+
 def connect_to_db() -> psycopg.Connection:
     """Connect to the PostgreSQL database using environment variables."""
     try:
-        # Check if all required environment variables are set
-        required_env_vars = ["DB_HOST", "DB_PORT", "DB_USER", "DB_PASS", "DB_NAME"]
-        missing_vars = [var for var in required_env_vars if not os.getenv(var)]
-        
-        if missing_vars:
-            raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
-        
         # Connect to the database
-        conn_string = f"host={DB_HOST} port={DB_PORT} dbname={DB_NAME} user={DB_USER} password={DB_PASS}"
-        conn = psycopg.connect(conn_string)
+        conn = psycopg.connect(get_conn_string())
+        
+        # Exchange vectors with the server as binary float32 instead of text
+        register_vector(conn)
         
         logger.info(f"Successfully connected to database: {DB_NAME} on {DB_HOST}")
         return conn
@@ -70,70 +137,238 @@ def connect_to_db() -> psycopg.Connection:
         logger.error(f"Error connecting to database: {e}")
         raise
 
-def create_genai_client() -> genai.Client:
-    """Create and configure Google Generative AI client."""
-    if not API_KEY:
-        raise ValueError("GOOGLE_API_KEY environment variable is not set. Please set it in the .env file.")
-    
-    # Create a client directly
-    client = genai.Client(api_key=API_KEY)
-    logger.info("Google Generative AI client created with API key")
-    return client
+def configure_pool_connection(conn: psycopg.Connection) -> None:
+    """Prepare a new pooled connection to exchange vectors as binary float32."""
+    register_vector(conn)
+    # register_vector looks up the vector type, leaving a transaction open
+    conn.commit()
 
-def generate_query_embedding(query: str, client: genai.Client) -> List[float]:
-    """Generate embedding for a query using Google's Generative AI."""
+def create_connection_pool(size: int = DEFAULT_POOL_SIZE) -> ConnectionPool:
+    """Open a pool of database connections for the search service."""
     try:
-        # Create configuration - use RETRIEVAL_QUERY task type for queries
-        config = EmbedContentConfig(
-            task_type="RETRIEVAL_QUERY",  # Different task type for queries
-            output_dimensionality=DIMENSION,
+        pool = ConnectionPool(
+            get_conn_string(),
+            min_size=1,
+            max_size=size,
+            configure=configure_pool_connection,
+            open=True
         )
+        pool.wait()
+        logger.info(f"Opened connection pool (max {size} connections) to database: {DB_NAME} on {DB_HOST}")
+        return pool
+    except Exception as e:
+        logger.error(f"Error opening connection pool: {e}")
+        raise
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for cache lookups by collapsing whitespace and case."""
+    return " ".join(query.split()).casefold()
+
+def query_cache_key(query: str, provider: EmbeddingProvider) -> str:
+    """Build the cache key for a query embedded by the given provider."""
+    return cache_key(provider.model, "RETRIEVAL_QUERY", provider.dimension, normalize_query(query))
+
+def create_query_cache(
+    path: str = QUERY_CACHE_PATH,
+    max_mb: int = QUERY_CACHE_MAX_MB,
+    ttl_days: float = QUERY_CACHE_TTL_DAYS
+) -> TieredEmbeddingCache:
+    """Create the two-level (in-process LRU + SQLite) query embedding cache."""
+    persistent = EmbeddingCache(path, max_bytes=max_mb * 1024 * 1024, ttl=ttl_days * 24 * 60 * 60)
+    return TieredEmbeddingCache(persistent, max_entries=QUERY_CACHE_MEMORY_ENTRIES)
+
+def generate_query_embeddings(
+    queries: List[str],
+    provider: EmbeddingProvider,
+    cache: Optional[TieredEmbeddingCache] = None
+) -> List[np.ndarray]:
+    """Generate embeddings for several queries with the given embedding provider.
+    
+    Queries found in the cache (after normalization) are answered from it; the
+    rest are embedded with one provider call per max_batch_size queries.
+    """
+    try:
+        embeddings: Dict[str, np.ndarray] = {}
+        keys = [query_cache_key(query, provider) for query in queries]
+        if cache:
+            embeddings.update(cache.get_many(keys))
         
-        # Truncate query if too long (unlikely for a query, but just in case)
-        max_chars = 25000
-        if len(query) > max_chars:
-            query = query[:max_chars]
+        # Each distinct uncached query is embedded once
+        missing = {}
+        for key, query in zip(keys, queries):
+            if key not in embeddings:
+                missing.setdefault(key, query)
+        missing = list(missing.items())
+        if len(missing) < len(queries):
+            logger.info(f"Using {len(queries) - len(missing)} cached query embedding(s)")
         
-        # Call the embedding API
-        response = client.models.embed_content(
-            model=MODEL,
-            contents=[query],
-            config=config
-        )
+        for start in range(0, len(missing), provider.max_batch_size):
+            chunk = missing[start:start + provider.max_batch_size]
+            
+            # Use the RETRIEVAL_QUERY task type for queries
+            new_embeddings = dict(zip(
+                (key for key, _ in chunk),
+                provider.embed([query for _, query in chunk], task_type="RETRIEVAL_QUERY")
+            ))
+            embeddings.update(new_embeddings)
+            if cache:
+                cache.put_many(new_embeddings)
         
-        # Return embedding values
-        return response.embeddings[0].values
+        return [embeddings[key] for key in keys]
+    except Exception as e:
+        logger.error(f"Error generating query embeddings: {e}")
+        raise
+
+def generate_query_embedding(
+    query: str,
+    provider: EmbeddingProvider,
+    cache: Optional[TieredEmbeddingCache] = None
+) -> np.ndarray:
+    """Generate embedding for a query with the given embedding provider.
+    
+    If a cache is given, repeated queries (after normalization) are answered
+    from it without calling the provider.
+    """
+    return generate_query_embeddings([query], provider, cache)[0]
+
+def elapsed_ms(start: float) -> float:
+    """Milliseconds since a time.perf_counter() reading."""
+    return round((time.perf_counter() - start) * 1000, 3)
+
+def route_tokens(query: str) -> List[str]:
+    """Lowercased query tokens used for routing, without stop words."""
+    return [token for token in ROUTE_TOKEN_PATTERN.findall(normalize_query(query)) if token not in ROUTE_STOP_WORDS]
+
+def concept_forms(query: str) -> List[str]:
+    """The query as typed and lowercased, trimmed, for exact key concept matches."""
+    typed = " ".join(query.split()).strip("\"'`.?! ")
+    return list(dict.fromkeys([typed, typed.casefold()]))
+
+def classify_query(conn: psycopg.Connection, query: str) -> Optional[str]:
+    """
+    Decide whether a query can skip the embedding API.
+    
+    Returns "attribute" when the query consists only of hx-* attribute names
+    and some example uses all of them, "concept" when the whole query is
+    exactly one of the examples' key concepts, and None when it needs vector
+    search. Each check is a single probe on a GIN index of htmx_examples.
+    """
+    try:
+        with conn.cursor() as cur:
+            tokens = route_tokens(query)
+            if tokens and all(ATTRIBUTE_PATTERN.match(token) for token in tokens):
+                cur.execute(
+                    "SELECT EXISTS (SELECT 1 FROM htmx_examples WHERE htmx_attributes @> %s::text[])",
+                    (sorted(set(tokens)),)
+                )
+                return "attribute" if cur.fetchone()[0] else None
+            
+            forms = [form for form in concept_forms(query) if form]
+            if not forms:
+                return None
+            cur.execute(
+                "SELECT EXISTS (SELECT 1 FROM htmx_examples WHERE key_concepts && %s::text[])",
+                (forms,)
+            )
+            return "concept" if cur.fetchone()[0] else None
     except Exception as e:
-        logger.error(f"Error generating query embedding: {e}")
+        logger.error(f"Error classifying query: {e}")
         raise
 
+def lexical_lookup(
+    conn: psycopg.Connection,
+    query: str,
+    route: str,
+    embedding_type: str = "content",
+    limit: int = 5,
+    category_filter: Optional[str] = None,
+    complexity_filter: Optional[str] = None,
+    fields: Optional[List[str]] = None
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Answer a routed query with a lexical-only hybrid_search (no query embedding).
+    
+    Only exact matches count: rows that use every queried attribute, or that
+    list the queried concept among their key concepts. Up to `limit` of them
+    are returned, even if there are fewer; None, so that the caller falls back
+    to vector search, only when there are none.
+    """
+    candidates = max(limit, DEFAULT_CANDIDATE_LIMIT)
+    results = search_hybrid(
+        conn, query, None, embedding_type, candidates, category_filter, complexity_filter, candidates
+    )
+    if route == "attribute":
+        attributes = set(route_tokens(query))
+        matches = [
+            result for result in results
+            if attributes <= {attribute.lower() for attribute in result["htmx_attributes"] or []}
+        ]
+    else:
+        concept = concept_forms(query)[-1]
+        matches = [
+            result for result in results
+            if concept in {key_concept.casefold() for key_concept in result["key_concepts"] or []}
+        ]
+    if not matches:
+        return None
+    return project_fields(matches[:limit], fields, HYBRID_FIELDS)
+
+def check_fields(fields: List[str], allowed: List[str]) -> None:
+    """Raise ValueError if any requested result field is not returned by the search."""
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown result fields: {', '.join(unknown)} (expected some of: {', '.join(allowed)})")
+
+def select_fields(fields: Optional[List[str]], allowed: List[str] = RESULT_FIELDS) -> sql.Composable:
+    """Build the select list for the requested fields of a search function aliased as r."""
+    if not fields:
+        return sql.SQL("r.*")
+    check_fields(fields, allowed)
+    return sql.SQL(", ").join(sql.Identifier("r", field) for field in fields)
+
+def project_fields(
+    results: List[Dict[str, Any]],
+    fields: Optional[List[str]],
+    allowed: List[str] = RESULT_FIELDS
+) -> List[Dict[str, Any]]:
+    """Keep only the requested fields of search results computed in-process."""
+    if not fields:
+        return results
+    check_fields(fields, allowed)
+    return [{field: result[field] for field in fields} for result in results]
+
 def search_similar_examples(
     conn: psycopg.Connection, 
-    query_embedding: List[float],
+    query_embedding: np.ndarray,
     embedding_type: str = "content",
     limit: int = 5,
     category_filter: Optional[str] = None,
-    complexity_filter: Optional[str] = None
+    complexity_filter: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    quantization: Optional[str] = None,
+    rerank_limit: int = DEFAULT_RERANK_LIMIT
 ) -> List[Dict[str, Any]]:
-    """Find examples similar to the query embedding using the vector_search function."""
+    """Find examples similar to the query embedding using the vector_search function.
+    
+    If fields is given, only those result columns are returned. If quantization
+    is given, the quantized_vector_search function is used instead: a first pass
+    over the quantized column, with the top rerank_limit candidates reranked at
+    full precision.
+    """
     try:
         with conn.cursor(row_factory=dict_row) as cur:
-            # Execute the api.vector_search function with the query embedding
-            query = """
-                SELECT * FROM api.vector_search(
-                    %s::vector,  -- query_embedding
-                    %s,          -- embedding_type
-                    %s,          -- result_limit
-                    %s,          -- category_filter
-                    %s           -- complexity_filter
-                )
-            """
+            params = [query_embedding, embedding_type, limit, category_filter, complexity_filter]
+            if quantization:
+                search_function = sql.SQL("api.quantized_vector_search(%b, %s, %s, %s, %s, %s, %s)")
+                params += [quantization, rerank_limit]
+            else:
+                search_function = sql.SQL("api.vector_search(%b, %s, %s, %s, %s)")
             
-            # Execute query
-            cur.execute(
-                query, 
-                (query_embedding, embedding_type, limit, category_filter, complexity_filter)
+            # Execute the search function with the query embedding (binary pgvector)
+            query = sql.SQL("SELECT {fields} FROM {search_function} AS r").format(
+                fields=select_fields(fields), search_function=search_function
             )
+            cur.execute(query, params)
             
             # Fetch and return results
             results = cur.fetchall()
@@ -145,28 +380,44 @@ def search_similar_examples(
 
 def search_using_multi_vector(
     conn: psycopg.Connection, 
-    query_embedding: List[float],
+    query_embedding: np.ndarray,
     limit: int = 5,
     category_filter: Optional[str] = None,
-    complexity_filter: Optional[str] = None
+    complexity_filter: Optional[str] = None,
+    weights: Optional[Dict[str, float]] = None,
+    candidate_limit: int = DEFAULT_CANDIDATE_LIMIT,
+    fields: Optional[List[str]] = None
 ) -> List[Dict[str, Any]]:
-    """Find examples similar to the query embedding using the multi_vector_search function."""
+    """Find examples similar to the query embedding using the multi_vector_search function.
+    
+    If fields is given, only those result columns are returned.
+    """
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
     try:
         with conn.cursor(row_factory=dict_row) as cur:
             # Execute the api.multi_vector_search function with the query embedding
-            query = """
-                SELECT * FROM api.multi_vector_search(
-                    %s::vector,  -- query_embedding
+            query = sql.SQL("""
+                SELECT {fields} FROM api.multi_vector_search(
+                    %b,          -- query_embedding (binary pgvector)
                     %s,          -- result_limit
                     %s,          -- category_filter
-                    %s           -- complexity_filter
-                )
-            """
+                    %s,          -- complexity_filter
+                    %s,          -- content_weight
+                    %s,          -- title_weight
+                    %s,          -- description_weight
+                    %s,          -- key_concepts_weight
+                    %s           -- candidate_limit
+                ) AS r
+            """).format(fields=select_fields(fields, MULTI_VECTOR_FIELDS))
             
             # Execute query
             cur.execute(
                 query, 
-                (query_embedding, limit, category_filter, complexity_filter)
+                (
+                    query_embedding, limit, category_filter, complexity_filter,
+                    weights["content"], weights["title"], weights["description"], weights["key_concepts"],
+                    candidate_limit
+                )
             )
             
             # Fetch and return results
@@ -177,6 +428,304 @@ def search_using_multi_vector(
         logger.error(f"Error searching with multi-vector: {e}")
         raise
 
+def search_hybrid(
+    conn: psycopg.Connection,
+    query: str,
+    query_embedding: Optional[np.ndarray],
+    embedding_type: str = "content",
+    limit: int = 5,
+    category_filter: Optional[str] = None,
+    complexity_filter: Optional[str] = None,
+    candidate_limit: int = DEFAULT_CANDIDATE_LIMIT,
+    rrf_k: int = DEFAULT_RRF_K,
+    fields: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """Fuse full-text and vector rankings using the hybrid_search function.
+    
+    Without a query embedding only the lexical ranking is used.
+    """
+    try:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                sql.SQL("SELECT {} FROM api.hybrid_search(%s, %b, %s, %s, %s, %s, %s, %s) AS r").format(
+                    select_fields(fields, HYBRID_FIELDS)
+                ),
+                (
+                    query, query_embedding, embedding_type, limit, category_filter, complexity_filter,
+                    candidate_limit, rrf_k
+                )
+            )
+            results = cur.fetchall()
+            logger.info(f"Found {len(results)} examples using hybrid search")
+            return results
+    except Exception as e:
+        logger.error(f"Error searching with hybrid search: {e}")
+        raise
+
+def find_similar_examples(
+    conn: psycopg.Connection,
+    example_id: str,
+    embedding_type: str = "content",
+    limit: int = 5,
+    category_filter: Optional[str] = None,
+    complexity_filter: Optional[str] = None,
+    fields: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """Find examples similar to an existing example using the find_similar_examples function."""
+    try:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                sql.SQL("SELECT {} FROM api.find_similar_examples(%s, %s, %s, %s, %s) AS r").format(
+                    select_fields(fields)
+                ),
+                (example_id, embedding_type, limit, category_filter, complexity_filter)
+            )
+            results = cur.fetchall()
+            logger.info(f"Found {len(results)} examples similar to {example_id}")
+            return results
+    except Exception as e:
+        logger.error(f"Error finding similar examples: {e}")
+        raise
+
+def read_batch_queries(file: TextIO) -> Iterator[Dict[str, Any]]:
+    """
+    Read batch queries from JSONL, one object per line.
+    
+    Each object needs a "query" and may set "id", "embedding_type", "limit",
+    "category" and "complexity" to override the command-line defaults. A bare
+    JSON string is accepted as a query on its own.
+    """
+    for line_number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {"line": line_number, "error": f"Invalid JSON: {e}"}
+            continue
+        if isinstance(item, str):
+            item = {"query": item}
+        if not isinstance(item, dict) or not isinstance(item.get("query"), str) or not item["query"].strip():
+            yield {"line": line_number, "error": 'Each line needs a non-empty "query"'}
+            continue
+        item["line"] = line_number
+        yield item
+
+def batch_search(
+    conn: psycopg.Connection,
+    items: List[Dict[str, Any]],
+    embeddings: List[np.ndarray],
+    multi_vector: bool = False,
+    weights: Optional[Dict[str, float]] = None,
+    candidate_limit: int = DEFAULT_CANDIDATE_LIMIT,
+    fields: Optional[List[str]] = None,
+    quantization: Optional[str] = None,
+    rerank_limit: int = DEFAULT_RERANK_LIMIT
+) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """
+    Run the searches for a chunk of queries in a single SQL statement.
+    
+    The query vectors and per-query options are sent as parallel arrays and
+    unnested into a LATERAL call of the search function per query. Rows are
+    streamed back and yielded as (index into items, results) once each query's
+    results are complete.
+    """
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    if multi_vector:
+        search_call = """
+            api.multi_vector_search(
+                q.embedding, q.result_limit, q.category, q.complexity,
+                %s, %s, %s, %s, %s
+            )
+        """
+        search_params = [
+            weights["content"], weights["title"], weights["description"], weights["key_concepts"],
+            candidate_limit
+        ]
+    elif quantization:
+        search_call = """
+            api.quantized_vector_search(
+                q.embedding, q.embedding_type, q.result_limit, q.category, q.complexity, %s, %s
+            )
+        """
+        search_params = [quantization, rerank_limit]
+    else:
+        search_call = "api.vector_search(q.embedding, q.embedding_type, q.result_limit, q.category, q.complexity)"
+        search_params = []
+    
+    query = sql.SQL("""
+        SELECT q.ordinal, {fields}
+        FROM unnest(
+            %s::int[], %b::vector[], %s::text[], %s::int[], %s::text[], %s::text[]
+        ) AS q(ordinal, embedding, embedding_type, result_limit, category, complexity)
+        CROSS JOIN LATERAL {search_call} AS r
+        ORDER BY q.ordinal, r.similarity DESC
+    """).format(
+        fields=select_fields(fields, MULTI_VECTOR_FIELDS if multi_vector else RESULT_FIELDS),
+        search_call=sql.SQL(search_call)
+    )
+    params = [
+        list(range(len(items))),
+        embeddings,
+        [item["embedding_type"] for item in items],
+        [item["limit"] for item in items],
+        [item["category"] for item in items],
+        [item["complexity"] for item in items],
+    ] + search_params
+    
+    try:
+        with conn.cursor(row_factory=dict_row) as cur:
+            current, results = 0, []
+            for row in cur.stream(query, params):
+                ordinal = row.pop("ordinal")
+                # Queries are returned in order, so earlier ones are complete
+                while current < ordinal:
+                    yield current, results
+                    current, results = current + 1, []
+                results.append(row)
+            # Queries without any matches have no rows at all
+            while current < len(items):
+                yield current, results
+                current, results = current + 1, []
+    except Exception as e:
+        logger.error(f"Error running batch search: {e}")
+        raise
+
+def run_batch(
+    input_file: TextIO,
+    output_file: TextIO,
+    provider: EmbeddingProvider,
+    defaults: Dict[str, Any],
+    conn: Optional[psycopg.Connection] = None,
+    engine: Optional[VectorSearchEngine] = None,
+    cache: Optional[TieredEmbeddingCache] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    multi_vector: bool = False,
+    weights: Optional[Dict[str, float]] = None,
+    candidate_limit: int = DEFAULT_CANDIDATE_LIMIT,
+    fields: Optional[List[str]] = None,
+    quantization: Optional[str] = None,
+    rerank_limit: int = DEFAULT_RERANK_LIMIT
+) -> Dict[str, Any]:
+    """
+    Answer every query in a JSONL file, writing one JSONL result line per input line.
+    
+    Queries are processed in chunks of batch_size: one batched embedding call
+    and one SQL round trip per chunk. With the numpy backend, the chunk's
+    queries that share their search options are answered with one matrix
+    product. Output lines are written in input order as each chunk completes.
+    """
+    start_time = time.time()
+    counts = {"queries": 0, "errors": 0}
+    
+    def write(record: Dict[str, Any]) -> None:
+        output_file.write(json.dumps(record, default=str) + "\n")
+    
+    def process(chunk: List[Dict[str, Any]]) -> None:
+        # Fill in per-query options and reject invalid ones before searching
+        valid = []
+        for item in chunk:
+            if "error" not in item:
+                item["embedding_type"] = item.get("embedding_type") or defaults["embedding_type"]
+                item["limit"] = item["limit"] if "limit" in item else defaults["limit"]
+                item["category"] = item.get("category", defaults["category"])
+                item["complexity"] = item.get("complexity", defaults["complexity"])
+                if item["embedding_type"] not in EMBEDDING_TYPES:
+                    item["error"] = f"Invalid embedding_type: {item['embedding_type']}"
+                elif not isinstance(item["limit"], int) or isinstance(item["limit"], bool) or item["limit"] < 1:
+                    item["error"] = f"Invalid limit: {item['limit']}"
+            if "error" not in item:
+                valid.append(item)
+        
+        results_by_line = {}
+        if valid:
+            embeddings = generate_query_embeddings([item["query"] for item in valid], provider, cache)
+            if engine and multi_vector:
+                for item, embedding in zip(valid, embeddings):
+                    results = engine.multi_vector_search(
+                        embedding, item["limit"], item["category"], item["complexity"], weights, candidate_limit
+                    )
+                    results_by_line[item["line"]] = project_fields(results, fields, MULTI_VECTOR_FIELDS)
+            elif engine:
+                # Queries with the same options are answered with one matrix product
+                groups = {}
+                for index, item in enumerate(valid):
+                    key = (item["embedding_type"], item["category"], item["complexity"], item["limit"])
+                    groups.setdefault(key, []).append(index)
+                for (embedding_type, category, complexity, limit), indices in groups.items():
+                    group_results = engine.vector_search_many(
+                        np.stack([embeddings[index] for index in indices]), embedding_type, limit, category, complexity
+                    )
+                    for index, results in zip(indices, group_results):
+                        results_by_line[valid[index]["line"]] = project_fields(results, fields, RESULT_FIELDS)
+            else:
+                for index, results in batch_search(
+                    conn, valid, embeddings, multi_vector, weights, candidate_limit, fields, quantization, rerank_limit
+                ):
+                    results_by_line[valid[index]["line"]] = results
+            if conn:
+                # Don't leave the connection idle in a transaction between chunks
+                conn.commit()
+        
+        for item in chunk:
+            record = {"id": item["id"]} if "id" in item else {}
+            record["line"] = item["line"]
+            if "error" in item:
+                record["error"] = item["error"]
+                counts["errors"] += 1
+            else:
+                record["query"] = item["query"]
+                record["results"] = results_to_json(results_by_line[item["line"]])
+                counts["queries"] += 1
+            write(record)
+        output_file.flush()
+    
+    chunk = []
+    for item in read_batch_queries(input_file):
+        chunk.append(item)
+        if len(chunk) >= batch_size:
+            process(chunk)
+            chunk = []
+    if chunk:
+        process(chunk)
+    
+    elapsed = time.time() - start_time
+    counts["seconds"] = round(elapsed, 3)
+    counts["queries_per_second"] = round(counts["queries"] / elapsed, 1) if elapsed else 0.0
+    logger.info(
+        f"Batch complete: {counts['queries']} queries ({counts['errors']} errors) "
+        f"in {elapsed:.2f}s, {counts['queries_per_second']} queries/s"
+    )
+    return counts
+
+def parse_weights(value: str) -> Dict[str, float]:
+    """Parse a weight specification like 'content=0.5,title=0.5' for argparse."""
+    weights = {}
+    try:
+        for item in value.split(","):
+            name, weight = item.split("=")
+            weights[name.strip()] = float(weight)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid weights '{value}', expected e.g. content=0.5,title=0.5")
+
+    unknown = set(weights) - set(EMBEDDING_TYPES)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown embedding types: {', '.join(sorted(unknown))}")
+    if any(weight < 0 for weight in weights.values()):
+        raise argparse.ArgumentTypeError("Weights must not be negative")
+    return weights
+
+def parse_fields(value: str) -> List[str]:
+    """Parse a comma-separated result field list like 'id,title,url,similarity' for argparse."""
+    fields = list(dict.fromkeys(field.strip() for field in value.split(",") if field.strip()))
+    if not fields:
+        raise argparse.ArgumentTypeError("At least one field is required")
+    try:
+        check_fields(fields, ALL_FIELDS)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return fields
+
 def format_results(results: List[Dict[str, Any]], detailed: bool = False) -> str:
     """Format search results for display."""
     if not results:
@@ -185,14 +734,23 @@ def format_results(results: List[Dict[str, Any]], detailed: bool = False) -> str
     formatted_output = []
     
     for i, example in enumerate(results):
-        # Basic information always included
-        example_info = [
-            f"#{i+1}: {example['title']} (similarity: {example['similarity']:.2f})",
-            f"ID: {example['id']}",
-            f"Category: {example['category']}",
-            f"URL: {example['url']}",
-            f"Description: {example['description']}"
+        # Basic information, skipping fields that were not selected
+        heading = f"#{i+1}: {example.get('title') or example.get('id', '')}"
+        if example.get('similarity') is not None:
+            heading += f" (similarity: {example['similarity']:.2f})"
+        if example.get('hybrid_score') is not None:
+            heading += f" [hybrid score: {example['hybrid_score']:.4f}]"
+        example_info = [heading]
+        ranks = [
+            f"{name} #{example[field]}"
+            for name, field in [("lexical", "lexical_rank"), ("vector", "vector_rank")]
+            if example.get(field) is not None
         ]
+        if ranks:
+            example_info.append(f"Ranks: {', '.join(ranks)}")
+        for label, field in [("ID", "id"), ("Category", "category"), ("URL", "url"), ("Description", "description")]:
+            if field in example:
+                example_info.append(f"{label}: {example[field]}")
         
         # Add more details if requested
         if detailed:
@@ -219,6 +777,361 @@ def format_results(results: List[Dict[str, Any]], detailed: bool = False) -> str
     
     return "\n\n".join(formatted_output)
 
+def results_to_json(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert search results into JSON-serializable dictionaries."""
+    json_results = []
+    for result in results:
+        # Convert any non-serializable types
+        result_dict = dict(result)
+        for key, value in result_dict.items():
+            if isinstance(value, (list, dict)):
+                continue
+            elif isinstance(value, (bytes, memoryview)):
+                result_dict[key] = str(value)
+        json_results.append(result_dict)
+    return json_results
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running wait for it and receive the same result (or exception).
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls: Dict[Any, "SingleFlight._Call"] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: Any, fn: Callable[[], Any]) -> Any:
+        """Run fn for key, or wait for the in-flight call with the same key."""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = self._Call()
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+class SearchService:
+    """Search backend shared by all request handler threads of the server.
+
+    Searches run against PostgreSQL through the connection pool, or against an
+    in-process VectorSearchEngine snapshot when one is given.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[ConnectionPool],
+        provider: EmbeddingProvider,
+        cache: Optional[TieredEmbeddingCache] = None,
+        engine: Optional[VectorSearchEngine] = None
+    ):
+        self.pool = pool
+        self.provider = provider
+        self.cache = cache
+        self.engine = engine
+        self.flights = SingleFlight()
+
+    def embed(self, query: str) -> np.ndarray:
+        """Embed a query, sharing the API call between concurrent identical queries."""
+        return self.flights.do(
+            ("embed", normalize_query(query)),
+            lambda: generate_query_embedding(query, self.provider, self.cache)
+        )
+
+    def search(self, query: str, embedding_type: str, limit: int,
+               category: Optional[str], complexity: Optional[str],
+               fields: Optional[List[str]] = None, quantization: Optional[str] = None,
+               rerank_limit: int = DEFAULT_RERANK_LIMIT) -> List[Dict[str, Any]]:
+        """Single-vector search for a natural language query."""
+        def run():
+            query_embedding = self.embed(query)
+            if self.engine:
+                if quantization:
+                    raise ValueError("Quantized search is not available with the numpy backend")
+                return project_fields(
+                    self.engine.vector_search(query_embedding, embedding_type, limit, category, complexity), fields
+                )
+            with self.pool.connection() as conn:
+                return search_similar_examples(
+                    conn, query_embedding, embedding_type, limit, category, complexity, fields,
+                    quantization, rerank_limit
+                )
+
+        key = (
+            "search", normalize_query(query), embedding_type, limit, category, complexity, tuple(fields or ()),
+            quantization, rerank_limit
+        )
+        return self.flights.do(key, run)
+
+    def multi_search(self, query: str, limit: int, category: Optional[str], complexity: Optional[str],
+                     weights: Optional[Dict[str, float]], candidate_limit: int,
+                     fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Multi-vector search for a natural language query."""
+        def run():
+            query_embedding = self.embed(query)
+            if self.engine:
+                return project_fields(
+                    self.engine.multi_vector_search(
+                        query_embedding, limit, category, complexity, weights, candidate_limit
+                    ),
+                    fields,
+                    MULTI_VECTOR_FIELDS
+                )
+            with self.pool.connection() as conn:
+                return search_using_multi_vector(
+                    conn, query_embedding, limit, category, complexity, weights, candidate_limit, fields
+                )
+
+        weights_key = tuple(sorted((weights or {}).items()))
+        key = (
+            "multi-search", normalize_query(query), limit, category, complexity, weights_key, candidate_limit,
+            tuple(fields or ())
+        )
+        return self.flights.do(key, run)
+
+    def hybrid_search(self, query: str, embedding_type: str, limit: int,
+                      category: Optional[str], complexity: Optional[str], candidate_limit: int,
+                      rrf_k: int, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Hybrid lexical and vector search for a natural language query."""
+        def run():
+            if self.engine:
+                raise ValueError("Hybrid search is not available with the numpy backend")
+            query_embedding = self.embed(query)
+            with self.pool.connection() as conn:
+                return search_hybrid(
+                    conn, query, query_embedding, embedding_type, limit, category, complexity,
+                    candidate_limit, rrf_k, fields
+                )
+
+        key = (
+            "hybrid-search", normalize_query(query), embedding_type, limit, category, complexity, candidate_limit,
+            rrf_k, tuple(fields or ())
+        )
+        return self.flights.do(key, run)
+
+    def similar(self, example_id: str, embedding_type: str, limit: int,
+                category: Optional[str], complexity: Optional[str],
+                fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Find examples similar to an existing example."""
+        def run():
+            if self.engine:
+                return project_fields(
+                    self.engine.find_similar_examples(example_id, embedding_type, limit, category, complexity),
+                    fields
+                )
+            with self.pool.connection() as conn:
+                return find_similar_examples(conn, example_id, embedding_type, limit, category, complexity, fields)
+
+        key = ("similar", example_id, embedding_type, limit, category, complexity, tuple(fields or ()))
+        return self.flights.do(key, run)
+
+    def health(self) -> Dict[str, Any]:
+        """Report service status along with pool, cache and de-duplication counters."""
+        status = {
+            "status": "healthy",
+            "backend": "numpy" if self.engine else "postgres",
+            "embedding_model": self.provider.model,
+            "single_flight": {"executed": self.flights.executed, "shared": self.flights.shared},
+        }
+        if self.pool:
+            pool_stats = self.pool.get_stats()
+            status["pool"] = {
+                "size": pool_stats.get("pool_size", 0),
+                "available": pool_stats.get("pool_available", 0),
+                "waiting": pool_stats.get("requests_waiting", 0),
+            }
+        if self.cache:
+            status["cache"] = self.cache.stats()
+        return status
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler exposing the search functions as GET endpoints.
+
+    Endpoints mirror the middleware: /search, /multi-search, /similar and /health,
+    plus /hybrid-search.
+    """
+
+    service: SearchService = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        routes = {
+            "/search": self.handle_search,
+            "/multi-search": self.handle_multi_search,
+            "/hybrid-search": self.handle_hybrid_search,
+            "/similar": self.handle_similar,
+            "/health": lambda params: self.service.health(),
+        }
+
+        handler = routes.get(url.path)
+        if handler is None:
+            self.send_json(404, {"error": f"Unknown endpoint: {url.path}"})
+            return
+
+        try:
+            self.send_json(200, handler(params))
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+        except Exception as e:
+            logger.error(f"Error handling {url.path}: {e}")
+            self.send_json(500, {"error": "Search failed", "details": str(e)})
+
+    def handle_search(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        query, limit, category, complexity = self.common_params(params, "q")
+        embedding_type = self.embedding_type_param(params)
+        fields = self.fields_param(params)
+        quantization = params.get("quantization") or None
+        if quantization and quantization not in QUANTIZATIONS:
+            raise ValueError(f"Invalid quantization: {quantization}")
+        rerank_limit = self.int_param(params, "rerank_limit", DEFAULT_RERANK_LIMIT)
+        return results_to_json(self.service.search(
+            query, embedding_type, limit, category, complexity, fields, quantization, rerank_limit
+        ))
+
+    def handle_multi_search(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        query, limit, category, complexity = self.common_params(params, "q")
+        try:
+            weights = parse_weights(params["weights"]) if params.get("weights") else None
+        except argparse.ArgumentTypeError as e:
+            raise ValueError(str(e))
+        candidate_limit = self.int_param(params, "candidate_limit", DEFAULT_CANDIDATE_LIMIT)
+        fields = self.fields_param(params)
+        return results_to_json(
+            self.service.multi_search(query, limit, category, complexity, weights, candidate_limit, fields)
+        )
+
+    def handle_hybrid_search(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        query, limit, category, complexity = self.common_params(params, "q")
+        embedding_type = self.embedding_type_param(params)
+        candidate_limit = self.int_param(params, "candidate_limit", DEFAULT_CANDIDATE_LIMIT)
+        rrf_k = self.int_param(params, "rrf_k", DEFAULT_RRF_K)
+        fields = self.fields_param(params)
+        return results_to_json(self.service.hybrid_search(
+            query, embedding_type, limit, category, complexity, candidate_limit, rrf_k, fields
+        ))
+
+    def handle_similar(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        example_id, limit, category, complexity = self.common_params(params, "id")
+        embedding_type = self.embedding_type_param(params)
+        fields = self.fields_param(params)
+        return results_to_json(self.service.similar(example_id, embedding_type, limit, category, complexity, fields))
+
+    def common_params(self, params: Dict[str, str], required: str) -> Tuple[str, int, Optional[str], Optional[str]]:
+        """Extract the required parameter plus limit and filters shared by all searches."""
+        if not params.get(required):
+            raise ValueError(f'Query parameter "{required}" is required')
+        complexity = params.get("complexity") or None
+        if complexity and complexity not in ("beginner", "intermediate", "advanced"):
+            raise ValueError(f"Invalid complexity: {complexity}")
+        return params[required], self.int_param(params, "limit", 5), params.get("category") or None, complexity
+
+    def embedding_type_param(self, params: Dict[str, str]) -> str:
+        embedding_type = params.get("embedding_type", "content")
+        if embedding_type not in EMBEDDING_TYPES:
+            raise ValueError(f"Invalid embedding_type: {embedding_type}")
+        return embedding_type
+
+    def fields_param(self, params: Dict[str, str]) -> Optional[List[str]]:
+        if not params.get("fields"):
+            return None
+        try:
+            return parse_fields(params["fields"])
+        except argparse.ArgumentTypeError as e:
+            raise ValueError(str(e))
+
+    def int_param(self, params: Dict[str, str], name: str, default: int) -> int:
+        try:
+            value = int(params.get(name, default))
+        except ValueError:
+            raise ValueError(f'Query parameter "{name}" must be an integer')
+        if value < 1:
+            raise ValueError(f'Query parameter "{name}" must be positive')
+        return value
+
+    def send_json(self, status: int, body: Any) -> None:
+        payload = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def address_string(self) -> str:
+        # Unix socket clients have no (host, port) address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format: str, *args) -> None:
+        logger.info(f"{self.address_string()} - {format % args}")
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    """HTTP server on a Unix socket, handling each request in its own thread."""
+    daemon_threads = True
+
+def run_server(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: Optional[str] = None,
+    pool_size: int = DEFAULT_POOL_SIZE,
+    cache: Optional[TieredEmbeddingCache] = None,
+    engine: Optional[VectorSearchEngine] = None,
+    provider_name: str = DEFAULT_PROVIDER
+) -> None:
+    """Run the search service until interrupted."""
+    provider = create_embedding_provider(provider_name)
+    # The numpy backend answers searches from its snapshot and needs no database
+    pool = None if engine else create_connection_pool(pool_size)
+    SearchRequestHandler.service = SearchService(pool, provider, cache, engine)
+
+    try:
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            server = ThreadingUnixHTTPServer(socket_path, SearchRequestHandler)
+            logger.info(f"Search service listening on unix:{socket_path}")
+        else:
+            server = ThreadingHTTPServer((host, port), SearchRequestHandler)
+            logger.info(f"Search service listening on http://{host}:{port}")
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Shutting down search service")
+        finally:
+            server.server_close()
+            if socket_path and os.path.exists(socket_path):
+                os.unlink(socket_path)
+    finally:
+        if pool:
+            pool.close()
+
 def main():
     """Main function to run the query embedding and similarity search."""
     parser = argparse.ArgumentParser(description="Embed a search query and find similar HTMX examples")
@@ -226,6 +1139,7 @@ def main():
     parser.add_argument(
         "query",
         type=str,
+        nargs="?",
         help="Search query to embed and use for finding similar examples"
     )
     
@@ -269,59 +1183,359 @@ def main():
         help="Use multi-vector search (searches across all embedding types)"
     )
     
+    parser.add_argument(
+        "--weights",
+        type=parse_weights,
+        default=None,
+        help="Multi-vector weights per embedding type, e.g. content=0.5,title=0.3,description=0.2,key_concepts=0 "
+             "(types not given keep their default of 0.4/0.2/0.2/0.2; a weight of 0 skips that type)"
+    )
+    
+    parser.add_argument(
+        "--candidate-limit",
+        type=int,
+        default=DEFAULT_CANDIDATE_LIMIT,
+        help=f"Multi-vector candidates fetched per embedding type before scoring, or hybrid candidates kept "
+             f"per ranking before fusion (default: {DEFAULT_CANDIDATE_LIMIT})"
+    )
+    
+    parser.add_argument(
+        "--hybrid",
+        action="store_true",
+        help="Use hybrid search (fuses full-text and vector rankings with reciprocal rank fusion)"
+    )
+    
+    parser.add_argument(
+        "--no-router",
+        action="store_true",
+        help="Always embed the query, instead of answering attribute and keyword queries with a lexical lookup"
+    )
+    
+    parser.add_argument(
+        "--rrf-k",
+        type=int,
+        default=DEFAULT_RRF_K,
+        help=f"Reciprocal rank fusion constant for hybrid search (default: {DEFAULT_RRF_K})"
+    )
+    
+    parser.add_argument(
+        "--quantization",
+        type=str,
+        choices=QUANTIZATIONS,
+        default=None,
+        help="Search the quantized embedding column first and rerank the candidates at full precision"
+    )
+    
+    parser.add_argument(
+        "--rerank-limit",
+        type=int,
+        default=DEFAULT_RERANK_LIMIT,
+        help=f"Candidates from the quantized first pass reranked at full precision (default: {DEFAULT_RERANK_LIMIT})"
+    )
+    
+    parser.add_argument(
+        "--cache-path",
+        type=str,
+        default=QUERY_CACHE_PATH,
+        help=f"Path of the on-disk query embedding cache (default: {QUERY_CACHE_PATH})"
+    )
+    
+    parser.add_argument(
+        "--cache-ttl-days",
+        type=float,
+        default=QUERY_CACHE_TTL_DAYS,
+        help=f"Days before a cached query embedding expires (default: {QUERY_CACHE_TTL_DAYS})"
+    )
+    
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the query embedding cache and always call the embedding API"
+    )
+    
+    parser.add_argument(
+        "--provider",
+        type=str,
+        choices=PROVIDERS,
+        default=DEFAULT_PROVIDER,
+        help="Query embedding provider; must match the one used to embed the examples "
+             f"(default: {DEFAULT_PROVIDER})"
+    )
+    
+    parser.add_argument(
+        "--fields",
+        type=parse_fields,
+        default=None,
+        help="Comma-separated result fields to return, e.g. id,title,url,similarity "
+             "(default: the fields shown, or all fields with --json, --detailed or --batch)"
+    )
+    
     parser.add_argument(
         "--json",
         action="store_true",
         help="Output results in JSON format"
     )
     
+    parser.add_argument(
+        "--backend",
+        type=str,
+        choices=["postgres", "numpy"],
+        default="postgres",
+        help="Run searches in PostgreSQL or in-process over an embedding snapshot (default: postgres)"
+    )
+    
+    parser.add_argument(
+        "--snapshot",
+        type=str,
+        default=DEFAULT_SNAPSHOT_PATH,
+        help=f"Snapshot directory used by the numpy backend (default: {DEFAULT_SNAPSHOT_PATH})"
+    )
+    
+    parser.add_argument(
+        "--batch",
+        type=str,
+        metavar="FILE",
+        help="Read queries from a JSONL file ('-' for stdin) and write JSONL results"
+    )
+    
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Queries embedded and searched together in batch mode (default: {DEFAULT_BATCH_SIZE})"
+    )
+    
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="File to write batch results to (default: stdout)"
+    )
+    
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run a long-lived HTTP search service instead of a single query"
+    )
+    
+    parser.add_argument(
+        "--host",
+        type=str,
+        default=DEFAULT_HOST,
+        help=f"Host for the search service to listen on (default: {DEFAULT_HOST})"
+    )
+    
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"Port for the search service to listen on (default: {DEFAULT_PORT})"
+    )
+    
+    parser.add_argument(
+        "--socket",
+        type=str,
+        help="Listen on this Unix socket path instead of a TCP port"
+    )
+    
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=DEFAULT_POOL_SIZE,
+        help=f"Maximum database connections held by the search service (default: {DEFAULT_POOL_SIZE})"
+    )
+    
     args = parser.parse_args()
     
+    if not args.serve and not args.batch and not args.query:
+        parser.error("a query is required unless --serve or --batch is given")
+    
+    if args.quantization and (args.multi_vector or args.backend == "numpy"):
+        parser.error("--quantization only applies to single-vector search with the postgres backend")
+    
+    if args.hybrid and (args.multi_vector or args.quantization or args.backend == "numpy" or args.batch):
+        parser.error("--hybrid cannot be combined with --multi-vector, --quantization, --batch or the numpy backend")
+    
+    if args.fields:
+        allowed = MULTI_VECTOR_FIELDS if args.multi_vector else HYBRID_FIELDS if args.hybrid else RESULT_FIELDS
+        try:
+            check_fields(args.fields, allowed)
+        except ValueError as e:
+            parser.error(f"{e}; per-type similarities require --multi-vector and ranks require --hybrid")
+    
+    # Plain text output only shows a few fields, so don't fetch the wide ones
+    fields = args.fields
+    if fields is None and not args.json and not args.detailed and not args.batch:
+        fields = SUMMARY_FIELDS + (HYBRID_FIELDS[len(RESULT_FIELDS):] if args.hybrid else [])
+    
+    if args.serve:
+        cache = None
+        if not args.no_cache:
+            cache = create_query_cache(args.cache_path, ttl_days=args.cache_ttl_days)
+        try:
+            engine = VectorSearchEngine(args.snapshot) if args.backend == "numpy" else None
+            run_server(args.host, args.port, args.socket, args.pool_size, cache, engine, args.provider)
+        except Exception as e:
+            logger.error(f"Error running search service: {e}")
+        finally:
+            if cache:
+                cache.close()
+        return
+    
     try:
-        # Configure Google AI client
-        client = create_genai_client()
+        # Configure the embedding provider
+        provider = create_embedding_provider(args.provider)
         
-        # Connect to the database
-        conn = connect_to_db()
+        # Connect to the database, or load the snapshot for the numpy backend
+        conn = None
+        engine = None
+        if args.backend == "numpy":
+            engine = VectorSearchEngine(args.snapshot)
+        else:
+            conn = connect_to_db()
         
-        # Generate embedding for the query
-        logger.info(f"Generating embedding for query: {args.query}")
-        query_embedding = generate_query_embedding(args.query, client)
+        # Open the query embedding cache unless it is disabled
+        cache = None
+        if not args.no_cache:
+            cache = create_query_cache(args.cache_path, ttl_days=args.cache_ttl_days)
         
-        # Find similar examples
-        if args.multi_vector:
-            results = search_using_multi_vector(
-                conn=conn,
-                query_embedding=query_embedding,
-                limit=args.limit,
-                category_filter=args.category,
-                complexity_filter=args.complexity
-            )
-        else:
-            results = search_similar_examples(
-                conn=conn,
-                query_embedding=query_embedding,
-                embedding_type=args.embedding_type,
-                limit=args.limit,
-                category_filter=args.category,
-                complexity_filter=args.complexity
-            )
+        if args.batch:
+            input_file = sys.stdin if args.batch == "-" else open(args.batch)
+            output_file = open(args.output, "w") if args.output else sys.stdout
+            try:
+                run_batch(
+                    input_file,
+                    output_file,
+                    provider,
+                    defaults={
+                        "embedding_type": args.embedding_type,
+                        "limit": args.limit,
+                        "category": args.category,
+                        "complexity": args.complexity,
+                    },
+                    conn=conn,
+                    engine=engine,
+                    cache=cache,
+                    batch_size=args.batch_size,
+                    multi_vector=args.multi_vector,
+                    weights=args.weights,
+                    candidate_limit=args.candidate_limit,
+                    fields=fields,
+                    quantization=args.quantization,
+                    rerank_limit=args.rerank_limit
+                )
+            finally:
+                if input_file is not sys.stdin:
+                    input_file.close()
+                if output_file is not sys.stdout:
+                    output_file.close()
+            return
+        
+        timings = {}
+        total_start = time.perf_counter()
+        
+        # Route attribute and keyword queries to a lexical lookup that needs no
+        # query embedding; the lookup rows carry the hybrid fields only
+        route = None
+        results = None
+        # Only the default vector search is routed; an explicitly chosen search mode is always honoured
+        explicit_mode = args.multi_vector or args.weights or args.quantization or args.hybrid
+        if (
+            conn and not engine and not args.no_router and not explicit_mode
+            and all(field in HYBRID_FIELDS for field in fields or [])
+        ):
+            route_start = time.perf_counter()
+            route = classify_query(conn, args.query)
+            timings["route"] = elapsed_ms(route_start)
+            if route:
+                lookup_start = time.perf_counter()
+                results = lexical_lookup(
+                    conn, args.query, route, args.embedding_type, args.limit, args.category, args.complexity, fields
+                )
+                timings["lookup"] = elapsed_ms(lookup_start)
+                if results is None:
+                    logger.info(f"Lexical lookup for {route} query missed, falling back to vector search")
+        
+        if results is None:
+            route = "multi_vector" if args.multi_vector else "hybrid" if args.hybrid else "vector"
+            
+            # Generate embedding for the query
+            logger.info(f"Generating embedding for query: {args.query}")
+            embed_start = time.perf_counter()
+            query_embedding = generate_query_embedding(args.query, provider, cache)
+            timings["embed"] = elapsed_ms(embed_start)
+            
+            if cache:
+                stats = cache.stats()
+                logger.info(
+                    f"Query embedding cache: {stats['hits']} hits, {stats['misses']} misses "
+                    f"({stats['size_mb']} MB on disk)"
+                )
+            
+            # Find similar examples
+            search_start = time.perf_counter()
+            if engine and args.multi_vector:
+                results = project_fields(
+                    engine.multi_vector_search(
+                        query_embedding, args.limit, args.category, args.complexity, args.weights, args.candidate_limit
+                    ),
+                    fields,
+                    MULTI_VECTOR_FIELDS
+                )
+            elif engine:
+                results = project_fields(
+                    engine.vector_search(query_embedding, args.embedding_type, args.limit, args.category, args.complexity),
+                    fields
+                )
+            elif args.hybrid:
+                results = search_hybrid(
+                    conn=conn,
+                    query=args.query,
+                    query_embedding=query_embedding,
+                    embedding_type=args.embedding_type,
+                    limit=args.limit,
+                    category_filter=args.category,
+                    complexity_filter=args.complexity,
+                    candidate_limit=args.candidate_limit,
+                    rrf_k=args.rrf_k,
+                    fields=fields
+                )
+            elif args.multi_vector:
+                results = search_using_multi_vector(
+                    conn=conn,
+                    query_embedding=query_embedding,
+                    limit=args.limit,
+                    category_filter=args.category,
+                    complexity_filter=args.complexity,
+                    weights=args.weights,
+                    candidate_limit=args.candidate_limit,
+                    fields=fields
+                )
+            else:
+                results = search_similar_examples(
+                    conn=conn,
+                    query_embedding=query_embedding,
+                    embedding_type=args.embedding_type,
+                    limit=args.limit,
+                    category_filter=args.category,
+                    complexity_filter=args.complexity,
+                    fields=fields,
+                    quantization=args.quantization,
+                    rerank_limit=args.rerank_limit
+                )
+            timings["search"] = elapsed_ms(search_start)
+        
+        timings["total"] = elapsed_ms(total_start)
+        logger.info(f"Route: {route} ({timings['total']} ms)")
         
         # Output results
         if args.json:
-            # Output as JSON
-            json_results = []
-            for result in results:
-                # Convert any non-serializable types
-                result_dict = dict(result)
-                for key, value in result_dict.items():
-                    if isinstance(value, (list, dict)):
-                        continue
-                    elif isinstance(value, (bytes, memoryview)):
-                        result_dict[key] = str(value)
-                json_results.append(result_dict)
-            
-            print(json.dumps(json_results, indent=2))
+            # Output as JSON, with the routing decision and timings
+            print(json.dumps({
+                "query": args.query,
+                "route": route,
+                "timings_ms": timings,
+                "results": results_to_json(results),
+            }, indent=2, default=str))
         else:
             # Output formatted text
             print(format_results(results, detailed=args.detailed))
@@ -329,8 +1543,10 @@ def main():
     except Exception as e:
         logger.error(f"Error in main function: {e}")
     finally:
-        if 'conn' in locals():
+        if locals().get('conn'):
             conn.close()
+        if locals().get('cache'):
+            cache.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
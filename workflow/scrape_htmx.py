@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Download the HTMX example pages with concurrent conditional requests.
+
+This replaces the sequential wget loop of scrape_htmx.sh. The examples index
+and every example page are fetched over one keep-alive HTTP connection pool,
+with a bounded number of requests in flight. A manifest next to the pages
+stores each page's ETag, Last-Modified and SHA-256. Later runs send
+If-None-Match / If-Modified-Since and only write a page when it actually
+changed. Every run writes a change set (new, updated, unchanged, removed and
+failed pages) that downstream stages can work from instead of reprocessing
+every page.
+
+--base-url points the scraper at any server with the same /examples/ layout,
+such as a local http.server fixture.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import logging
+import tempfile
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+try:
+    # Import required libraries
+    import httpx
+except ImportError as e:
+    logger.error(f"Missing required packages. Please run: uv add httpx")
+    sys.exit(1)
+
+DEFAULT_BASE_URL = "https://htmx.org"
+INDEX_PATH = "/examples/"
+DEFAULT_OUTPUT_DIR = "../examples"
+# No .html suffix, so extract_examples.py never mistakes them for pages
+MANIFEST_NAME = ".scrape_manifest"
+CHANGES_NAME = ".scrape_changes"
+
+# Requests in flight, and the size of the keep-alive connection pool
+DEFAULT_CONCURRENCY = 8
+REQUEST_TIMEOUT = 30.0
+MAX_RETRIES = 3
+# HTTP status codes that indicate we should back off and retry
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# The index currently links every example; fewer links than this means the
+# page layout changed, so the known examples are fetched as well
+MIN_EXPECTED_EXAMPLES = 27
+FALLBACK_EXAMPLES = [
+    # UI Patterns
+    "click-to-edit", "bulk-update", "click-to-load", "delete-row", "edit-row", "lazy-load",
+    "inline-validation", "infinite-scroll", "active-search", "progress-bar", "value-select",
+    "animations", "file-upload", "file-upload-input", "reset-user-input",
+    # Dialog Examples
+    "dialogs", "modal-uikit", "modal-bootstrap", "modal-custom",
+    # Advanced Examples
+    "tabs-hateoas", "tabs-javascript", "keyboard-shortcuts", "sortable", "update-other-content",
+    "confirm", "async-auth", "web-components", "move-before",
+]
+
+def example_link_pattern(base_url: str) -> re.Pattern:
+    """Match links to example pages, absolute under base_url or site-relative."""
+    return re.compile(r'href="(?:' + re.escape(base_url) + r')?/examples/([a-z0-9][a-z0-9-]*)/"')
+
+def find_examples(index_html: str, base_url: str) -> List[str]:
+    """Return the example names linked from the index page, in page order."""
+    names = example_link_pattern(base_url).findall(index_html)
+    return list(dict.fromkeys(names))
+
+def example_url(base_url: str, name: str) -> str:
+    return f"{base_url}/examples/{name}/"
+
+def write_atomic(path: str, data: bytes) -> None:
+    """Write bytes to a temporary file in the same directory and rename it into place."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+def write_json_atomic(path: str, data: Any) -> None:
+    write_atomic(path, (json.dumps(data, indent=2) + "\n").encode("utf-8"))
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    """Load the scrape manifest, treating a missing or corrupt one as empty."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if isinstance(manifest, dict):
+            manifest.setdefault("pages", {})
+            return manifest
+    except FileNotFoundError:
+        pass
+    except json.JSONDecodeError:
+        logger.warning(f"Ignoring corrupt manifest {path}; every page will be downloaded")
+    return {"pages": {}}
+
+def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Build If-None-Match / If-Modified-Since headers from a manifest entry."""
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+async def fetch(
+    client: "httpx.AsyncClient",
+    semaphore: asyncio.Semaphore,
+    url: str,
+    headers: Dict[str, str],
+    max_retries: int = MAX_RETRIES
+) -> "httpx.Response":
+    """GET a URL within the concurrency limit, retrying transient failures with backoff."""
+    for attempt in range(max_retries + 1):
+        try:
+            async with semaphore:
+                response = await client.get(url, headers=headers)
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt == max_retries:
+                return response
+            retry_after = response.headers.get("Retry-After", "")
+            delay = float(retry_after) if retry_after.isdigit() else 2 ** attempt
+            logger.warning(f"{url} returned {response.status_code}, retrying in {delay:.0f}s")
+        except httpx.TransportError as e:
+            if attempt == max_retries:
+                raise
+            delay = 2 ** attempt
+            logger.warning(f"Error fetching {url}: {e}, retrying in {delay}s")
+        await asyncio.sleep(delay)
+
+async def scrape_page(
+    client: "httpx.AsyncClient",
+    semaphore: asyncio.Semaphore,
+    base_url: str,
+    name: str,
+    output_dir: str,
+    entry: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Conditionally fetch one example page and write it if it changed.
+
+    Returns the page's change record: status is "new", "updated",
+    "unchanged" or "failed", and `entry` is its new manifest entry.
+    """
+    url = example_url(base_url, name)
+    path = os.path.join(output_dir, f"{name}.html")
+    record = {"id": name, "url": url, "path": path}
+
+    # Without the file on disk there is nothing a 304 could refer to
+    existed = os.path.exists(path)
+    headers = conditional_headers(entry) if existed else {}
+    try:
+        response = await fetch(client, semaphore, url, headers)
+    except httpx.HTTPError as e:
+        logger.error(f"Error fetching {name}: {e}")
+        return {**record, "status": "failed", "error": str(e)}
+
+    if response.status_code == 304:
+        return {**record, "status": "unchanged", "entry": entry}
+    if response.status_code != 200:
+        logger.error(f"Error fetching {name}: HTTP {response.status_code}")
+        return {**record, "status": "failed", "error": f"HTTP {response.status_code}"}
+
+    body = response.content
+    new_entry = {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "sha256": hashlib.sha256(body).hexdigest(),
+        "fetched_at": datetime.now(timezone.utc).isoformat(),
+    }
+    # Servers without validators answer 200 every time; compare the content instead
+    if entry and entry.get("sha256") == new_entry["sha256"] and existed:
+        return {**record, "status": "unchanged", "entry": new_entry}
+
+    write_atomic(path, body)
+    return {**record, "status": "updated" if entry or existed else "new", "entry": new_entry}
+
+async def scrape_examples(
+    base_url: str = DEFAULT_BASE_URL,
+    output_dir: str = DEFAULT_OUTPUT_DIR,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    min_examples: int = MIN_EXPECTED_EXAMPLES,
+    force: bool = False,
+    on_change: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+    include_unchanged: bool = False
+) -> Dict[str, Any]:
+    """
+    Scrape the examples index and every example page, writing only changed pages.
+
+    `on_change` is awaited with each new or updated page's change record as
+    soon as it is written, so a pipeline can start on it while other pages
+    are still downloading (and apply backpressure by awaiting a bounded
+    queue). With include_unchanged it is also called for unchanged pages.
+    The manifest is saved after every page, so an interrupted run only
+    refetches what it had not finished.
+    """
+    start = time.time()
+    base_url = base_url.rstrip("/")
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = {"pages": {}} if force else load_manifest(manifest_path)
+    if manifest.get("base_url") not in (None, base_url):
+        logger.info(f"Base URL changed from {manifest['base_url']}, downloading every page")
+        manifest = {"pages": {}}
+    manifest["base_url"] = base_url
+
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(
+        limits=limits,
+        timeout=REQUEST_TIMEOUT,
+        follow_redirects=True,
+        headers={"User-Agent": "htmx-examples-scraper"}
+    ) as client:
+        # The index is fetched conditionally too; on 304 the stored link list is reused
+        index = manifest.get("index")
+        response = await fetch(client, semaphore, base_url + INDEX_PATH, conditional_headers(index))
+        if response.status_code == 304 and index:
+            names = index["examples"]
+            logger.info(f"Examples index unchanged ({len(names)} examples)")
+        else:
+            response.raise_for_status()
+            names = find_examples(response.text, base_url)
+            manifest["index"] = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "examples": names,
+            }
+            logger.info(f"Found {len(names)} examples on the index page")
+
+        if len(names) < min_examples:
+            logger.warning(f"Expected at least {min_examples} examples, adding the known example list")
+            names = list(dict.fromkeys(names + FALLBACK_EXAMPLES))
+
+        pages = manifest["pages"]
+        changes = {"new": [], "updated": [], "unchanged": [], "failed": []}
+
+        async def run(name: str) -> None:
+            record = await scrape_page(client, semaphore, base_url, name, output_dir, pages.get(name))
+            status = record["status"]
+            if record.get("entry"):
+                pages[name] = record.pop("entry")
+                write_json_atomic(manifest_path, manifest)
+            changes[status].append(record)
+            if status in ("new", "updated"):
+                logger.info(f"{status.capitalize()}: {name}")
+            if on_change and (status in ("new", "updated") or (include_unchanged and status == "unchanged")):
+                await on_change(record)
+
+        await asyncio.gather(*(run(name) for name in names))
+
+    # Pages no longer linked from the index are reported once and forgotten; their files are kept
+    removed = sorted(set(pages) - set(names))
+    for name in removed:
+        del pages[name]
+    write_json_atomic(manifest_path, manifest)
+
+    report = {
+        "base_url": base_url,
+        "scraped_at": datetime.now(timezone.utc).isoformat(),
+        "seconds": round(time.time() - start, 2),
+        **{status: sorted(records, key=lambda r: r["id"]) for status, records in changes.items()},
+        "removed": removed,
+    }
+    write_json_atomic(os.path.join(output_dir, CHANGES_NAME), report)
+    return report
+
+def main():
+    """Main function to scrape the HTMX examples."""
+    parser = argparse.ArgumentParser(description="Download the HTMX example pages, writing only pages that changed")
+
+    parser.add_argument(
+        "--base-url",
+        default=DEFAULT_BASE_URL,
+        help=f"Site to scrape; point at a local server for testing (default: {DEFAULT_BASE_URL})"
+    )
+
+    parser.add_argument(
+        "--output-dir",
+        default=DEFAULT_OUTPUT_DIR,
+        help=f"Directory for the downloaded pages (default: {DEFAULT_OUTPUT_DIR})"
+    )
+
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Maximum requests in flight and keep-alive connections (default: {DEFAULT_CONCURRENCY})"
+    )
+
+    parser.add_argument(
+        "--min-examples",
+        type=int,
+        default=MIN_EXPECTED_EXAMPLES,
+        help=f"Also fetch the known example list when the index links fewer pages; 0 disables it (default: {MIN_EXPECTED_EXAMPLES})"
+    )
+
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignore the manifest and download every page unconditionally"
+    )
+
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the change set as JSON"
+    )
+
+    args = parser.parse_args()
+
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    try:
+        report = asyncio.run(scrape_examples(
+            base_url=args.base_url,
+            output_dir=args.output_dir,
+            concurrency=args.concurrency,
+            min_examples=args.min_examples,
+            force=args.force
+        ))
+
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print(
+                f"{len(report['new'])} new, {len(report['updated'])} updated, {len(report['unchanged'])} unchanged, "
+                f"{len(report['removed'])} removed, {len(report['failed'])} failed ({report['seconds']}s)"
+            )
+            for record in report["new"] + report["updated"]:
+                print(f"  {record['status']}: {record['id']}")
+
+        if report["failed"]:
+            sys.exit(1)
+    except Exception as e:
+        logger.error(f"Error scraping examples: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
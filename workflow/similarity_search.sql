@@ -38,8 +38,25 @@ BEGIN
         ELSE embedding_column := 'content_embedding';
     END CASE;
     
-    -- Return the most similar examples
+    -- Rank over the narrow id, vector and filter columns first, then hydrate
+    -- the wide example columns for the top results only
     RETURN QUERY EXECUTE format('
+        WITH ranked AS (
+            SELECT 
+                emb.id,
+                emb.%I <=> $1 AS distance
+            FROM 
+                htmx_embeddings emb
+            JOIN 
+                htmx_examples e ON e.id = emb.id
+            WHERE 
+                ($2 IS NULL OR e.category = $2)
+            AND
+                ($3 IS NULL OR e.complexity_level = $3)
+            ORDER BY 
+                emb.%I <=> $1  -- Cosine distance (lower is more similar)
+            LIMIT $4
+        )
         SELECT 
             e.id,
             e.title,
@@ -53,30 +70,38 @@ BEGIN
             e.demo_explanation,
             e.complexity_level,
             e.use_cases,
-            (1 - (emb.%I <=> $1))::FLOAT AS similarity
+            (1 - r.distance)::FLOAT AS similarity
         FROM 
-            htmx_examples e
+            ranked r
         JOIN 
-            htmx_embeddings emb ON e.id = emb.id
-        WHERE 
-            ($2 IS NULL OR e.category = $2)
-        AND
-            ($3 IS NULL OR e.complexity_level = $3)
+            htmx_examples e ON e.id = r.id
         ORDER BY 
-            emb.%I <=> $1  -- Cosine distance (lower is more similar)
-        LIMIT $4
+            r.distance
     ', embedding_column, embedding_column)
     USING query_embedding, category_filter, complexity_filter, result_limit;
 END;
 $$ LANGUAGE plpgsql;
 
--- Multi-embedding search function that performs searches across multiple embedding types
--- and combines the results with a ranking algorithm
-CREATE OR REPLACE FUNCTION api.multi_vector_search(
-    query_embedding VECTOR,             -- Pre-embedded query vector
-    result_limit INTEGER DEFAULT 5,     -- Maximum number of results to return
-    category_filter TEXT DEFAULT NULL,  -- Optional filter by category
-    complexity_filter TEXT DEFAULT NULL -- Optional filter by complexity level
+-- Two-pass search over the quantized embedding columns written by
+-- embed_examples.py --quantize. The first pass ranks the rows on the small
+-- quantized column (Hamming distance for binary, cosine distance for halfvec);
+-- only the top rerank_limit candidates are then reranked with the full-precision
+-- vectors, and the top results are hydrated as in vector_search.
+-- The first pass orders by <~> (bit) or <=> (halfvec), so it is served by the
+-- HNSW bit_hamming_ops / halfvec_cosine_ops indexes that
+-- manage_vector_indexes.py build creates on the quantized columns, with
+-- hnsw.ef_search raised to rerank_limit for the rest of the transaction.
+-- Without such an index, or with pgvector < 0.7 (no <~>; binary then falls back
+-- to bit_count, PostgreSQL 14+), the first pass is a sequential scan over the
+-- quantized column. halfvec always needs pgvector 0.7+.
+CREATE OR REPLACE FUNCTION api.quantized_vector_search(
+    query_embedding VECTOR,              -- Pre-embedded query vector
+    embedding_type TEXT DEFAULT 'content', -- Type of embedding to search against
+    result_limit INTEGER DEFAULT 5,      -- Maximum number of results to return
+    category_filter TEXT DEFAULT NULL,   -- Optional filter by category
+    complexity_filter TEXT DEFAULT NULL, -- Optional filter by complexity level
+    quantization TEXT DEFAULT 'binary',  -- Quantized column used for the first pass: binary or halfvec
+    rerank_limit INTEGER DEFAULT 100     -- Candidates reranked with the full-precision vectors
 ) RETURNS TABLE (
     id TEXT,
     title TEXT,
@@ -90,110 +115,418 @@ CREATE OR REPLACE FUNCTION api.multi_vector_search(
     demo_explanation TEXT,
     complexity_level TEXT,
     use_cases TEXT[],
-    similarity FLOAT,                 -- Combined similarity score
-    content_similarity FLOAT,         -- Individual similarity scores for transparency
-    title_similarity FLOAT,
-    description_similarity FLOAT,
-    key_concepts_similarity FLOAT
+    similarity FLOAT                     -- Full-precision cosine similarity score (0-1)
 ) AS $$
+DECLARE
+    embedding_column TEXT;
+    quantized_column TEXT;
+    first_pass_distance TEXT;
+    query_bits BIT VARYING;
 BEGIN
+    -- Determine which embedding column to use
+    CASE embedding_type
+        WHEN 'title' THEN embedding_column := 'title_embedding';
+        WHEN 'description' THEN embedding_column := 'description_embedding';
+        WHEN 'key_concepts' THEN embedding_column := 'key_concepts_embedding';
+        ELSE embedding_column := 'content_embedding';
+    END CASE;
+
+    quantized_column := embedding_column || '_' || quantization;
+
+    CASE quantization
+        WHEN 'binary' THEN
+            -- Quantize the query the same way as the stored vectors: one bit per
+            -- dimension, set for positive components
+            query_bits := array_to_string(ARRAY(
+                SELECT CASE WHEN x > 0 THEN '1' ELSE '0' END
+                FROM unnest(query_embedding::REAL[]) AS x
+            ), '')::BIT VARYING;
+            IF to_regoperator('<~>(bit,bit)') IS NOT NULL THEN
+                first_pass_distance := format('emb.%I <~> $6::BIT(%s)', quantized_column, length(query_bits));
+            ELSE
+                first_pass_distance := format('bit_count(emb.%I # $6::BIT(%s))', quantized_column, length(query_bits));
+            END IF;
+        WHEN 'halfvec' THEN
+            first_pass_distance := format('emb.%I <=> $1::HALFVEC', quantized_column);
+        ELSE
+            RAISE EXCEPTION 'Unknown quantization: % (expected binary or halfvec)', quantization;
+    END CASE;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_attribute a
+        WHERE a.attrelid = 'htmx_embeddings'::regclass AND a.attname = quantized_column AND NOT a.attisdropped
+    ) THEN
+        RAISE EXCEPTION 'Column % does not exist; run embed_examples.py --quantize %', quantized_column, quantization;
+    END IF;
+
+    -- An HNSW scan returns at most hnsw.ef_search rows, so let it yield every candidate
+    IF current_setting('hnsw.ef_search', true) IS NOT NULL
+       AND current_setting('hnsw.ef_search')::INTEGER < LEAST(GREATEST(rerank_limit, result_limit), 1000) THEN
+        PERFORM set_config('hnsw.ef_search', LEAST(GREATEST(rerank_limit, result_limit), 1000)::TEXT, true);
+    END IF;
+
     RETURN QUERY EXECUTE format('
-        WITH content_results AS (
+        WITH candidates AS (
             SELECT 
-                e.id,
-                (1 - (emb.content_embedding <=> $1))::FLOAT AS similarity
+                emb.id
             FROM 
-                htmx_examples e
+                htmx_embeddings emb
             JOIN 
-                htmx_embeddings emb ON e.id = emb.id
+                htmx_examples e ON e.id = emb.id
             WHERE 
+                emb.%1$I IS NOT NULL
+            AND
                 ($2 IS NULL OR e.category = $2)
             AND
                 ($3 IS NULL OR e.complexity_level = $3)
+            ORDER BY 
+                %2$s
+            LIMIT $5
         ),
-        title_results AS (
+        ranked AS (
             SELECT 
-                e.id,
-                (1 - (emb.title_embedding <=> $1))::FLOAT AS similarity
+                emb.id,
+                emb.%3$I <=> $1 AS distance
             FROM 
-                htmx_examples e
+                candidates c
             JOIN 
-                htmx_embeddings emb ON e.id = emb.id
-            WHERE 
-                ($2 IS NULL OR e.category = $2)
-            AND
-                ($3 IS NULL OR e.complexity_level = $3)
-        ),
-        description_results AS (
+                htmx_embeddings emb ON emb.id = c.id
+            ORDER BY 
+                distance
+            LIMIT $4
+        )
+        SELECT 
+            e.id,
+            e.title,
+            e.category,
+            e.url,
+            e.description,
+            e.html_snippets,
+            e.javascript_snippets,
+            e.key_concepts,
+            e.htmx_attributes,
+            e.demo_explanation,
+            e.complexity_level,
+            e.use_cases,
+            (1 - r.distance)::FLOAT AS similarity
+        FROM 
+            ranked r
+        JOIN 
+            htmx_examples e ON e.id = r.id
+        ORDER BY 
+            r.distance
+    ', quantized_column, first_pass_distance, embedding_column)
+    USING query_embedding, category_filter, complexity_filter, result_limit,
+          GREATEST(rerank_limit, result_limit), query_bits;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Hybrid lexical + vector search fused with reciprocal rank fusion (RRF).
+-- The lexical ranking matches any query term against the generated search_tsv
+-- column and any hx-* attribute names in the query against htmx_attributes,
+-- both served by GIN indexes (see init_db_schema.sql). Rows using all of the
+-- queried attributes rank first, then rows using any of them, then ts_rank_cd.
+-- The vector ranking is the same as in vector_search.
+-- Each ranking keeps its top candidate_limit rows and every row scores
+-- 1 / (rrf_k + rank) per ranking it appears in. A NULL query_embedding gives a
+-- lexical-only search that needs no query embedding.
+CREATE OR REPLACE FUNCTION api.hybrid_search(
+    query_text TEXT,                     -- Natural language or keyword query
+    query_embedding VECTOR,              -- Pre-embedded query vector (NULL for lexical only)
+    embedding_type TEXT DEFAULT 'content', -- Type of embedding to search against
+    result_limit INTEGER DEFAULT 5,      -- Maximum number of results to return
+    category_filter TEXT DEFAULT NULL,   -- Optional filter by category
+    complexity_filter TEXT DEFAULT NULL, -- Optional filter by complexity level
+    candidate_limit INTEGER DEFAULT 50,  -- Rows kept from each ranking before fusion
+    rrf_k INTEGER DEFAULT 60             -- RRF constant; larger values flatten the rank weights
+) RETURNS TABLE (
+    id TEXT,
+    title TEXT,
+    category TEXT,
+    url TEXT,
+    description TEXT,
+    html_snippets JSONB,
+    javascript_snippets JSONB,
+    key_concepts TEXT[],
+    htmx_attributes TEXT[],
+    demo_explanation TEXT,
+    complexity_level TEXT,
+    use_cases TEXT[],
+    similarity FLOAT,                    -- Cosine similarity score (0-1), NULL without an embedding
+    lexical_rank INTEGER,                -- Position in the lexical ranking, NULL if not matched
+    vector_rank INTEGER,                 -- Position in the vector ranking, NULL if not a candidate
+    hybrid_score FLOAT                   -- Fused RRF score the results are ordered by
+) AS $$
+DECLARE
+    embedding_column TEXT;
+    text_query TSQUERY;
+    query_attributes TEXT[];
+BEGIN
+    -- Determine which embedding column to use
+    CASE embedding_type
+        WHEN 'title' THEN embedding_column := 'title_embedding';
+        WHEN 'description' THEN embedding_column := 'description_embedding';
+        WHEN 'key_concepts' THEN embedding_column := 'key_concepts_embedding';
+        ELSE embedding_column := 'content_embedding';
+    END CASE;
+
+    -- Match any query term (OR) and let ts_rank_cd reward rows matching more of
+    -- them; NULL when the query has no lexemes, e.g. only stop words
+    text_query := NULLIF(array_to_string(ARRAY(
+        SELECT quote_literal(lexeme)
+        FROM unnest(tsvector_to_array(to_tsvector('english', COALESCE(query_text, '')))) AS lexeme
+    ), ' | '), '')::TSQUERY;
+    query_attributes := ARRAY(
+        SELECT DISTINCT lower(m[1])
+        FROM regexp_matches(COALESCE(query_text, ''), '(hx-[a-z0-9:-]*[a-z0-9])', 'gi') AS m
+    );
+
+    RETURN QUERY EXECUTE format('
+        WITH lexical AS (
             SELECT 
                 e.id,
-                (1 - (emb.description_embedding <=> $1))::FLOAT AS similarity
+                row_number() OVER (
+                    ORDER BY e.htmx_attributes @> $6 AND cardinality($6) > 0 DESC,
+                             e.htmx_attributes && $6 DESC,
+                             ts_rank_cd(e.search_tsv, $5) DESC,
+                             e.id
+                ) AS rank
             FROM 
                 htmx_examples e
-            JOIN 
-                htmx_embeddings emb ON e.id = emb.id
             WHERE 
+                (e.search_tsv @@ $5 OR e.htmx_attributes && $6)
+            AND
                 ($2 IS NULL OR e.category = $2)
             AND
                 ($3 IS NULL OR e.complexity_level = $3)
+            ORDER BY 
+                rank
+            LIMIT $7
         ),
-        key_concepts_results AS (
+        nearest AS (
+            -- Same ordered scan as vector_search, so an ANN index can serve it
             SELECT 
-                e.id,
-                (1 - (emb.key_concepts_embedding <=> $1))::FLOAT AS similarity
+                emb.id,
+                emb.%1$I <=> $1 AS distance
             FROM 
-                htmx_examples e
+                htmx_embeddings emb
             JOIN 
-                htmx_embeddings emb ON e.id = emb.id
+                htmx_examples e ON e.id = emb.id
             WHERE 
+                $1 IS NOT NULL
+            AND
                 ($2 IS NULL OR e.category = $2)
             AND
                 ($3 IS NULL OR e.complexity_level = $3)
+            ORDER BY 
+                emb.%1$I <=> $1
+            LIMIT $7
         ),
-        combined_results AS (
-            SELECT
-                e.id,
-                e.title,
-                e.category,
-                e.url,
-                e.description,
-                e.html_snippets,
-                e.javascript_snippets,
-                e.key_concepts,
-                e.htmx_attributes,
-                e.demo_explanation,
-                e.complexity_level,
-                e.use_cases,
-                COALESCE(cr.similarity * 0.4, 0) + 
-                COALESCE(tr.similarity * 0.2, 0) + 
-                COALESCE(dr.similarity * 0.2, 0) + 
-                COALESCE(kr.similarity * 0.2, 0) AS combined_similarity,
-                cr.similarity AS content_similarity,
-                tr.similarity AS title_similarity,
-                dr.similarity AS description_similarity,
-                kr.similarity AS key_concepts_similarity
+        semantic AS (
+            SELECT 
+                n.id,
+                row_number() OVER (ORDER BY n.distance, n.id) AS rank
             FROM 
-                htmx_examples e
-            LEFT JOIN content_results cr ON e.id = cr.id
-            LEFT JOIN title_results tr ON e.id = tr.id
-            LEFT JOIN description_results dr ON e.id = dr.id
-            LEFT JOIN key_concepts_results kr ON e.id = kr.id
-            WHERE
-                ($2 IS NULL OR e.category = $2)
-            AND
-                ($3 IS NULL OR e.complexity_level = $3)
+                nearest n
+        ),
+        fused AS (
+            SELECT 
+                COALESCE(l.id, s.id) AS id,
+                l.rank AS lexical_rank,
+                s.rank AS vector_rank,
+                COALESCE(1.0 / ($8 + l.rank), 0) + COALESCE(1.0 / ($8 + s.rank), 0) AS hybrid_score
+            FROM 
+                lexical l
+            FULL OUTER JOIN 
+                semantic s ON s.id = l.id
+            ORDER BY 
+                hybrid_score DESC, id
+            LIMIT $4
         )
-        SELECT *
-        FROM combined_results
-        ORDER BY combined_similarity DESC
-        LIMIT $4
-    ')
-    USING query_embedding, category_filter, complexity_filter, result_limit;
+        SELECT 
+            e.id,
+            e.title,
+            e.category,
+            e.url,
+            e.description,
+            e.html_snippets,
+            e.javascript_snippets,
+            e.key_concepts,
+            e.htmx_attributes,
+            e.demo_explanation,
+            e.complexity_level,
+            e.use_cases,
+            (1 - (emb.%1$I <=> $1))::FLOAT AS similarity,
+            f.lexical_rank::INTEGER,
+            f.vector_rank::INTEGER,
+            f.hybrid_score::FLOAT
+        FROM 
+            fused f
+        JOIN 
+            htmx_examples e ON e.id = f.id
+        LEFT JOIN 
+            htmx_embeddings emb ON emb.id = f.id
+        ORDER BY 
+            f.hybrid_score DESC, f.id
+    ', embedding_column)
+    USING query_embedding, category_filter, complexity_filter, result_limit,
+          text_query, query_attributes, GREATEST(candidate_limit, result_limit), rrf_k;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Multi-embedding search function that searches across multiple embedding types
+-- and combines the results with a weighted ranking.
+-- The top candidates for each embedding type are fetched first (so each branch can
+-- use an ANN index on its column), and only the union of those candidates is scored.
+-- The wide example columns are joined for the final top results only.
+DROP FUNCTION IF EXISTS api.multi_vector_search(VECTOR, INTEGER, TEXT, TEXT);
+
+CREATE OR REPLACE FUNCTION api.multi_vector_search(
+    query_embedding VECTOR,             -- Pre-embedded query vector
+    result_limit INTEGER DEFAULT 5,     -- Maximum number of results to return
+    category_filter TEXT DEFAULT NULL,  -- Optional filter by category
+    complexity_filter TEXT DEFAULT NULL, -- Optional filter by complexity level
+    content_weight FLOAT DEFAULT 0.4,   -- Weight of the content similarity
+    title_weight FLOAT DEFAULT 0.2,     -- Weight of the title similarity
+    description_weight FLOAT DEFAULT 0.2, -- Weight of the description similarity
+    key_concepts_weight FLOAT DEFAULT 0.2, -- Weight of the key concepts similarity
+    candidate_limit INTEGER DEFAULT 50  -- Candidates fetched per embedding type before scoring
+) RETURNS TABLE (
+    id TEXT,
+    title TEXT,
+    category TEXT,
+    url TEXT,
+    description TEXT,
+    html_snippets JSONB,
+    javascript_snippets JSONB,
+    key_concepts TEXT[],
+    htmx_attributes TEXT[],
+    demo_explanation TEXT,
+    complexity_level TEXT,
+    use_cases TEXT[],
+    similarity FLOAT,                 -- Combined similarity score
+    content_similarity FLOAT,         -- Individual similarity scores for transparency
+    title_similarity FLOAT,
+    description_similarity FLOAT,
+    key_concepts_similarity FLOAT
+) AS $$
+BEGIN
+    IF LEAST(content_weight, title_weight, description_weight, key_concepts_weight) < 0 THEN
+        RAISE EXCEPTION 'Embedding weights must not be negative';
+    END IF;
+
+    IF content_weight + title_weight + description_weight + key_concepts_weight = 0 THEN
+        RAISE EXCEPTION 'At least one embedding weight must be positive';
+    END IF;
+
+    -- Embedding types with a zero weight are skipped entirely: their branch has a
+    -- constant false condition, so the planner never scans that column
+    RETURN QUERY EXECUTE '
+        WITH candidates AS (
+            (
+                SELECT emb.id
+                FROM htmx_embeddings emb
+                JOIN htmx_examples e ON e.id = emb.id
+                WHERE $5 > 0
+                AND ($2 IS NULL OR e.category = $2)
+                AND ($3 IS NULL OR e.complexity_level = $3)
+                ORDER BY emb.content_embedding <=> $1
+                LIMIT $9
+            )
+            UNION
+            (
+                SELECT emb.id
+                FROM htmx_embeddings emb
+                JOIN htmx_examples e ON e.id = emb.id
+                WHERE $6 > 0
+                AND ($2 IS NULL OR e.category = $2)
+                AND ($3 IS NULL OR e.complexity_level = $3)
+                ORDER BY emb.title_embedding <=> $1
+                LIMIT $9
+            )
+            UNION
+            (
+                SELECT emb.id
+                FROM htmx_embeddings emb
+                JOIN htmx_examples e ON e.id = emb.id
+                WHERE $7 > 0
+                AND ($2 IS NULL OR e.category = $2)
+                AND ($3 IS NULL OR e.complexity_level = $3)
+                ORDER BY emb.description_embedding <=> $1
+                LIMIT $9
+            )
+            UNION
+            (
+                SELECT emb.id
+                FROM htmx_embeddings emb
+                JOIN htmx_examples e ON e.id = emb.id
+                WHERE $8 > 0
+                AND ($2 IS NULL OR e.category = $2)
+                AND ($3 IS NULL OR e.complexity_level = $3)
+                ORDER BY emb.key_concepts_embedding <=> $1
+                LIMIT $9
+            )
+        ),
+        scored AS (
+            SELECT
+                emb.id,
+                (1 - (emb.content_embedding <=> $1))::FLOAT AS content_similarity,
+                (1 - (emb.title_embedding <=> $1))::FLOAT AS title_similarity,
+                (1 - (emb.description_embedding <=> $1))::FLOAT AS description_similarity,
+                (1 - (emb.key_concepts_embedding <=> $1))::FLOAT AS key_concepts_similarity
+            FROM
+                candidates c
+            JOIN
+                htmx_embeddings emb ON emb.id = c.id
+        ),
+        ranked AS (
+            -- Rank the scored candidates before touching the wide example columns
+            SELECT
+                s.*,
+                (COALESCE(s.content_similarity * $5, 0) +
+                 COALESCE(s.title_similarity * $6, 0) +
+                 COALESCE(s.description_similarity * $7, 0) +
+                 COALESCE(s.key_concepts_similarity * $8, 0))::FLOAT AS similarity
+            FROM
+                scored s
+            ORDER BY similarity DESC
+            LIMIT $4
+        )
+        SELECT
+            e.id,
+            e.title,
+            e.category,
+            e.url,
+            e.description,
+            e.html_snippets,
+            e.javascript_snippets,
+            e.key_concepts,
+            e.htmx_attributes,
+            e.demo_explanation,
+            e.complexity_level,
+            e.use_cases,
+            r.similarity,
+            r.content_similarity,
+            r.title_similarity,
+            r.description_similarity,
+            r.key_concepts_similarity
+        FROM
+            ranked r
+        JOIN
+            htmx_examples e ON e.id = r.id
+        ORDER BY r.similarity DESC
+    '
+    USING query_embedding, category_filter, complexity_filter, result_limit,
+          content_weight, title_weight, description_weight, key_concepts_weight,
+          GREATEST(candidate_limit, result_limit);
 END;
 $$ LANGUAGE plpgsql;
 
 -- Function to find similar examples to an existing example
--- This doesn't regenerate embeddings on every call, making it more efficient
+-- This doesn't regenerate embeddings on every call, making it more efficient.
+-- When the precomputed neighbour graph (build_neighbor_graph.py) is fresh and
+-- covers the request, the results are read from htmx_neighbors with a primary
+-- key probe; otherwise the reference vector is compared against every row.
 CREATE OR REPLACE FUNCTION api.find_similar_examples(
     example_id TEXT,                    -- Example ID to find similar examples to
     embedding_type TEXT DEFAULT 'content', -- Type of embedding to use
@@ -218,6 +551,12 @@ CREATE OR REPLACE FUNCTION api.find_similar_examples(
 DECLARE
     reference_embedding VECTOR;
     embedding_column TEXT;
+    graph_type TEXT;
+    graph_k INTEGER;
+    graph_rows INTEGER;
+    graph_built_at TIMESTAMP WITH TIME ZONE;
+    listed INTEGER;
+    matched INTEGER;
 BEGIN
     -- Determine which embedding column to use
     CASE embedding_type
@@ -226,6 +565,66 @@ BEGIN
         WHEN 'key_concepts' THEN embedding_column := 'key_concepts_embedding';
         ELSE embedding_column := 'content_embedding';
     END CASE;
+    graph_type := replace(embedding_column, '_embedding', '');
+    
+    -- The graph is used when it holds at least result_limit neighbours per row,
+    -- no embedding changed since it was built, and either enough neighbours pass
+    -- the filters or each list holds every other example
+    IF to_regclass('htmx_neighbor_state') IS NOT NULL THEN
+        SELECT s.k, s.row_count, s.built_at
+        INTO graph_k, graph_rows, graph_built_at
+        FROM htmx_neighbor_state s
+        WHERE s.embedding_type = graph_type;
+        
+        IF graph_k >= result_limit AND NOT EXISTS (
+            SELECT 1 FROM htmx_embeddings emb WHERE emb.updated_at > graph_built_at
+        ) THEN
+            SELECT
+                count(*),
+                count(*) FILTER (
+                    WHERE (category_filter IS NULL OR e.category = category_filter)
+                    AND (complexity_filter IS NULL OR e.complexity_level = complexity_filter)
+                )
+            INTO listed, matched
+            FROM htmx_neighbors n
+            JOIN htmx_examples e ON e.id = n.neighbor_id
+            WHERE n.id = example_id AND n.embedding_type = graph_type;
+            
+            IF listed > 0 AND (matched >= result_limit OR graph_k >= graph_rows - 1) THEN
+                RETURN QUERY
+                SELECT 
+                    e.id,
+                    e.title,
+                    e.category,
+                    e.url,
+                    e.description,
+                    e.html_snippets,
+                    e.javascript_snippets,
+                    e.key_concepts,
+                    e.htmx_attributes,
+                    e.demo_explanation,
+                    e.complexity_level,
+                    e.use_cases,
+                    n.similarity
+                FROM 
+                    htmx_neighbors n
+                JOIN 
+                    htmx_examples e ON e.id = n.neighbor_id
+                WHERE 
+                    n.id = example_id
+                AND
+                    n.embedding_type = graph_type
+                AND
+                    (category_filter IS NULL OR e.category = category_filter)
+                AND
+                    (complexity_filter IS NULL OR e.complexity_level = complexity_filter)
+                ORDER BY 
+                    n.rank
+                LIMIT result_limit;
+                RETURN;
+            END IF;
+        END IF;
+    END IF;
     
     -- Get the embedding from the example
     EXECUTE format('
@@ -242,8 +641,27 @@ BEGIN
         RETURN;
     END IF;
     
-    -- Return similar examples, excluding the reference example itself
+    -- Return similar examples, excluding the reference example itself.
+    -- As in vector_search, only the top results are joined to the wide columns.
     RETURN QUERY EXECUTE format('
+        WITH ranked AS (
+            SELECT 
+                emb.id,
+                emb.%I <=> $1 AS distance
+            FROM 
+                htmx_embeddings emb
+            JOIN 
+                htmx_examples e ON e.id = emb.id
+            WHERE 
+                e.id != $2
+            AND
+                ($3 IS NULL OR e.category = $3)
+            AND
+                ($4 IS NULL OR e.complexity_level = $4)
+            ORDER BY 
+                emb.%I <=> $1
+            LIMIT $5
+        )
         SELECT 
             e.id,
             e.title,
@@ -257,20 +675,13 @@ BEGIN
             e.demo_explanation,
             e.complexity_level,
             e.use_cases,
-            (1 - (emb.%I <=> $1))::FLOAT AS similarity
+            (1 - r.distance)::FLOAT AS similarity
         FROM 
-            htmx_examples e
+            ranked r
         JOIN 
-            htmx_embeddings emb ON e.id = emb.id
-        WHERE 
-            e.id != $2
-        AND
-            ($3 IS NULL OR e.category = $3)
-        AND
-            ($4 IS NULL OR e.complexity_level = $4)
+            htmx_examples e ON e.id = r.id
         ORDER BY 
-            emb.%I <=> $1
-        LIMIT $5
+            r.distance
     ', embedding_column, embedding_column)
     USING reference_embedding, example_id, category_filter, complexity_filter, result_limit;
 END;
@@ -278,5 +689,7 @@ $$ LANGUAGE plpgsql;
 
 -- Grant execute permissions to the web_anon role
 GRANT EXECUTE ON FUNCTION api.vector_search TO web_anon;
+GRANT EXECUTE ON FUNCTION api.quantized_vector_search TO web_anon;
+GRANT EXECUTE ON FUNCTION api.hybrid_search TO web_anon;
 GRANT EXECUTE ON FUNCTION api.multi_vector_search TO web_anon;
 GRANT EXECUTE ON FUNCTION api.find_similar_examples TO web_anon; 
\ No newline at end of file
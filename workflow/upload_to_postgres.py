@@ -11,13 +11,22 @@ import argparse
 import json
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
 import psycopg
 from dotenv import load_dotenv
 
 
+# Columns of htmx_examples populated from the example JSON files
+EXAMPLE_COLUMNS = [
+    "id", "title", "category", "url", "description", "html_snippets", "javascript_snippets",
+    "key_concepts", "htmx_attributes", "demo_explanation", "complexity_level", "use_cases",
+]
+
+
 def parse_args() -> argparse.Namespace:
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description="Upload HTMX examples to PostgreSQL database")
@@ -33,6 +42,17 @@ def parse_args() -> argparse.Namespace:
         default=".env",
         help="Environment file path (default: .env)",
     )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Parse files in parallel and load them with COPY in a single transaction",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of processes used to parse example files in bulk mode (default: CPU count)",
+    )
     parser.add_argument(
         "--verbose", "-v",
         action="store_true",
@@ -109,21 +129,89 @@ def load_example(file_path: Path) -> Dict[str, Any]:
         return None
 
 
+def example_to_row(example: Dict[str, Any]) -> Tuple:
+    """Convert an example into a row of values ordered like EXAMPLE_COLUMNS."""
+    return (
+        example.get("id", ""),
+        example.get("title", ""),
+        example.get("category", ""),
+        example.get("url", ""),
+        example.get("description", ""),
+        json.dumps(example.get("html_snippets", [])),
+        json.dumps(example.get("javascript_snippets", [])),
+        example.get("key_concepts", []),
+        example.get("htmx_attributes", []),
+        example.get("demo_explanation", ""),
+        example.get("complexity_level", "beginner"),
+        example.get("use_cases", []),
+    )
+
+
+def load_examples_parallel(file_paths: List[Path], workers: int) -> List[Optional[Dict[str, Any]]]:
+    """Load example files in parallel worker processes, preserving file order."""
+    if workers <= 1 or len(file_paths) <= 1:
+        return [load_example(file_path) for file_path in file_paths]
+    
+    chunksize = max(1, len(file_paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(load_example, file_paths, chunksize=chunksize))
+
+
+def bulk_import_examples(conn: psycopg.Connection, examples: List[Dict[str, Any]], verbose: bool) -> int:
+    """
+    Import examples with COPY into a staging table, then merge into htmx_examples.
+    
+    The whole load runs in one transaction, so either every example is imported
+    or none is. Returns the number of rows merged.
+    """
+    columns = ", ".join(EXAMPLE_COLUMNS)
+    updates = ",\n                    ".join(
+        f"{column} = EXCLUDED.{column}" for column in EXAMPLE_COLUMNS if column != "id"
+    )
+    
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "CREATE TEMP TABLE htmx_examples_staging "
+                "(LIKE htmx_examples INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            
+            # Stream all rows to the server in a single COPY
+            with cur.copy(f"COPY htmx_examples_staging ({columns}) FROM STDIN") as copy:
+                for example in examples:
+                    copy.write_row(example_to_row(example))
+            
+            # Merge staged rows, keeping one row per id
+            cur.execute(
+                f"""
+                INSERT INTO htmx_examples ({columns})
+                SELECT DISTINCT ON (id) {columns}
+                FROM htmx_examples_staging
+                ORDER BY id
+                ON CONFLICT (id) DO UPDATE SET
+                    {updates},
+                    updated_at = CURRENT_TIMESTAMP
+                """
+            )
+            merged_count = cur.rowcount
+            conn.commit()
+        
+        if verbose:
+            for example in examples:
+                print(f"Imported example: {example.get('title', '')}")
+        
+        return merged_count
+    except Exception as e:
+        conn.rollback()
+        print(f"Error bulk importing examples: {e}")
+        return 0
+
+
 def import_example(conn: psycopg.Connection, example: Dict[str, Any], verbose: bool) -> Optional[str]:
     """Import example into database."""
     # Extract fields from example
     example_id = example.get("id", "")
     title = example.get("title", "")
-    category = example.get("category", "")
-    url = example.get("url", "")
-    description = example.get("description", "")
-    html_snippets = json.dumps(example.get("html_snippets", []))
-    javascript_snippets = json.dumps(example.get("javascript_snippets", []))
-    key_concepts = example.get("key_concepts", [])
-    htmx_attributes = example.get("htmx_attributes", [])
-    demo_explanation = example.get("demo_explanation", "")
-    complexity_level = example.get("complexity_level", "beginner")
-    use_cases = example.get("use_cases", [])
     
     # Insert example into database
     try:
@@ -148,10 +236,7 @@ def import_example(conn: psycopg.Connection, example: Dict[str, Any], verbose: b
                     use_cases = EXCLUDED.use_cases,
                     updated_at = CURRENT_TIMESTAMP
                 """,
-                (
-                    example_id, title, category, url, description, html_snippets, javascript_snippets,
-                    key_concepts, htmx_attributes, demo_explanation, complexity_level, use_cases
-                ),
+                example_to_row(example),
             )
             conn.commit()
             
@@ -189,35 +274,55 @@ def main():
     imported_count = 0
     skipped_count = 0
     error_count = 0
+    start_time = time.perf_counter()
     
+    # Skip examples that already exist
+    existing_ids = set(existing_examples)
+    new_files = []
     for file_path in example_files:
         example_id = file_path.stem
-        
-        # Skip if example already exists
-        if example_id in existing_examples:
+        if example_id in existing_ids:
             if args.verbose:
                 print(f"Skipping existing example: {example_id}")
             skipped_count += 1
             continue
+        new_files.append(file_path)
+    
+    if args.bulk:
+        # Parse files in parallel, then load everything with one COPY
+        examples = load_examples_parallel(new_files, args.workers)
+        valid_examples = [example for example in examples if example]
+        error_count += len(examples) - len(valid_examples)
         
-        # Load example
-        example = load_example(file_path)
-        if not example:
-            error_count += 1
-            continue
-        
-        # Import example
-        result_id = import_example(conn, example, args.verbose)
-        if result_id:
-            imported_count += 1
-        else:
-            error_count += 1
+        if valid_examples:
+            imported_count = bulk_import_examples(conn, valid_examples, args.verbose)
+            if imported_count == 0:
+                error_count += len(valid_examples)
+    else:
+        for file_path in new_files:
+            # Load example
+            example = load_example(file_path)
+            if not example:
+                error_count += 1
+                continue
+            
+            # Import example
+            result_id = import_example(conn, example, args.verbose)
+            if result_id:
+                imported_count += 1
+            else:
+                error_count += 1
+    
+    elapsed = time.perf_counter() - start_time
+    rows_per_second = imported_count / elapsed if elapsed > 0 else 0.0
     
     # Print summary
     print("\nImport summary:")
+    print(f"  - Mode: {'bulk COPY' if args.bulk else 'row by row'}")
     print(f"  - Imported: {imported_count}")
     print(f"  - Skipped: {skipped_count}")
     print(f"  - Errors: {error_count}")
+    print(f"  - Elapsed: {elapsed:.2f}s ({rows_per_second:.1f} rows/s)")
     print(f"  - Total examples in database: {len(existing_examples) + imported_count}")
     
     # List all examples in database
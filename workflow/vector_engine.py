@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+In-process vector search over an embedding snapshot written by vector_snapshot.py.
+
+VectorSearchEngine answers the same queries as the api.vector_search,
+api.multi_vector_search and api.find_similar_examples SQL functions, returning
+rows in the same shape, but computes cosine similarity with NumPy matrix
+products over memory-mapped float32 matrices instead of querying PostgreSQL.
+
+Only rows that have a (non-zero) embedding of the searched type are ranked.
+When fewer than result_limit rows do, the SQL functions pad the result with
+rows whose similarity is NULL, in no defined order; the engine returns just
+the ranked rows. The rows both return otherwise match, scores included.
+"""
+
+import logging
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from vector_snapshot import load_snapshot, EMBEDDING_TYPES, EXAMPLE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEIGHTS = {"content": 0.4, "title": 0.2, "description": 0.2, "key_concepts": 0.2}
+DEFAULT_CANDIDATE_LIMIT = 50
+
+class VectorSearchEngine:
+    """Exact cosine similarity search over a snapshot of the four embedding columns."""
+
+    def __init__(self, snapshot_dir: str, mmap: bool = True):
+        snapshot = load_snapshot(snapshot_dir, mmap=mmap)
+        self.manifest = snapshot["manifest"]
+        self.matrices: Dict[str, np.ndarray] = snapshot["matrices"]
+        self.examples: List[Dict[str, Any]] = snapshot["examples"]
+        self.index_by_id = {example["id"]: i for i, example in enumerate(self.examples)}
+
+        # Rows without an embedding of a given type never match on that type
+        self.present = {
+            embedding_type: snapshot["present"][:, i]
+            for i, embedding_type in enumerate(self.manifest["embedding_types"])
+        }
+
+        # Norms are computed once so a query only needs one matrix product per type
+        self.norms = {
+            embedding_type: np.linalg.norm(matrix, axis=1).astype(np.float32)
+            for embedding_type, matrix in self.matrices.items()
+        }
+
+        # Precompute a boolean mask per filter value
+        self.category_masks = self._build_masks("category")
+        self.complexity_masks = self._build_masks("complexity_level")
+
+    def _build_masks(self, field: str) -> Dict[str, np.ndarray]:
+        values = np.array([example.get(field) or "" for example in self.examples], dtype=object)
+        return {value: values == value for value in set(values) if value}
+
+    def _filter_mask(self, category_filter: Optional[str], complexity_filter: Optional[str]) -> np.ndarray:
+        """Combine the precomputed category and complexity masks, like the SQL WHERE clauses."""
+        mask = np.ones(len(self.examples), dtype=bool)
+        none = np.zeros(len(self.examples), dtype=bool)
+        if category_filter is not None:
+            mask &= self.category_masks.get(category_filter, none)
+        if complexity_filter is not None:
+            mask &= self.complexity_masks.get(complexity_filter, none)
+        return mask
+
+    @staticmethod
+    def _resolve_type(embedding_type: str) -> str:
+        # Mirror the SQL functions, which fall back to the content embedding
+        return embedding_type if embedding_type in EMBEDDING_TYPES else "content"
+
+    def similarities(self, embedding_type: str, queries: np.ndarray) -> np.ndarray:
+        """
+        Cosine similarity of each query against every row, as a (queries, rows) matrix.
+
+        Rows without an embedding of this type get NaN.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = (queries @ self.matrices[embedding_type].T) / (query_norms * self.norms[embedding_type])
+        scores[:, ~self.present[embedding_type]] = np.nan
+        return scores
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, mask: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k highest scores among masked rows, best first."""
+        scores = np.where(mask & ~np.isnan(scores), scores, -np.inf)
+        candidates = np.flatnonzero(scores > -np.inf)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    def _result(self, index: int, **scores: Optional[float]) -> Dict[str, Any]:
+        example = self.examples[index]
+        result = {field: example[field] for field in EXAMPLE_FIELDS}
+        for name, score in scores.items():
+            result[name] = None if score is None or np.isnan(score) else float(score)
+        return result
+
+    def vector_search_many(
+        self,
+        query_embeddings: np.ndarray,
+        embedding_type: str = "content",
+        result_limit: int = 5,
+        category_filter: Optional[str] = None,
+        complexity_filter: Optional[str] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Run vector_search for several query embeddings with a single matrix product."""
+        embedding_type = self._resolve_type(embedding_type)
+        mask = self._filter_mask(category_filter, complexity_filter)
+        scores = self.similarities(embedding_type, query_embeddings)
+        return [
+            [self._result(i, similarity=row[i]) for i in self._top_k(row, mask, result_limit)]
+            for row in scores
+        ]
+
+    def vector_search(
+        self,
+        query_embedding: np.ndarray,
+        embedding_type: str = "content",
+        result_limit: int = 5,
+        category_filter: Optional[str] = None,
+        complexity_filter: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Equivalent of api.vector_search."""
+        return self.vector_search_many(
+            query_embedding, embedding_type, result_limit, category_filter, complexity_filter
+        )[0]
+
+    def multi_vector_search(
+        self,
+        query_embedding: np.ndarray,
+        result_limit: int = 5,
+        category_filter: Optional[str] = None,
+        complexity_filter: Optional[str] = None,
+        weights: Optional[Dict[str, float]] = None,
+        candidate_limit: int = DEFAULT_CANDIDATE_LIMIT
+    ) -> List[Dict[str, Any]]:
+        """
+        Equivalent of api.multi_vector_search.
+
+        Takes the top candidates per embedding type with a positive weight, then
+        ranks their union by the weighted sum of similarities.
+        """
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        if any(weight < 0 for weight in weights.values()):
+            raise ValueError("Embedding weights must not be negative")
+        if sum(weights.values()) == 0:
+            raise ValueError("At least one embedding weight must be positive")
+
+        mask = self._filter_mask(category_filter, complexity_filter)
+        candidate_limit = max(candidate_limit, result_limit)
+        scores = {
+            embedding_type: self.similarities(embedding_type, query_embedding)[0]
+            for embedding_type in EMBEDDING_TYPES
+        }
+
+        candidates = set()
+        for embedding_type in EMBEDDING_TYPES:
+            if weights[embedding_type] > 0:
+                candidates.update(self._top_k(scores[embedding_type], mask, candidate_limit).tolist())
+        candidates = np.array(sorted(candidates), dtype=np.int64)
+
+        combined = np.zeros(len(candidates), dtype=np.float64)
+        for embedding_type in EMBEDDING_TYPES:
+            # Missing similarities count as 0, like COALESCE in the SQL function
+            combined += np.nan_to_num(scores[embedding_type][candidates], nan=0.0) * weights[embedding_type]
+
+        order = np.argsort(-combined, kind="stable")[:result_limit]
+        return [
+            self._result(
+                candidates[i],
+                similarity=combined[i],
+                **{f"{t}_similarity": scores[t][candidates[i]] for t in EMBEDDING_TYPES}
+            )
+            for i in order
+        ]
+
+    def find_similar_examples(
+        self,
+        example_id: str,
+        embedding_type: str = "content",
+        result_limit: int = 5,
+        category_filter: Optional[str] = None,
+        complexity_filter: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Equivalent of api.find_similar_examples, excluding the reference example itself."""
+        embedding_type = self._resolve_type(embedding_type)
+        index = self.index_by_id.get(example_id)
+        if index is None or not self.present[embedding_type][index]:
+            logger.info(f"No embedding found for example ID: {example_id}")
+            return []
+
+        mask = self._filter_mask(category_filter, complexity_filter)
+        mask[index] = False
+        scores = self.similarities(embedding_type, self.matrices[embedding_type][index])[0]
+        return [self._result(i, similarity=scores[i]) for i in self._top_k(scores, mask, result_limit)]
@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+Export the HTMX examples and their embeddings to an on-disk snapshot, and import
+a snapshot into another database without calling the embedding API again.
+
+A snapshot is a directory containing:
+- manifest.json: format version, model dimension, row count, embedding types and
+  the size and SHA-256 checksum of every other file
+- {type}.npy: one float32 matrix per embedding type, rows in snapshot order
+- present.npy: boolean matrix marking which rows have each embedding type
+- examples.json: the full htmx_examples rows, in the same order
+- embeddings.json: per-row htmx_embeddings metadata (source hashes, timestamps)
+
+The .npy files are plain NumPy arrays, so they can be memory-mapped and their
+pages shared between every process that loads the same snapshot (see
+vector_engine.py). Import verifies every checksum, then bulk-loads the rows with
+COPY in a single transaction.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import logging
+from pathlib import Path
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+try:
+    # Import required libraries
+    from dotenv import load_dotenv
+    import numpy as np
+    import psycopg
+    from psycopg.rows import dict_row
+    from pgvector.psycopg import register_vector
+except ImportError as e:
+    logger.error(f"Missing required packages. Please run: uv add psycopg python-dotenv numpy pgvector")
+    sys.exit(1)
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Database connection parameters
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+DB_USER = os.getenv("DB_USER")
+DB_PASS = os.getenv("DB_PASS")
+DB_NAME = os.getenv("DB_NAME")
+
+SNAPSHOT_FORMAT = "htmx-vector-snapshot"
+SNAPSHOT_VERSION = 2
+DEFAULT_SNAPSHOT_PATH = os.getenv("VECTOR_SNAPSHOT_PATH", ".cache/vector_snapshot")
+EMBEDDING_TYPES = ["content", "title", "description", "key_concepts"]
+
+# Example fields returned by the api.* search functions
+EXAMPLE_FIELDS = [
+    "id", "title", "category", "url", "description", "html_snippets", "javascript_snippets",
+    "key_concepts", "htmx_attributes", "demo_explanation", "complexity_level", "use_cases"
+]
+EXAMPLE_COLUMNS = EXAMPLE_FIELDS + ["created_at", "updated_at"]
+SOURCE_HASH_COLUMNS = [f"{embedding_type}_source_hash" for embedding_type in EMBEDDING_TYPES]
+
+def connect_to_db() -> psycopg.Connection:
+    """Connect to the PostgreSQL database using environment variables."""
+    try:
+        # Check if all required environment variables are set
+        required_env_vars = ["DB_HOST", "DB_PORT", "DB_USER", "DB_PASS", "DB_NAME"]
+        missing_vars = [var for var in required_env_vars if not os.getenv(var)]
+
+        if missing_vars:
+            raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
+
+        # Connect to the database
+        conn_string = f"host={DB_HOST} port={DB_PORT} dbname={DB_NAME} user={DB_USER} password={DB_PASS}"
+        conn = psycopg.connect(conn_string)
+        register_vector(conn)
+
+        logger.info(f"Successfully connected to database: {DB_NAME} on {DB_HOST}")
+        return conn
+    except Exception as e:
+        logger.error(f"Error connecting to database: {e}")
+        raise
+
+def detect_dimension(conn: psycopg.Connection) -> int:
+    """Return the dimension of the stored embeddings."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT vector_dims(COALESCE(content_embedding, title_embedding, description_embedding, key_concepts_embedding))
+            FROM htmx_embeddings
+            WHERE COALESCE(content_embedding, title_embedding, description_embedding, key_concepts_embedding) IS NOT NULL
+            LIMIT 1
+        """)
+        row = cur.fetchone()
+    if not row:
+        raise ValueError("No embeddings found in htmx_embeddings")
+    return row[0]
+
+def file_sha256(path: Path) -> str:
+    """Compute the SHA-256 checksum of a file without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def existing_columns(conn: psycopg.Connection, table: str) -> List[str]:
+    """Return the column names of a table in the public schema."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_schema = 'public' AND table_name = %s",
+            (table,)
+        )
+        return [row[0] for row in cur.fetchall()]
+
+def export_snapshot(conn: psycopg.Connection, output_dir: str, fetch_size: int = 500) -> Dict[str, Any]:
+    """
+    Write all examples and their embeddings to a snapshot directory.
+
+    Rows are streamed with a server-side cursor and written straight into
+    memory-mapped .npy files, so the corpus never has to fit in memory twice.
+    The export runs in one REPEATABLE READ transaction to get a consistent view.
+    """
+    try:
+        output = Path(output_dir)
+        output.mkdir(parents=True, exist_ok=True)
+
+        # The manifest is written last, so a partially written snapshot is never loadable
+        (output / "manifest.json").unlink(missing_ok=True)
+
+        conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+        with conn.transaction():
+            dimension = detect_dimension(conn)
+            count = conn.execute("SELECT COUNT(*) FROM htmx_examples").fetchone()[0]
+
+            matrices = {
+                embedding_type: np.lib.format.open_memmap(
+                    output / f"{embedding_type}.npy", mode="w+", dtype=np.float32, shape=(count, dimension)
+                )
+                for embedding_type in EMBEDDING_TYPES
+            }
+            present = np.zeros((count, len(EMBEDDING_TYPES)), dtype=bool)
+            examples = []
+            embeddings = []
+
+            # Databases embedded before source hashes were tracked don't have those columns
+            embedding_columns = existing_columns(conn, "htmx_embeddings")
+            hash_columns = ", ".join(
+                f"emb.{column}" if column in embedding_columns else f"NULL::text AS {column}"
+                for column in SOURCE_HASH_COLUMNS
+            )
+            columns = ", ".join(f"e.{column}" for column in EXAMPLE_COLUMNS)
+            vector_columns = ", ".join(f"emb.{embedding_type}_embedding" for embedding_type in EMBEDDING_TYPES)
+            with conn.cursor(name="vector_snapshot_export", row_factory=dict_row) as cur:
+                cur.execute(f"""
+                    SELECT {columns}, {vector_columns}, {hash_columns},
+                        emb.id IS NOT NULL AS has_embeddings,
+                        emb.created_at AS embeddings_created_at,
+                        emb.updated_at AS embeddings_updated_at
+                    FROM htmx_examples e
+                    LEFT JOIN htmx_embeddings emb ON e.id = emb.id
+                    ORDER BY e.id
+                """)
+                row_index = 0
+                while rows := cur.fetchmany(fetch_size):
+                    for row in rows:
+                        for type_index, embedding_type in enumerate(EMBEDDING_TYPES):
+                            vector = row.pop(f"{embedding_type}_embedding")
+                            if vector is not None:
+                                matrices[embedding_type][row_index] = vector.to_numpy()
+                                present[row_index, type_index] = True
+
+                        # Keep the embeddings row metadata separate from the example record
+                        embedding_row = None
+                        if row.pop("has_embeddings"):
+                            embedding_row = {column: row[column] for column in SOURCE_HASH_COLUMNS}
+                            embedding_row["created_at"] = row["embeddings_created_at"]
+                            embedding_row["updated_at"] = row["embeddings_updated_at"]
+                        for column in SOURCE_HASH_COLUMNS + ["embeddings_created_at", "embeddings_updated_at"]:
+                            del row[column]
+
+                        examples.append(row)
+                        embeddings.append(embedding_row)
+                        row_index += 1
+
+        for matrix in matrices.values():
+            matrix.flush()
+        np.save(output / "present.npy", present)
+        with open(output / "examples.json", "w") as f:
+            json.dump(examples, f, default=str)
+        with open(output / "embeddings.json", "w") as f:
+            json.dump(embeddings, f, default=str)
+
+        data_files = [f"{embedding_type}.npy" for embedding_type in EMBEDDING_TYPES]
+        data_files += ["present.npy", "examples.json", "embeddings.json"]
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "count": count,
+            "dimension": dimension,
+            "embedding_types": EMBEDDING_TYPES,
+            "files": {
+                name: {"bytes": (output / name).stat().st_size, "sha256": file_sha256(output / name)}
+                for name in data_files
+            },
+        }
+        with open(output / "manifest.json", "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        logger.info(f"Exported {count} examples ({dimension}-dimensional embeddings) to {output}")
+        return manifest
+    except Exception as e:
+        logger.error(f"Error exporting snapshot: {e}")
+        raise
+
+def read_manifest(snapshot_dir: str) -> Dict[str, Any]:
+    """Read and validate a snapshot manifest."""
+    with open(Path(snapshot_dir) / "manifest.json") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"{snapshot_dir} is not a vector snapshot")
+    if manifest.get("version", 0) > SNAPSHOT_VERSION:
+        raise ValueError(f"Snapshot version {manifest['version']} is newer than supported version {SNAPSHOT_VERSION}")
+    return manifest
+
+def verify_snapshot(snapshot_dir: str) -> Dict[str, Any]:
+    """Check the size and checksum of every snapshot file against the manifest."""
+    manifest = read_manifest(snapshot_dir)
+    if "files" not in manifest:
+        raise ValueError(f"Snapshot {snapshot_dir} has no checksums (version {manifest['version']}); re-export it")
+
+    for name, expected in manifest["files"].items():
+        path = Path(snapshot_dir) / name
+        if not path.exists():
+            raise ValueError(f"Snapshot file {name} is missing")
+        if path.stat().st_size != expected["bytes"] or file_sha256(path) != expected["sha256"]:
+            raise ValueError(f"Snapshot file {name} does not match its checksum")
+
+    logger.info(f"Verified {len(manifest['files'])} snapshot files in {snapshot_dir}")
+    return manifest
+
+def load_snapshot(snapshot_dir: str, mmap: bool = True, verify: bool = False) -> Dict[str, Any]:
+    """
+    Load a snapshot, memory-mapping the embedding matrices by default.
+
+    Returns a dict with the manifest, the matrices by embedding type, the
+    presence mask and the example records. Checksums are only verified if
+    requested, since that reads every page that memory-mapping would avoid.
+    """
+    try:
+        snapshot = Path(snapshot_dir)
+        manifest = verify_snapshot(snapshot_dir) if verify else read_manifest(snapshot_dir)
+        mmap_mode = "r" if mmap else None
+        matrices = {
+            embedding_type: np.load(snapshot / f"{embedding_type}.npy", mmap_mode=mmap_mode)
+            for embedding_type in manifest["embedding_types"]
+        }
+        present = np.load(snapshot / "present.npy")
+        with open(snapshot / "examples.json") as f:
+            examples = json.load(f)
+
+        if len(examples) != manifest["count"] or present.shape[0] != manifest["count"]:
+            raise ValueError(f"Snapshot {snapshot_dir} is inconsistent with its manifest")
+
+        logger.info(f"Loaded snapshot of {manifest['count']} examples from {snapshot_dir}")
+        return {"manifest": manifest, "matrices": matrices, "present": present, "examples": examples}
+    except Exception as e:
+        logger.error(f"Error loading snapshot: {e}")
+        raise
+
+def vector_column_dimensions(conn: psycopg.Connection) -> Dict[str, int]:
+    """Return the declared dimension of each embedding column in htmx_embeddings."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT attname, atttypmod
+            FROM pg_attribute
+            WHERE attrelid = 'htmx_embeddings'::regclass AND attname LIKE '%%_embedding' AND NOT attisdropped
+        """)
+        return dict(cur.fetchall())
+
+def quantized_columns(conn: psycopg.Connection) -> List[str]:
+    """Return the quantized embedding columns (e.g. content_embedding_binary) of htmx_embeddings."""
+    prefixes = tuple(f"{embedding_type}_embedding_" for embedding_type in EMBEDDING_TYPES)
+    return [column for column in existing_columns(conn, "htmx_embeddings") if column.startswith(prefixes)]
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+def import_snapshot(conn: psycopg.Connection, snapshot_dir: str, replace: bool = False) -> Dict[str, int]:
+    """
+    Load a snapshot into htmx_examples and htmx_embeddings in one transaction.
+
+    Rows are streamed with COPY into temporary staging tables and merged with
+    INSERT ... ON CONFLICT, so existing rows are updated in place. With replace,
+    both tables (and the neighbour graph) are emptied first so the database
+    matches the snapshot exactly. Either way the neighbour graph state is
+    cleared, so build_neighbor_graph.py does a full rebuild next time.
+    Embeddings are copied in binary format, straight from the float32 matrices.
+    """
+    try:
+        manifest = verify_snapshot(snapshot_dir)
+        if manifest["version"] < 2:
+            raise ValueError(f"Snapshot version {manifest['version']} has no full rows to import; re-export it")
+        snapshot = load_snapshot(snapshot_dir)
+        with open(Path(snapshot_dir) / "embeddings.json") as f:
+            embeddings = json.load(f)
+
+        # Vector columns reject values of a different dimension, so fail early with a clear message
+        dimension = manifest["dimension"]
+        for column, column_dimension in vector_column_dimensions(conn).items():
+            if column_dimension != dimension:
+                raise ValueError(
+                    f"Column htmx_embeddings.{column} has {column_dimension} dimensions but the snapshot has "
+                    f"{dimension}; alter it to vector({dimension}) before importing"
+                )
+
+        example_columns = ", ".join(EXAMPLE_COLUMNS)
+        example_updates = ",\n                    ".join(
+            f"{column} = EXCLUDED.{column}" for column in EXAMPLE_COLUMNS if column != "id"
+        )
+        embedding_column_list = (
+            ["id"] + [f"{embedding_type}_embedding" for embedding_type in EMBEDDING_TYPES]
+            + SOURCE_HASH_COLUMNS + ["created_at", "updated_at"]
+        )
+        embedding_columns = ", ".join(embedding_column_list)
+        embedding_updates = ",\n                    ".join(
+            [f"{column} = EXCLUDED.{column}" for column in embedding_column_list if column != "id"]
+            # Quantized copies written by embed_examples.py --quantize no longer match the
+            # imported vectors; clear them so the next embedding run backfills them
+            + [f"{column} = NULL" for column in quantized_columns(conn)]
+        )
+
+        start_time = time.time()
+        with conn.cursor() as cur:
+            # The neighbour graph tables reference htmx_examples, so they are emptied along with it
+            cur.execute("SELECT to_regclass('htmx_neighbors') IS NOT NULL")
+            has_neighbor_graph = cur.fetchone()[0]
+            if replace:
+                tables = ["htmx_embeddings", "htmx_examples"]
+                if has_neighbor_graph:
+                    tables += ["htmx_neighbors", "htmx_neighbor_state"]
+                cur.execute(f"TRUNCATE {', '.join(tables)}")
+
+            cur.execute(
+                "CREATE TEMP TABLE htmx_examples_staging "
+                "(LIKE htmx_examples INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            with cur.copy(f"COPY htmx_examples_staging ({example_columns}) FROM STDIN") as copy:
+                for example in snapshot["examples"]:
+                    row = [example[column] for column in EXAMPLE_COLUMNS]
+                    row[EXAMPLE_COLUMNS.index("html_snippets")] = json.dumps(example["html_snippets"])
+                    row[EXAMPLE_COLUMNS.index("javascript_snippets")] = json.dumps(example["javascript_snippets"])
+                    copy.write_row(row)
+
+            cur.execute(f"""
+                INSERT INTO htmx_examples ({example_columns})
+                SELECT {example_columns} FROM htmx_examples_staging
+                ON CONFLICT (id) DO UPDATE SET
+                    {example_updates}
+            """)
+            example_count = cur.rowcount
+
+            cur.execute(
+                "CREATE TEMP TABLE htmx_embeddings_staging "
+                "(LIKE htmx_embeddings INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            embedding_count = 0
+            with cur.copy(f"COPY htmx_embeddings_staging ({embedding_columns}) FROM STDIN (FORMAT BINARY)") as copy:
+                copy.set_types(
+                    ["text"] + ["vector"] * len(EMBEDDING_TYPES)
+                    + ["text"] * len(SOURCE_HASH_COLUMNS) + ["timestamptz", "timestamptz"]
+                )
+                for index, (example, metadata) in enumerate(zip(snapshot["examples"], embeddings)):
+                    if metadata is None:
+                        continue
+                    vectors = [
+                        snapshot["matrices"][embedding_type][index] if snapshot["present"][index, type_index] else None
+                        for type_index, embedding_type in enumerate(EMBEDDING_TYPES)
+                    ]
+                    copy.write_row(
+                        [example["id"]] + vectors
+                        + [metadata[column] for column in SOURCE_HASH_COLUMNS]
+                        + [parse_timestamp(metadata["created_at"]), parse_timestamp(metadata["updated_at"])]
+                    )
+                    embedding_count += 1
+
+            cur.execute(f"""
+                INSERT INTO htmx_embeddings ({embedding_columns})
+                SELECT {embedding_columns} FROM htmx_embeddings_staging
+                ON CONFLICT (id) DO UPDATE SET
+                    {embedding_updates}
+            """)
+
+            # Imported rows keep the snapshot's updated_at, which can predate the last graph
+            # build; forget the build so find_similar_examples scans until the graph is rebuilt
+            if has_neighbor_graph:
+                cur.execute("DELETE FROM htmx_neighbor_state")
+        conn.commit()
+
+        elapsed = time.time() - start_time
+        logger.info(
+            f"Imported {example_count} examples and {embedding_count} embedding rows "
+            f"from {snapshot_dir} in {elapsed:.2f}s"
+        )
+        return {"examples": example_count, "embeddings": embedding_count}
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error importing snapshot: {e}")
+        raise
+
+def main():
+    """Main function to export, verify or import an embedding snapshot."""
+    parser = argparse.ArgumentParser(description="Export, verify and import snapshots of HTMX examples and embeddings")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export the database to a snapshot directory")
+    export_parser.add_argument(
+        "--output",
+        type=str,
+        default=DEFAULT_SNAPSHOT_PATH,
+        help=f"Snapshot directory to write (default: {DEFAULT_SNAPSHOT_PATH})"
+    )
+
+    export_parser.add_argument(
+        "--fetch-size",
+        type=int,
+        default=500,
+        help="Rows fetched per round trip while exporting (default: 500)"
+    )
+
+    verify_parser = subparsers.add_parser("verify", help="Check a snapshot's files against its checksums")
+    verify_parser.add_argument(
+        "--input",
+        type=str,
+        default=DEFAULT_SNAPSHOT_PATH,
+        help=f"Snapshot directory to verify (default: {DEFAULT_SNAPSHOT_PATH})"
+    )
+
+    import_parser = subparsers.add_parser("import", help="Load a snapshot into the database")
+    import_parser.add_argument(
+        "--input",
+        type=str,
+        default=DEFAULT_SNAPSHOT_PATH,
+        help=f"Snapshot directory to import (default: {DEFAULT_SNAPSHOT_PATH})"
+    )
+
+    import_parser.add_argument(
+        "--replace",
+        action="store_true",
+        help="Empty htmx_examples and htmx_embeddings before importing instead of merging"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "export":
+            conn = connect_to_db()
+            export_snapshot(conn, args.output, args.fetch_size)
+        elif args.command == "verify":
+            verify_snapshot(args.input)
+        elif args.command == "import":
+            conn = connect_to_db()
+            import_snapshot(conn, args.input, args.replace)
+    except Exception as e:
+        logger.error(f"Error in main function: {e}")
+        sys.exit(1)
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+if __name__ == "__main__":
+    main()